@@ -0,0 +1,57 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    benchmark of memory and time taken by clients of many accounts
+
+Compares separate `Habitipy` clients, each loading its API tree, clients
+sharing the tree and clients made by `Habitipy.with_credentials`:
+
+    python benchmarks/bench_accounts.py
+"""
+import time
+import tracemalloc
+
+from habitipy import Habitipy
+from habitipy.api import shared_api_tree
+
+ACCOUNTS = 1000
+URL = 'https://habitica.com'
+
+
+def conf(i):
+    """configuration of account `i`"""
+    return {'url': URL, 'login': 'login-{}'.format(i), 'password': 'key-{}'.format(i)}
+
+
+def measure(func):
+    """return result of `func`, memory it keeps allocated and seconds it took"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before, seconds
+
+
+def main():
+    """print memory and time taken by clients of ACCOUNTS accounts"""
+    tree = shared_api_tree()
+    api = Habitipy(conf(0), apis=tree)
+    cases = [
+        ('separate clients', lambda: [Habitipy(conf(i)) for i in range(ACCOUNTS)]),
+        ('shared tree', lambda: [Habitipy(conf(i), apis=tree) for i in range(ACCOUNTS)]),
+        ('with_credentials', lambda: [
+            api.with_credentials(c['login'], c['password'])
+            for c in map(conf, range(ACCOUNTS))]),
+    ]
+    for name, func in cases:
+        clients, size, seconds = measure(func)
+        print('{} {:<17} {:10.1f} KiB {:8.1f} ms  {:7.2f} KiB per account'.format(
+            ACCOUNTS, name, size / 1024, seconds * 1000, size / 1024 / ACCOUNTS))
+        for client in clients:
+            client.close()
+
+
+if __name__ == '__main__':
+    main()
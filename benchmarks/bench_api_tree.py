@@ -0,0 +1,72 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    benchmark of memory taken by the API tree and time to build it
+
+Parses apiDoc shipped with habitipy, builds the API tree and loads it
+from the pickled cache, as `Habitipy` does, and builds lazy trees
+entering one group of them, as `Habitipy(conf, lazy=True)` does:
+
+    python benchmarks/bench_api_tree.py
+"""
+import os
+import pickle
+import time
+import tracemalloc
+import warnings
+
+import habitipy
+from habitipy.api import Habitipy, lazy_api_tree, parse_apidoc_text
+
+NUMBER = 50
+# groups entered in lazy trees, from small to the largest one
+LAZY_GROUPS = ('status', 'tasks', 'user')
+
+
+def build(text):
+    """API tree of apiDoc `text`"""
+    return Habitipy._make_apis_dict(  # pylint: disable=protected-access
+        parse_apidoc_text(text))
+
+
+def measure(func):
+    """return result of `func` and memory it keeps allocated"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def timeit(func):
+    """best time of NUMBER calls of `func`"""
+    best = float('inf')
+    for _ in range(NUMBER):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    """print memory taken by the API tree and time to build and load it"""
+    warnings.simplefilter('ignore')
+    apidoc = os.path.join(os.path.dirname(habitipy.__file__), 'apidoc.txt')
+    with open(apidoc, encoding='utf-8') as file:
+        text = file.read()
+    tree, size = measure(lambda: build(text))
+    cache = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+    _, loaded_size = measure(lambda: pickle.loads(cache))
+    print('tree       {:8.1f} KiB'.format(size / 1024))
+    print('cached     {:8.1f} KiB  loaded {:8.1f} KiB'.format(
+        len(cache) / 1024, loaded_size / 1024))
+    print('parse      {:8.2f} ms'.format(timeit(lambda: build(text)) * 1000))
+    print('unpickle   {:8.2f} ms'.format(timeit(lambda: pickle.loads(cache)) * 1000))
+    print('lazy index {:8.2f} ms'.format(timeit(lambda: lazy_api_tree(text)) * 1000))
+    for group in LAZY_GROUPS:
+        seconds = timeit(lambda group=group: lazy_api_tree(text).into('api').into('v3').into(group))
+        print('lazy {:<6}{:8.2f} ms'.format(group, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
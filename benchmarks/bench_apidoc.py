@@ -0,0 +1,56 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    benchmark of apiDoc tokenizer and parser throughput
+
+Tokenizes and parses a large corpus of apiDoc shipped with habitipy
+concatenated COPIES times, from a string and streamed from a binary file:
+
+    python benchmarks/bench_apidoc.py
+"""
+import io
+import os
+import time
+import warnings
+
+import habitipy
+from habitipy.api import index_apidoc, parse_apidoc_tokens
+from habitipy.apidoc import tokenize
+
+COPIES = 50
+REPEAT = 5
+
+
+def timeit(func):
+    """best time of REPEAT calls of `func`"""
+    best = float('inf')
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    """print throughput of tokenizing and parsing the corpus"""
+    warnings.simplefilter('ignore')
+    apidoc = os.path.join(os.path.dirname(habitipy.__file__), 'apidoc.txt')
+    with open(apidoc, encoding='utf-8') as file:
+        text = file.read() * COPIES
+    data = text.encode('utf-8')
+    lines = text.count('\n')
+    cases = [
+        ('tokenize str', lambda: sum(1 for _ in tokenize(text))),
+        ('tokenize stream', lambda: sum(1 for _ in tokenize(io.BytesIO(data)))),
+        ('parse str', lambda: parse_apidoc_tokens(tokenize(text))),
+        ('parse stream', lambda: parse_apidoc_tokens(tokenize(io.BytesIO(data)))),
+        ('lazy index', lambda: index_apidoc(text)),
+    ]
+    print('corpus {:.1f} MB, {} lines'.format(len(data) / 1e6, lines))
+    for name, func in cases:
+        seconds = timeit(func)
+        print('{:<16} {:8.1f} ms {:8.1f} MB/s {:8.0f}k lines/s'.format(
+            name, seconds * 1000, len(data) / 1e6 / seconds, lines / 1000 / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    benchmark of memory taken by models compared to decoded dicts
+
+Measures memory kept by tasks and user of a synthetic large account:
+
+    python benchmarks/bench_models.py
+"""
+import json
+import tracemalloc
+
+from habitipy.models import Task, User
+
+TASKS = 5000
+
+
+def make_task(i):
+    """a daily as returned by Habitica"""
+    return {
+        '_id': '0c0a15b9-10a6-4bd8-9a03-{:012d}'.format(i), 'id': 'daily-{}'.format(i),
+        'userId': '9fb1e40c-dd5c-4b9f-8e49-b33d40457c0a', 'text': 'Daily {}'.format(i),
+        'notes': '', 'type': 'daily', 'tags': [], 'value': 1.5, 'priority': 1,
+        'attribute': 'str', 'challenge': {}, 'group': {'approval': {}, 'assignedUsers': []},
+        'reminders': [], 'createdAt': '2020-01-01T00:00:00.000Z',
+        'updatedAt': '2020-01-01T00:00:00.000Z', 'byHabitica': False,
+        'checklist': [], 'collapseChecklist': False, 'completed': False, 'everyX': 1,
+        'frequency': 'weekly', 'streak': 3, 'startDate': '2020-01-01T00:00:00.000Z',
+        'daysOfMonth': [], 'weeksOfMonth': [], 'isDue': True, 'yesterDaily': True,
+        'nextDue': [], 'history': [],
+        'repeat': {'m': True, 't': True, 'w': True, 'th': True, 'f': True, 's': True, 'su': True},
+    }
+
+
+def make_user():
+    """a user with some of the fields returned by Habitica"""
+    return {
+        '_id': '9fb1e40c-dd5c-4b9f-8e49-b33d40457c0a', 'id': '9fb1e40c',
+        'stats': {
+            'hp': 50, 'mp': 30, 'exp': 10, 'gp': 100.5, 'lvl': 20, 'class': 'warrior',
+            'points': 0, 'str': 1, 'con': 2, 'int': 3, 'per': 4, 'buffs': {}, 'training': {},
+            'toNextLevel': 500, 'maxHealth': 50, 'maxMP': 60},
+        'items': {'food': {'Meat': 3}, 'eggs': {}, 'pets': {}, 'mounts': {}, 'gear': {}},
+        'profile': {'name': 'user'}, 'party': {'_id': 'party'}, 'preferences': {},
+        'flags': {}, 'achievements': {}, 'tags': [], 'notifications': [],
+    }
+
+
+def measure(func):
+    """return result of `func` and memory it keeps allocated"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    """print memory kept by decoded dicts and by models"""
+    tasks = json.dumps([make_task(i) for i in range(TASKS)])
+    users = json.dumps([make_user() for _ in range(TASKS)])
+    cases = [
+        ('{} tasks'.format(TASKS), tasks, Task),
+        ('{} users'.format(TASKS), users, User),
+    ]
+    for name, text, model in cases:
+        _, raw = measure(lambda text=text: json.loads(text))
+        _, compact = measure(
+            lambda text=text, model=model: [model.from_dict(d) for d in json.loads(text)])
+        print('{:<12} dicts {:8.1f} KiB  models {:8.1f} KiB  {:5.1f}%'.format(
+            name, raw / 1024, compact / 1024, 100 * compact / raw))
+
+
+if __name__ == '__main__':
+    main()
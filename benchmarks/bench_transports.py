@@ -0,0 +1,118 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    benchmark of throughput of HTTP transports
+
+Measures requests per second made through each installed transport
+to a local stub server, sequentially and concurrently:
+
+    python benchmarks/bench_transports.py
+
+The stub server speaks HTTP/1.1 without TLS, so httpx transports use HTTP/1.1 here.
+HTTP/2 multiplexing only helps against a TLS server, like habitica.com.
+The stub server runs in the same process, so it bounds concurrent throughput.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from habitipy import Habitipy
+from habitipy.transport import (
+    HttpxAsyncTransport, HttpxTransport, RequestsTransport, Urllib3Transport, aiohttp, httpx)
+
+NUMBER = 1000
+CONCURRENCY = 20
+BODY = json.dumps({'success': True, 'data': {'status': 'up'}}).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """answers any GET with a status document, keeping connection alive"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """respond with status"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def sync_transports():
+    """installed synchronous transports by name"""
+    res = [('requests', RequestsTransport), ('urllib3', Urllib3Transport)]
+    if httpx is not None:
+        res.append(('httpx', lambda: HttpxTransport(http2=False)))
+    return res
+
+
+def async_transports():
+    """installed asynchronous transports by name, None is the default aiohttp session"""
+    res = []
+    if aiohttp is not None:
+        res.append(('aiohttp', None))
+    if httpx is not None:
+        res.append(('httpx', lambda: HttpxAsyncTransport(http2=False)))
+    return res
+
+
+def bench_sync(conf, transport):
+    """requests per second made sequentially and from a thread pool"""
+    res = []
+    with transport() as tr:
+        api = Habitipy(conf, transport=tr, single_flight=False, pool_size=CONCURRENCY)
+        api.status.get()
+        started = time.perf_counter()
+        for _ in range(NUMBER):
+            api.status.get()
+        res.append(NUMBER / (time.perf_counter() - started))
+        started = time.perf_counter()
+        api.status.get.map([{}] * NUMBER, max_workers=CONCURRENCY)
+        res.append(NUMBER / (time.perf_counter() - started))
+    return res
+
+
+async def bench_async(conf, transport):
+    """requests per second made sequentially and concurrently"""
+    from habitipy.aio import HabitipyAsync  # pylint: disable=import-outside-toplevel
+    tr = transport() if transport else None
+    res = []
+    async with HabitipyAsync(
+            conf, transport=tr, single_flight=False, limit=CONCURRENCY) as api:
+        await api.status.get()
+        started = time.perf_counter()
+        for _ in range(NUMBER):
+            await api.status.get()
+        res.append(NUMBER / (time.perf_counter() - started))
+        started = time.perf_counter()
+        await api.status.get.map([{}] * NUMBER, max_workers=CONCURRENCY)
+        res.append(NUMBER / (time.perf_counter() - started))
+    if tr is not None:
+        await tr.close()
+    return res
+
+
+def main():
+    """print throughput of each installed transport"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conf = {
+        'url': 'http://127.0.0.1:{}'.format(server.server_address[1]),
+        'login': 'login', 'password': 'password'}
+    print('{:<16}{:>14}{:>14}'.format('transport', 'sequential', 'concurrent'))
+    for name, transport in sync_transports():
+        print('{:<16}{:>10.0f} r/s{:>10.0f} r/s'.format(name, *bench_sync(conf, transport)))
+    for name, transport in async_transports():
+        print('{:<16}{:>10.0f} r/s{:>10.0f} r/s'.format(
+            'async ' + name, *asyncio.run(bench_async(conf, transport))))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
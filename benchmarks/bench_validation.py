@@ -0,0 +1,38 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    benchmark of request validation overhead
+
+Measures time to prepare a request, without sending it, with each validation mode:
+
+    python benchmarks/bench_validation.py
+"""
+import timeit
+import warnings
+
+from habitipy import Habitipy
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+TASK = {'type': 'todo', 'text': 'Benchmark', 'priority': 1.5, 'tags': [], 'notes': ''}
+NUMBER = 20000
+
+
+def main():
+    """print per-call time of preparing requests in each validation mode"""
+    warnings.simplefilter('ignore')
+    for mode in ('off', 'warn', 'strict'):
+        api = Habitipy(CONF, validation=mode)
+        add = api.tasks.user.post
+        score = api.endpoint('post', '/tasks/:taskId/score/:direction')
+        cases = [
+            ('cursor POST /tasks/user', lambda: add._prepare_request(**TASK)),
+            ('handle POST /tasks/:taskId/score/:direction',
+             lambda: score._prepare_request('tid', 'up', scoreNotes='')),
+        ]
+        for name, func in cases:
+            func()  # validator is compiled on first call
+            best = min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER
+            print('{:<7}{:<48}{:8.2f} us'.format(mode, name, best * 1e6))
+
+
+if __name__ == '__main__':
+    main()
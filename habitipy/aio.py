@@ -3,14 +3,99 @@
     RESTful api abstraction module with asyncio backend
 """
 # pylint: disable=too-few-public-methods,invalid-name
-import textwrap
-import warnings
-from typing import Union, Dict, List
+import asyncio
+from functools import partial
+from typing import Union, Dict, List, Iterable, Awaitable, Any, Optional
 import aiohttp  # pylint: disable=import-error
 
-from .api import Habitipy, WrongReturnCode
+from .api import Habitipy, EndpointHandle, BatchResult, DEFAULT_POOL_SIZE
+from .middleware import ApiResponse
+from .retry import retrying_async
+from .deadline import DeadlineExceeded
+from .transport import AsyncTransport, aiohttp_timeout
 from .util import get_translation_functions
 _, ngettext = get_translation_functions('habitipy', names=('gettext', 'ngettext'))
+# seconds to keep resolved addresses of Habitica server
+DEFAULT_DNS_CACHE_TTL = 300
+# seconds to keep idle connections open
+DEFAULT_KEEPALIVE_TIMEOUT = 30.0
+
+
+class _AsyncSession:
+    """aiohttp session and concurrency limit shared by all cursors of one HabitipyAsync"""
+    # pylint: disable=too-many-arguments
+    def __init__(self, session, *, pool_size, limit, dns_cache_ttl, keepalive_timeout):
+        self.session = session  # type: Optional[aiohttp.ClientSession]
+        self.owned = session is None
+        self.pool_size = pool_size
+        self.limit = limit
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._semaphore = None  # type: Optional[asyncio.Semaphore]
+
+    def get(self) -> aiohttp.ClientSession:
+        """get the session, creating it if needed. Should be called from a running loop"""
+        if self.session is None or (self.owned and self.session.closed):
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """semaphore limiting number of requests in flight"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def close(self) -> None:
+        """close the session if it was created here"""
+        if self.owned and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class AsyncEndpointHandle(EndpointHandle):
+    """
+    `EndpointHandle` for `HabitipyAsync`
+
+    ```python
+    async def AsyncEndpointHandle.__call__(
+        self,
+        [session: aiohttp.ClientSession,]
+        *path_params,
+        **kwargs
+    ) -> Union[Dict, List]
+    ```
+    If the first argument is not an `aiohttp.ClientSession`,
+    session of `HabitipyAsync` is used.
+    """
+    _api: 'HabitipyAsync'
+
+    def __call__(self, *path, **kwargs) -> Awaitable[Union[Dict, List]]:  # type: ignore
+        session = None
+        if path and isinstance(path[0], aiohttp.ClientSession):
+            session, path = path[0], path[1:]
+        # pylint: disable=protected-access
+        return self._api._call(session, self._prepare_request, *path, **kwargs)
+
+    async def map(  # type: ignore  # pylint: disable=invalid-overridden-method
+            self,
+            calls: Iterable[Any],
+            max_workers: Optional[int] = None) -> List[BatchResult]:
+        """
+        Call the endpoint concurrently once for each item of `calls`, `max_workers` at a time
+
+        Items are interpreted as in `EndpointHandle.map`.
+        """
+        # pylint: disable=protected-access
+        return await self._api.gather([
+            self(**call) if isinstance(call, dict) else
+            self(*call) if isinstance(call, (list, tuple)) else
+            self(call)
+            for call in calls], limit=max_workers)
 
 
 class HabitipyAsync(Habitipy):
@@ -20,49 +105,174 @@ class HabitipyAsync(Habitipy):
     ```python
     async def HabitipyAsync.__call__(
         self,
-        session: aiohttp.ClientSession,
+        session: Optional[aiohttp.ClientSession] = None,
         **kwargs
     ) -> Union[Dict, List]
     ```
     # Arguments
 
-    session (aiohttp.ClientSession): aiohttp session used to make request.
+    session (None, aiohttp.ClientSession): aiohttp session used to make request.
+        If not passed, session of `HabitipyAsync` is used.
+
+    Besides arguments of `Habitipy`, constructor accepts:
+
+    session (None, aiohttp.ClientSession): default session for requests. By default
+        one is created on first request and closed by `HabitipyAsync.close`
+    pool_size : maximum number of connections of a created session
+    limit : maximum number of requests in flight for this client
+    dns_cache_ttl : seconds to cache resolved addresses in a created session
+    keepalive_timeout : seconds to keep idle connections of a created session open
+    transport (None, AsyncTransport): transport from `habitipy.transport` sending requests
+        instead of the session, like `HttpxAsyncTransport` multiplexing requests over HTTP/2
 
     # Example
     ```python
     import asyncio
-    from aiohttp import ClientSession
     from habitipy import Habitipy, load_conf,DEFAULT_CONF
     from habitipy.aio import HabitipyAsync
 
 
-    loop = asyncio.new_event_loop()
-    api = HabitipyAsync(load_conf(DEFAULT_CONF))
-
-    async def main(api):
-        async with ClientSession() as session:
-            u = await api.user.get(session)
-            return u
-    loop.run_until_complete(main(api))
+    async def main():
+        async with HabitipyAsync(load_conf(DEFAULT_CONF)) as api:
+            u = await api.user.get()
+            results = await api.gather(
+                [api.tasks[t['id']].get() for t in await api.tasks.user.get()],
+                limit=20)
+            return u, results
+    asyncio.run(main())
     ```
     """
+    _endpoint_class = AsyncEndpointHandle
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, conf: Dict[str, str], *,
+                 session: Optional[aiohttp.ClientSession] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 limit: int = DEFAULT_POOL_SIZE,
+                 dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL,
+                 keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+                 transport: Optional[AsyncTransport] = None,
+                 **kwargs) -> None:
+        super().__init__(conf, pool_size=pool_size, **kwargs)
+        self._http_transport = transport  # type: ignore
+        self._aio = _AsyncSession(
+            session, pool_size=pool_size, limit=limit,
+            dns_cache_ttl=dns_cache_ttl, keepalive_timeout=keepalive_timeout)
+
+    @staticmethod
+    def _make_session(pool_size: int) -> None:  # type: ignore
+        return None
+
+    async def close(self) -> None:  # type: ignore  # pylint: disable=invalid-overridden-method
+        """close the session if it was created by `HabitipyAsync`"""
+        if self._owns_session:
+            await self._aio.close()
+
+    def __enter__(self):
+        raise TypeError('Use "async with" with HabitipyAsync')
+
+    async def __aenter__(self) -> 'HabitipyAsync':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
     def __call__(   # type: ignore
             self,
-            session: aiohttp.ClientSession,
-            **kwargs) -> Union[Dict, List]:
-        return self._request(*self._prepare_request(backend=session, **kwargs))
+            session: Optional[aiohttp.ClientSession] = None,
+            **kwargs) -> Awaitable[Union[Dict, List]]:
+        return self._call(session, self._prepare_request, **kwargs)
+
+    async def _call(self, session, prepare, *args, **kwargs):
+        left = self._time_left()
+        if left is None:
+            return await self._call_now(session, prepare, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(
+                self._call_now(session, prepare, *args, **kwargs), max(left, 0))
+        except asyncio.TimeoutError:
+            if self._time_left() > 0:
+                raise
+            raise DeadlineExceeded('Deadline has passed before the call was done') from None
+
+    async def _call_now(self, session, prepare, *args, **kwargs):
+        async with self._aio.semaphore:
+            backend = session or self._aio.get()
+            return await self._request(*prepare(*args, backend=backend, **kwargs))
+
+    async def gather(
+            self,
+            calls: Iterable[Awaitable],
+            limit: Optional[int] = None) -> List[BatchResult]:
+        """
+        Await `calls` concurrently, at most `limit` at a time
+
+        Returns `BatchResult`s in order of `calls`. An exception raised
+        by a call is stored in its result instead of cancelling the others.
+        Number of requests in flight is also bounded by `limit` of the client.
+        """
+        calls = list(calls)
+        semaphore = asyncio.Semaphore(limit or max(len(calls), 1))
+
+        async def run(call):
+            async with semaphore:
+                try:
+                    return BatchResult(await call, None)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    return BatchResult(None, error)
+        return list(await asyncio.gather(*[run(call) for call in calls]))
+
+    async def map(  # type: ignore  # pylint: disable=invalid-overridden-method
+            self,
+            calls: Iterable[Dict[str, Any]],
+            max_workers: Optional[int] = None) -> List[BatchResult]:
+        """call this endpoint concurrently with each dict of keyword params from `calls`"""
+        return await self.gather([self(**call) for call in calls], limit=max_workers)
 
     async def _request(self, request, request_args, request_kwargs):  # pylint: disable=invalid-overridden-method
-        async with request(*request_args, **request_kwargs) as resp:
-            if resp.status != self._node.retcode:
-                resp.raise_for_status()
-                msg = _("""
-                Got return code {res.status}, but {node.retcode} was
-                expected for {node.uri}. It may be a typo in Habitica apiDoc.
-                Please file an issue to https://github.com/HabitRPG/habitica/issues""")
-                msg = textwrap.dedent(msg)
-                msg = msg.replace('\n', ' ').format(res=resp, node=self._node)
-                if self._strict:
-                    raise WrongReturnCode(msg)
-                warnings.warn(msg)
-            return (await resp.json())['data']
+        response_key, flight_key, body = self._cache_lookup(request_args, request_kwargs)
+        if body is None:
+            fetch = partial(self._fetch, request, request_args, request_kwargs)
+            if flight_key is None:
+                body = await fetch()
+            else:
+                body = await self._single_flight.run_async(flight_key, fetch)
+            self._response_cache_store(response_key, body)
+        else:
+            self._metrics_count('cache_hits')
+        return self._decode(body)
+
+    async def _fetch(  # pylint: disable=invalid-overridden-method
+            self, request, request_args, request_kwargs):
+        cache_key, cache_entry = self._http_cache_validate(request_args, request_kwargs)
+        response = await self._send(
+            self._api_request(request_args, request_kwargs), partial(self._transport, request))
+        return self._response_body(response, cache_key, cache_entry, request_kwargs)
+
+    async def _send(  # pylint: disable=invalid-overridden-method
+            self, api_request, transport):
+        return await retrying_async(
+            partial(self._attempt, api_request, transport), self._retry_delay)
+
+    async def _attempt(  # pylint: disable=invalid-overridden-method
+            self, api_request, transport):
+        with self._attempting(api_request) as attempt:
+            attempt.response = await self._pipeline.send_async(api_request, transport)
+        return attempt.response
+
+    async def _transport(  # pylint: disable=invalid-overridden-method
+            self, request, api_request):
+        if self._rate_limiter:
+            await asyncio.sleep(self._rate_limiter.reserve())
+        started = self._metrics_start()
+        if self._http_transport is not None:
+            response = await self._http_transport.send(api_request)
+        else:
+            async with request(
+                    api_request.url, timeout=aiohttp_timeout(api_request.timeout),
+                    **api_request.transport_kwargs()) as resp:
+                response = ApiResponse(resp.status, resp.headers, await resp.read(), resp)
+        self._metrics_response(started, api_request, response)
+        if self._rate_limiter:
+            self._rate_limiter.update(response.headers, response.status)
+        return response
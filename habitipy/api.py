@@ -4,24 +4,74 @@
 """
 # pylint: disable=invalid-name,too-few-public-methods,too-many-locals
 
-import json
+import hashlib
+import os
+import pickle
 import re
-import uuid
+import sys
+import threading
 from keyword import kwlist
 import warnings
 import textwrap
-from collections import defaultdict
-from typing import Dict, Union, List, Tuple, Iterator, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import copy_context
+from functools import partial
+from types import MappingProxyType, SimpleNamespace
+from typing import Dict, Union, List, Tuple, Iterator, Iterable, Any, Optional, Callable, NamedTuple
 
 import pkg_resources
 import requests
 from plumbum import local
 
-from .util import get_translation_functions
+from .apidoc import ApidocError, Token, tokenize
+from .cache import HttpCache, ResponseCache, SingleFlight, resource_tags
+from .metrics import Metrics
+from .middleware import ApiRequest, ApiResponse, Middleware, Pipeline
+from .models import wrap_response
+from .projection import AccessProfiles
+from .ratelimit import RateLimiter
+from .deadline import (
+    Deadline, DeadlineExceeded, cap_timeout, current_deadline, remaining_time)
+from .retry import NETWORK_ERRORS, CircuitBreaker, RetryPolicy, retrying
+from .transport import DEFAULT_POOL_SIZE, Transport, make_session
+from .util import get_translation_functions, get_json_codec, JsonCodec
+from .validation import ResponseValidator
 
 API_URI_BASE = '/api/v3'
+# number of parts of API_URI_BASE in ApiEndpoint.parted_uri
+API_URI_BASE_DEPTH = len(API_URI_BASE.split('/')) - 1
 API_CONTENT_TYPE = 'application/json'
 APIDOC_LOCAL_FILE = '~/.config/habitipy/apidoc.txt'
+# precompiled API tree, not cached if None
+APIDOC_CACHE_FILE = '~/.config/habitipy/apidoc.cache'  # type: Optional[str]
+# bump this each time parse_apidoc or the API tree classes change
+APIDOC_PARSER_VERSION = 5
+# apiDoc tags of params of endpoints with their default groups
+PARAM_TAG_GROUPS = {'apiParam': '(Parameter)', 'apiBody': '(Body)', 'apiSuccess': '(200)'}
+# apiDoc tags setting attributes of endpoints
+ENDPOINT_ATTR_TAGS = {'apiName': 'name', 'apiGroup': 'group', 'apiDescription': 'description'}
+# apiDoc tags used to make endpoints, others are skipped by tokenizer
+PARSED_TAGS = frozenset(
+    ('api', 'apiDefine', 'apiIgnore', 'apiUse')
+    + tuple(PARAM_TAG_GROUPS) + tuple(ENDPOINT_ATTR_TAGS))
+# number of child cursors remembered by each Habitipy object
+CURSOR_CACHE_SIZE = 256
+# seconds to wait for connection to the server and for data from it
+DEFAULT_TIMEOUT = (10.0, 60.0)
+# modes of checking requests against apiDoc before sending: don't check,
+# warn about problems or raise WrongData
+VALIDATION_MODES = ('off', 'warn', 'strict')
+# query params selecting fields of documents returned by endpoints,
+# which are set by `fields` argument of calls
+PROJECTION_PARAMS = {
+    ('get', '/api/v3/user'): 'userFields',
+}
+# body params really required by endpoints. apiDoc marks many optional body params,
+# like scoreNotes of scoring, as required, so other missing ones are not reported
+REQUIRED_BODY_PARAMS = {
+    ('post', '/api/v3/tasks/user'): frozenset(('text', 'type')),
+}
 _, ngettext = get_translation_functions('habitipy', names=('gettext', 'ngettext'))
 
 
@@ -43,6 +93,8 @@ class WrongPath(ValueError):
 
 class ApiNode:
     """Represents a middle point in API"""
+    __slots__ = ('param', 'param_name', 'paths')
+
     def __init__(self, param_name=None, param=None, paths=None):
         self.param = param
         self.param_name = param_name
@@ -67,9 +119,9 @@ class ApiNode:
                 err = """Cannot place param '{}' as '{self.param_name}' exist on node already!"""
                 raise ParamAlreadyExist(err.format(part, self=self))
             self.param = val
-            self.param_name = part
+            self.param_name = sys.intern(part)
             return val
-        self.paths[part] = val
+        self.paths[sys.intern(part)] = val
         return val
 
     def keys(self) -> Iterator[str]:
@@ -87,6 +139,136 @@ class ApiNode:
         return val == self.param_name
 
 
+# group of @apiDefine blocks in index of apiDoc
+APIDOC_DEFINES = '@apiDefine'
+# start of an apiDoc block after a newline, with @apiIgnore line before it,
+# and top-level group of its URI if it is in API_URI_BASE
+_api_block_regex = re.compile(
+    r'\n(?:@apiIgnore\b[^\n]*\n)?@api +\S+ +' + re.escape(API_URI_BASE) + r'/([^/\s]*)'
+    r'|\n(?:@apiIgnore\b[^\n]*\n)?@api |\n(@apiDefine) ')
+
+
+def index_apidoc(text: str) -> Dict[str, List[Tuple[int, int, int]]]:
+    """
+    offsets of `@api` blocks in apiDoc `text` and numbers of their first lines
+    by top-level group of their URIs, like `user` for `/api/v3/user/stats`.
+    Blocks of URIs outside of `API_URI_BASE` are under empty group
+    and `@apiDefine` blocks under `APIDOC_DEFINES`
+    """
+    index = {}  # type: Dict[str, List[Tuple[int, int, int]]]
+    # newline before each block in text with one more newline is at offset of the block in text
+    matches = list(_api_block_regex.finditer('\n' + text))
+    ends = [match.start() for match in matches[1:]] + [len(text)]
+    line, offset = 1, 0
+    for match, end in zip(matches, ends):
+        start = match.start()
+        line += text.count('\n', offset, start)
+        offset = start
+        group = match.group(1) or match.group(2) or ''
+        index.setdefault(group, []).append((start, end, line))
+    return index
+
+
+def _block_tokens(text: str, blocks: Iterable[Tuple[int, int, int]]) -> Iterator[Token]:
+    """tokens of `blocks` of apiDoc `text` from `index_apidoc`"""
+    for start, end, line in blocks:
+        yield from tokenize(text[start:end], line, PARSED_TAGS)
+
+
+class LazyApiNode(ApiNode):
+    """
+    `ApiNode` of `API_URI_BASE` which parses endpoints of each top-level group,
+    like `user`, from apiDoc only when the group is entered for the first time
+
+    Problems of apiDoc of a group are reported when it is parsed.
+    Use `load_api_tree(..., lazy=True)` to get a tree with such node.
+    """
+    __slots__ = ('_text', '_pending', '_strict', '_shared', '_defines', '_lock')
+
+    def __init__(
+            self, text: str, index: Dict[str, List[Tuple[int, int, int]]], strict=False) -> None:
+        super().__init__()
+        self._text = text
+        self._pending = {
+            group: blocks for group, blocks in index.items()
+            if group and group != APIDOC_DEFINES}
+        self._strict = strict
+        # params of identical lines are shared by endpoints of all groups
+        self._shared = {}  # type: Dict[Tuple[str, str, str], Param]
+        self._defines = {}  # type: Dict[str, List[Token]]
+        parse_apidoc_tokens(
+            _block_tokens(text, index.get(APIDOC_DEFINES, ())), self._shared, self._defines)
+        self._lock = threading.Lock()
+        # a group which is a path param can't be told by its name, so it is parsed now
+        for group in [group for group in self._pending if group.startswith(':')]:
+            with self._lock:
+                self._load(group)
+
+    def _parse(self, blocks: List[Tuple[int, int, int]]) -> List['ApiEndpoint']:
+        """endpoints of `blocks` of apiDoc"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error' if self._strict else 'ignore')
+            return parse_apidoc_tokens(
+                _block_tokens(self._text, blocks), self._shared, self._defines)
+
+    def _load(self, group: str) -> None:
+        """parse and place endpoints of `group` if it is not parsed yet, holding `_lock`"""
+        blocks = self._pending.get(group)
+        if blocks is None:
+            return
+        apis = self._parse(blocks)
+        # endpoints are placed under a new node, so the group is not looked up in this one
+        # while it is incomplete, and then the group is moved here in one step
+        node = ApiNode()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error' if self._strict else 'ignore')
+            Habitipy._make_apis_dict(  # pylint: disable=protected-access
+                apis, ApiNode(paths={'api': ApiNode(paths={'v3': node})}))
+            for part, child in node.paths.items():
+                self.place(part, child)
+            if node.param:
+                try:
+                    self.place(node.param_name, node.param)
+                except ParamAlreadyExist:
+                    warnings.warn("Ignoring conflicting param. Don't use {}".format(group))
+        # only now, so other threads find the group either pending or placed
+        del self._pending[group]
+        if not self._pending:
+            self._text = ''
+
+    def into(self, val: str) -> Union['ApiNode', 'ApiEndpoint']:
+        if val in self._pending:
+            with self._lock:
+                self._load(val)
+        return super().into(val)
+
+    def can_into(self, val: str) -> bool:
+        if val in self._pending or super().can_into(val):
+            return True
+        with self._lock:
+            return val in self._pending or super().can_into(val)
+
+    def keys(self) -> Iterator[str]:
+        with self._lock:
+            paths = list(super().keys())
+            pending = [group for group in self._pending if group not in self.paths]
+        yield from paths
+        yield from pending
+
+
+def lazy_api_tree(text: str, strict=False) -> 'ApiNode':
+    """API tree of apiDoc `text` with groups parsed on first use, see `LazyApiNode`"""
+    index = index_apidoc(text)
+    node = LazyApiNode(text, index, strict)
+    root = ApiNode(paths={'api': ApiNode(paths={'v3': node})})
+    if '' in index:
+        apis = node._parse(index[''])  # pylint: disable=protected-access
+        with warnings.catch_warnings():
+            warnings.simplefilter('error' if strict else 'ignore')
+            Habitipy._make_apis_dict(apis, root)  # pylint: disable=protected-access
+    return root
+
+
 def escape_keywords(arr):
     """append _ to all python keywords"""
     for i in arr:
@@ -95,7 +277,194 @@ def escape_keywords(arr):
         yield i
 
 
-class Habitipy:
+class BatchResult(NamedTuple):
+    """Outcome of a single call made in a `Batch`: either `result` or `error` is set"""
+    result: Any
+    error: Optional[BaseException]
+
+
+class Batch:
+    """
+    Queue of API calls executed concurrently on a thread pool
+
+    Calls are queued by `Batch.add` and run by `Batch.run` or on exit
+    from `with` block. Results are returned in order of submission.
+    An exception raised by a call is stored in its `BatchResult`
+    instead of stopping the other calls. Within `with Deadline(...)` block,
+    calls not started before the deadline are cancelled with `DeadlineExceeded`.
+
+    # Arguments
+    max_workers : number of calls running at the same time
+
+    # Example
+    ```python
+    with api.batch(max_workers=8) as batch:
+        for tid in task_ids:
+            batch.add(api.tasks[tid].score['up'].post)
+    for tid, (result, error) in zip(task_ids, batch.results):
+        print(tid, error or result)
+    ```
+    """
+    def __init__(self, max_workers: int = DEFAULT_POOL_SIZE) -> None:
+        self.max_workers = max_workers
+        self.results = []  # type: List[BatchResult]
+        self._calls = []  # type: List[Tuple[Callable, tuple, dict]]
+
+    def add(self, func: Callable, *args, **kwargs) -> int:
+        """queue `func(*args, **kwargs)` and return index of its result"""
+        self._calls.append((func, args, kwargs))
+        return len(self.results) + len(self._calls) - 1
+
+    def run(self) -> List[BatchResult]:
+        """run queued calls, append their results to `Batch.results` and return them"""
+        calls, self._calls = self._calls, []
+        if not calls:
+            return []
+        deadline = current_deadline()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # calls see deadline of the caller
+            futures = [
+                executor.submit(copy_context().run, func, *args, **kwargs)
+                for func, args, kwargs in calls]
+            if deadline is not None:
+                wait(futures, timeout=deadline.remaining())
+                for future in futures:
+                    future.cancel()
+            results = []
+            for future in futures:
+                if future.cancelled():
+                    results.append(BatchResult(None, DeadlineExceeded(
+                        'Deadline has passed before the call was started')))
+                    continue
+                error = future.exception()
+                results.append(BatchResult(None if error else future.result(), error))
+        self.results.extend(results)
+        return results
+
+    def __enter__(self) -> 'Batch':
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.run()
+
+
+def _project(query: Dict[str, Any], param: str, fields: Optional[Iterable[str]]) -> None:
+    """set projection query `param` to select `fields`, which can be dotted paths"""
+    if fields:
+        query[param] = fields if isinstance(fields, str) else ','.join(fields)
+
+
+def _batch_calls(func: Callable, calls: Iterable[Any], max_workers: int) -> List[BatchResult]:
+    batch = Batch(max_workers)
+    for call in calls:
+        if isinstance(call, dict):
+            batch.add(func, **call)
+        elif isinstance(call, (list, tuple)):
+            batch.add(func, *call)
+        else:
+            batch.add(func, call)
+    return batch.run()
+
+
+class EndpointHandle:  # pylint: disable=too-many-instance-attributes
+    """
+    Reusable callable bound to a single API endpoint
+
+    URI template, query params signature and request headers are computed
+    once on creation, so each call only substitutes path params.
+    Use `Habitipy.endpoint` to get one.
+
+    ```python
+    EndpointHandle.__call__(self, *path_params, **kwargs) -> Union[Dict, List]
+    ```
+    # Arguments
+    path_params : values of path params in order of the URI. Can also be passed by name.
+    kwargs : query and body params, just as for `Habitipy.__call__`,
+        including `credentials` and `fields`
+    """
+    def __init__(self, api: 'Habitipy') -> None:
+        # pylint: disable=protected-access
+        node = api._node
+        if not isinstance(node, ApiEndpoint):
+            raise ValueError('{} is not an endpoint!'.format('/'.join(api._current)))
+        self._api = api
+        self.endpoint = node
+        self.path_params = [part[1:] for part in node.parted_uri if part.startswith(':')]
+        parts = [
+            '{}' if part.startswith(':') else part.replace('{', '{{').replace('}', '}}')
+            for part in (api._conf['url'],) + node.parted_uri]
+        self._template = '/'.join(parts)
+        self._query = tuple(
+            (name, param.is_optional)
+            for name, param in node.params.get('query', {}).items())
+        # copied for each request, as middlewares can change headers of a request in place
+        self._headers = MappingProxyType(api._make_headers())
+        self._has_body = node.method in ['put', 'post', 'delete']
+        self._projection = PROJECTION_PARAMS.get((node.method, node.uri))
+        self._dumps = api._json_codec.dumps
+
+    def _prepare_request(self, *path, backend=None, **kwargs):
+        if len(path) > len(self.path_params):
+            raise TypeError('Too many path params for {}'.format(self.endpoint.uri))
+        path_values = list(path)
+        for name in self.path_params[len(path):]:
+            if name not in kwargs:
+                raise TypeError('Mandatory param {} is missing'.format(name))
+            path_values.append(kwargs.pop(name))
+        credentials = kwargs.pop('credentials', None)
+        uri = self._template.format(*path_values)
+        if 'uri_params' in kwargs:
+            uri_params = kwargs.pop('uri_params')
+            uri += '?' + '&'.join([str(x) + '=' + str(y) for x, y in uri_params.items()])
+        query = {}
+        for name, is_optional in self._query:
+            if name in kwargs:
+                query[name] = kwargs.pop(name)
+            elif not is_optional:
+                raise TypeError('Mandatory param {} is missing'.format(name))
+        if self._projection:
+            _project(query, self._projection, kwargs.pop('fields', None))
+        # pylint: disable=protected-access
+        if self._api._validation != 'off':
+            self._api._check_request(
+                self.endpoint, dict(zip(self.path_params, path_values)),
+                query, kwargs if self._has_body else {})
+        backend = backend or self._api._session
+        request = getattr(backend, self.endpoint.method)
+        headers = (
+            dict(self._headers) if credentials is None else self._api._make_headers(credentials))
+        request_kwargs = {'headers': headers, 'params': query}
+        if self._has_body:
+            request_kwargs['data'] = self._dumps(kwargs)
+        return request, (uri,), request_kwargs
+
+    def __call__(self, *path, **kwargs) -> Union[Dict, List]:
+        # pylint: disable=protected-access
+        return self._api._request(*self._prepare_request(*path, **kwargs))
+
+    def map(
+            self,
+            calls: Iterable[Any],
+            max_workers: int = DEFAULT_POOL_SIZE) -> List[BatchResult]:
+        """
+        Call the endpoint concurrently once for each item of `calls`
+
+        An item can be a tuple of path params, a dict of keyword params or a single path param.
+        Returns `BatchResult`s in order of `calls`.
+
+        ```python
+        score = api.endpoint('post', '/tasks/:taskId/score/:direction')
+        results = score.map([(tid, 'up') for tid in task_ids], max_workers=8)
+        ```
+        """
+        return _batch_calls(self, calls, max_workers)
+
+    def __repr__(self) -> str:
+        return '<EndpointHandle {}>'.format(self.endpoint)
+
+
+class Habitipy:  # pylint: disable=too-many-instance-attributes
     """
     Represents Habitica API
     # Arguments
@@ -105,6 +474,68 @@ class Habitipy:
     from_github : whether it is needed to download apiDoc from habitica's github
     branch : branch to use to download apiDoc from habitica's github
     strict : show warnings on inconsistent apiDocs
+    lazy : parse apiDoc of each top-level group, like `user`, only when it is entered
+        for the first time instead of loading the whole API tree
+    session (None, requests.Session): session used to make requests. By default
+        a new one is created and closed by `Habitipy.close`
+    pool_size : maximum number of keep-alive connections of a created session
+    rate_limiter (None, RateLimiter): paces requests according to Habitica's rate limit
+    json_codec (None, str, JsonCodec): codec for request and response bodies:
+        `'orjson'`, `'ujson'`, `'json'` or a `JsonCodec`. By default the fastest installed one
+    http_cache (None, HttpCache): cache for conditional GET requests
+    response_cache (None, ResponseCache): cache serving GET requests without asking
+        the server until they expire or are invalidated by changes
+    single_flight (bool, SingleFlight): share one response between identical GET requests
+        made concurrently. Pass a `SingleFlight` to share responses between several clients
+    validation : check params of requests against apiDoc before sending them:
+        `'off'`, `'warn'` about problems or raise `WrongData` if `'strict'`.
+        Missing body params are reported only if listed in `REQUIRED_BODY_PARAMS`
+    response_validator (None, ResponseValidator): checks a sample of responses
+        against apiDoc and counts mismatches
+    models : return user, task, tag and group documents as compact models
+        from `habitipy.models` instead of dicts
+    projections (None, AccessProfiles): request only fields read by code
+        at each call site from endpoints listed in `PROJECTION_PARAMS`
+    metrics (None, Metrics): collects latency, statuses, traffic and cache hits
+        of requests per endpoint
+    middlewares : chain of `habitipy.middleware.Middleware` which see each request
+        before it is sent and its response
+    transport (None, Transport): transport from `habitipy.transport` sending requests
+        instead of the session. It is not closed by `Habitipy.close`
+    retry (None, RetryPolicy): retries requests failed with network errors,
+        rate limiting or server errors
+    circuit_breaker (None, CircuitBreaker): stops sending requests while Habitica is down
+    timeout (None, float, tuple): seconds to wait for connection and for response data,
+        as one number or a `(connect, read)` pair. None to wait forever
+    deadline (None, Deadline): time budget of all requests made by this client.
+        Requests within `with Deadline(...)` block follow that deadline too
+
+    All objects derived from one `Habitipy` (like `api.user.get`) share its session.
+    Use `Habitipy` as a context manager to close it when done:
+
+    ```python
+    with Habitipy(conf) as api:
+        for task in api.tasks.user.get():
+            api.tasks[task['id']].score['up'].post()
+    ```
+
+    To work with many accounts, make one client and get lightweight clients
+    of other accounts by `Habitipy.with_credentials`, or pass `credentials`
+    to a single call. Clients created separately can still share the API tree
+    loaded once per process by `shared_api_tree`:
+
+    ```python
+    api = Habitipy(conf, apis=shared_api_tree())
+    accounts = {login: api.with_credentials(login, key) for login, key in keys.items()}
+    user = api.user.get(credentials=(login, key))
+    ```
+
+    Endpoints listed in `PROJECTION_PARAMS` accept `fields` argument
+    to get only some fields of the returned document:
+
+    ```python
+    user = api.user.get(fields=['stats', 'items.food'])
+    ```
 
     # Example
     ```python
@@ -160,22 +591,58 @@ class Habitipy:
 
     ```
     """
+    _endpoint_class = EndpointHandle
     # pylint: disable=too-many-arguments
     def __init__(self, conf: Dict[str, str], *,
                  apis=None, current: Optional[List[str]] = None,
                  from_github=False, branch=None,
-                 strict=False) -> None:
+                 strict=False, lazy=False,
+                 session: Optional[requests.Session] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 json_codec: Union[None, str, JsonCodec] = None,
+                 http_cache: Optional[HttpCache] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 single_flight: Union[bool, SingleFlight] = True,
+                 validation: str = 'off',
+                 response_validator: Optional[ResponseValidator] = None,
+                 models: bool = False,
+                 projections: Optional[AccessProfiles] = None,
+                 metrics: Optional[Metrics] = None,
+                 middlewares: Iterable[Middleware] = (),
+                 transport: Optional[Transport] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 timeout: Union[None, float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+                 deadline: Optional[Deadline] = None) -> None:
+        if validation not in VALIDATION_MODES:
+            raise ValueError('validation should be one of {}'.format(', '.join(VALIDATION_MODES)))
         self._conf = conf
         self._strict = strict
-        if isinstance(apis, (type(None), list)):
-            if not apis:
-                fn = local.path(APIDOC_LOCAL_FILE)
-                if not fn.exists():
-                    fn = pkg_resources.resource_filename('habitipy', 'apidoc.txt')
-                fn = branch if from_github else fn
-                with warnings.catch_warnings():
-                    warnings.simplefilter('error' if strict else 'ignore')
-                    apis = parse_apidoc(fn, from_github)
+        self._validation = validation
+        self._response_validator = response_validator
+        self._models = models
+        self._projections = projections
+        self._metrics = metrics
+        self._pipeline = Pipeline(middlewares)
+        self._http_transport = transport
+        self._retry = retry
+        self._circuit_breaker = circuit_breaker
+        self._timeout = (timeout, timeout) if isinstance(timeout, (int, float)) else timeout
+        self._deadline = deadline
+        self._rate_limiter = rate_limiter
+        self._json_codec = get_json_codec(json_codec)
+        self._http_cache = http_cache
+        self._response_cache = response_cache
+        if single_flight is True:
+            single_flight = SingleFlight()
+        self._single_flight = single_flight or None
+        self._owns_session = session is None
+        self._session = session if session is not None else self._make_session(pool_size)
+        if not apis and isinstance(apis, (type(None), list)):
+            apis = load_api_tree(
+                _apidoc_source(from_github, branch), from_github, strict=strict, lazy=lazy)
+        if isinstance(apis, list):
             with warnings.catch_warnings():
                 warnings.simplefilter('error' if strict else 'ignore')
                 apis = self._make_apis_dict(apis)
@@ -194,12 +661,16 @@ class Habitipy:
                 raise WrongPath("""Can't enter into {} with part {}""".format(_node, part))
         self._node = _node
         self._current = current
-        if isinstance(self._node, ApiEndpoint):
-            self.__doc__ = self._node.render_docstring()
+        self._children = {}  # type: Dict[str, Habitipy]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not isinstance(cls.__dict__.get('__doc__'), _CursorDoc):
+            cls.__doc__ = _CursorDoc(cls.__dict__.get('__doc__'))  # type: ignore
 
     @staticmethod
-    def _make_apis_dict(apis) -> ApiNode:
-        node = ApiNode()
+    def _make_apis_dict(apis, node: Optional[ApiNode] = None) -> ApiNode:
+        node = node if node is not None else ApiNode()
         for api in apis:
             cur_node = node
             prev_part = ''
@@ -219,11 +690,52 @@ class Habitipy:
             cur_node.place(api.method, api)
         return node
 
-    def _make_headers(self):
-        headers = {
-            'x-api-user': self._conf['login'],
-            'x-api-key': self._conf['password']
-        } if self._conf else {}
+    @staticmethod
+    def _make_session(pool_size: int) -> requests.Session:
+        return make_session(pool_size)
+
+    def close(self) -> None:
+        """close the session if it was created by `Habitipy`"""
+        if self._owns_session:
+            self._session.close()
+
+    def __enter__(self) -> 'Habitipy':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def with_credentials(
+            self, login: str, password: str,
+            rate_limiter: Optional[RateLimiter] = None) -> 'Habitipy':
+        """
+        Get a client of another account at the same position in the API
+
+        The client shares API tree, session, caches, metrics and other state
+        with this one and keeps only its credentials, so it takes little memory.
+        As Habitica limits rate of requests per account, it gets `rate_limiter`
+        or a new one like that of this client. It does not close the shared session:
+        close this client when done with all of them.
+        """
+        # pylint: disable=protected-access
+        client = object.__new__(self.__class__)
+        client.__dict__.update(self.__dict__)
+        client._conf = dict(self._conf or {}, login=login, password=password)
+        if rate_limiter is None and self._rate_limiter is not None:
+            rate_limiter = RateLimiter(self._rate_limiter.limit, self._rate_limiter.period)
+        client._rate_limiter = rate_limiter
+        client._owns_session = False
+        client._children = {}
+        return client
+
+    def _make_headers(self, credentials=None):
+        """headers of requests made with `credentials` or those of the client"""
+        if credentials is not None:
+            headers = {'x-api-user': credentials[0], 'x-api-key': credentials[1]}
+        elif self._conf:
+            headers = {'x-api-user': self._conf['login'], 'x-api-key': self._conf['password']}
+        else:
+            headers = {}
         headers.update({'content-type': API_CONTENT_TYPE})
         return headers
 
@@ -231,27 +743,96 @@ class Habitipy:
         return super().__dir__() + list(escape_keywords(self._node.keys()))
 
     def __getattr__(self, val: str) -> Union[Any, 'Habitipy']:
-        if val in dir(super()):
-            # pylint: disable=no-member
-            return super().__getattr__(val)  # type:ignore
+        if val.startswith('__') and val.endswith('__'):
+            raise AttributeError(val)
         val = val if not val.endswith('_') else val.rstrip('_')
         val = val if '_' not in val else val.replace('_', '-')
-        return self.__class__(self._conf, apis=self._apis, current=self._current + [val])
+        return self._child(val)
 
     def __getitem__(self, val: Union[str, List[str], Tuple[str, ...]]) -> 'Habitipy':
         if isinstance(val, str):
-            return self.__class__(self._conf, apis=self._apis, current=self._current + [val])
+            return self._child(val)
         if isinstance(val, (list, tuple)):
-            current = self._current + list(val)
-            return self.__class__(self._conf, apis=self._apis, current=current)
+            cursor = self
+            for part in val:
+                cursor = cursor._child(part)
+            return cursor
         raise IndexError('{} not found in this API!'.format(val))
 
-    def _prepare_request(self, backend=requests, **kwargs):
+    def _child(self, val: str) -> 'Habitipy':
+        """get a cursor one step deeper into the API, reusing it on repeated access"""
+        child = self._children.get(val)
+        if child is not None:
+            return child
+        if not isinstance(self._node, ApiNode):
+            raise WrongPath("""Can't enter into {} with part {}""".format(self._node, val))
+        node = self._node.into(val)
+        # pylint: disable=protected-access
+        child = object.__new__(self.__class__)
+        child.__dict__.update(self.__dict__)
+        child._node = node
+        child._current = self._current + [val]
+        # closing a cursor must not close the session shared with the client
+        child._owns_session = False
+        child._children = {}
+        if len(self._children) >= CURSOR_CACHE_SIZE:
+            # cursors are made concurrently by threads of a `Batch`, which can
+            # evict the same oldest one or change the cache while it is iterated
+            try:
+                self._children.pop(next(iter(self._children)), None)
+            except (RuntimeError, StopIteration):
+                pass
+        self._children[val] = child
+        return child
+
+    def endpoint(self, method: str, uri: str) -> EndpointHandle:
+        """
+        Get a reusable callable for endpoint `method` `uri`
+
+        # Arguments
+        method : HTTP method of the endpoint (`get`, `post`, `put` or `delete`)
+        uri : URI relative to current position in the API with path params
+            in apiDoc notation
+
+        # Example
+        ```python
+        score = api.endpoint('post', '/tasks/:taskId/score/:direction')
+        for task_id in task_ids:
+            score(task_id, 'up')
+        ```
+        """
+        return self._endpoint_class(self[[part for part in uri.split('/') if part] + [method]])
+
+    def batch(self, max_workers: int = DEFAULT_POOL_SIZE) -> Batch:
+        """
+        Create a `Batch` to run many calls concurrently
+
+        Calls share the session of this `Habitipy`, so `max_workers`
+        should not exceed its `pool_size`.
+        """
+        return Batch(max_workers)
+
+    def map(
+            self,
+            calls: Iterable[Dict[str, Any]],
+            max_workers: int = DEFAULT_POOL_SIZE) -> List[BatchResult]:
+        """
+        Call this endpoint concurrently once with each dict of keyword params from `calls`
+
+        Returns `BatchResult`s in order of `calls`.
+
+        ```python
+        results = api.tasks.user.post.map([{'type': 'todo', 'text': t} for t in texts])
+        ```
+        """
+        return _batch_calls(self, calls, max_workers)
+
+    def _prepare_request(self, backend=None, **kwargs):
         uri = '/'.join([self._conf['url']] + self._current[:-1])
         if not isinstance(self._node, ApiEndpoint):
             raise ValueError('{} is not an endpoint!'.format(uri))
         method = self._node.method
-        headers = self._make_headers()
+        headers = self._make_headers(kwargs.pop('credentials', None))
 
         # allow a caller to force URI parameters when API document is incorrect
         if 'uri_params' in kwargs:
@@ -264,34 +845,297 @@ class Habitipy:
                     query[name] = kwargs.pop(name)
                 elif not param.is_optional:
                     raise TypeError('Mandatory param {} is missing'.format(name))
-        request = getattr(backend, method)
+        projection = PROJECTION_PARAMS.get((method, self._node.uri))
+        if projection:
+            _project(query, projection, kwargs.pop('fields', None))
+        if self._validation != 'off':
+            path = {
+                part[1:]: value
+                for part, value in zip(self._node.parted_uri, self._current)
+                if part.startswith(':')}
+            self._check_request(self._node, path, query, kwargs if method != 'get' else {})
+        request = getattr(backend or self._session, method)
         request_args = (uri,)
         request_kwargs = {'headers': headers, 'params': query}
         if method in ['put', 'post', 'delete']:
-            request_kwargs['data'] = json.dumps(kwargs)
+            request_kwargs['data'] = self._json_codec.dumps(kwargs)
         return request, request_args, request_kwargs
 
+    def _check_request(self, endpoint: 'ApiEndpoint', path: Dict, query: Dict, body: Dict) -> None:
+        """check request params against apiDoc according to validation mode"""
+        problems = endpoint.validate_request(path, query, body)
+        if not problems:
+            return
+        msg = 'Invalid request to {{{}}} {}: {}'.format(
+            endpoint.method, endpoint.uri, '; '.join(problems))
+        if self._validation == 'strict':
+            raise WrongData(msg)
+        warnings.warn(msg)
+
+    def _http_cache_validate(self, request_args, request_kwargs):
+        """add validators of cached response to request, return cache key and entry"""
+        if self._http_cache is None or self._node.method != 'get':
+            return None, None
+        key = self._http_cache.key(
+            request_args[0], request_kwargs.get('params'), request_kwargs['headers'])
+        entry, request_kwargs['headers'] = self._http_cache.validate(
+            key, request_kwargs['headers'])
+        return key, entry
+
+    def _cache_lookup(self, request_args, request_kwargs):
+        """
+        return response cache key, key to coalesce concurrent identical requests by
+        and fresh cached body of a GET request
+        """
+        if self._node.method != 'get':
+            return None, None, None
+        url, headers = request_args[0], request_kwargs['headers']
+        params = request_kwargs.get('params')
+        response_key = body = flight_key = None
+        if self._response_cache is not None:
+            response_key = self._response_cache.key('get', self._node.uri, url, params, headers)
+            body = self._response_cache.get(response_key)
+        if self._single_flight is not None:
+            flight_key = self._single_flight.key(url, params, headers)
+        return response_key, flight_key, body
+
+    def _response_cache_tags(self):
+        """resource tags of this endpoint for response cache invalidation"""
+        return resource_tags(self._node.method, tuple(self._node.parted_uri[API_URI_BASE_DEPTH:]))
+
+    def _response_cache_store(self, key, body):
+        """remember body of a GET response"""
+        if key is not None:
+            self._response_cache.put(key, self._response_cache_tags(), body)
+
+    def _response_cache_invalidate(self, request_kwargs):
+        """drop cached responses which could be changed by this request"""
+        if self._response_cache is not None and self._node.method != 'get':
+            self._response_cache.invalidate(self._response_cache_tags(), request_kwargs['headers'])
+
+    def _metrics_start(self):
+        """time to measure request latency from"""
+        return self._metrics.clock() if self._metrics is not None else None
+
+    def _metrics_response(self, started, api_request, response):
+        """record response to request sent at `started`"""
+        if self._metrics is None:
+            return
+        data = api_request.data or b''
+        self._metrics.observe_request(
+            self._node.method, self._node.uri, response.status, self._metrics.clock() - started,
+            len(data.encode() if isinstance(data, str) else data), len(response.body))
+
+    def _metrics_count(self, counter):
+        """increase `counter` of this endpoint"""
+        if self._metrics is not None:
+            self._metrics.count(self._node.method, self._node.uri, counter)
+
     def _request(self, request, request_args, request_kwargs):
-        res = request(*request_args, **request_kwargs)
-        if res.status_code != self._node.retcode:
-            res.raise_for_status()
+        response_key, flight_key, body = self._cache_lookup(request_args, request_kwargs)
+        if body is None:
+            fetch = partial(self._fetch, request, request_args, request_kwargs)
+            if flight_key is None:
+                body = fetch()
+            else:
+                body = self._single_flight.run(flight_key, fetch, self._time_left())
+            self._response_cache_store(response_key, body)
+        else:
+            self._metrics_count('cache_hits')
+        return self._decode(body)
+
+    def _decode(self, body):
+        """decode response body, check a sample against apiDoc and return its data"""
+        started = self._metrics_start()
+        response = self._json_codec.loads(body)
+        if started is not None:
+            self._metrics.observe_decode(
+                self._node.method, self._node.uri, self._metrics.clock() - started)
+        if self._response_validator is not None:
+            self._response_validator.check(self._node, response)
+        if self._models:
+            return wrap_response(self._node.method, self._node.uri, response['data'])
+        return response['data']
+
+    def _api_request(self, request_args, request_kwargs):
+        """make request passed through middlewares"""
+        return ApiRequest(
+            self._node, request_args[0], request_kwargs['params'],
+            request_kwargs['headers'], request_kwargs.get('data'))
+
+    def _fetch(self, request, request_args, request_kwargs):
+        """make the request and return body of the response"""
+        cache_key, cache_entry = self._http_cache_validate(request_args, request_kwargs)
+        response = self._send(
+            self._api_request(request_args, request_kwargs), partial(self._transport, request))
+        return self._response_body(response, cache_key, cache_entry, request_kwargs)
+
+    def _send(self, api_request, transport):
+        """pass request through middlewares and transport, retrying it according to policy"""
+        return retrying(partial(self._attempt, api_request, transport), self._retry_delay)
+
+    def _attempt(self, api_request, transport):
+        """pass request through middlewares and transport once"""
+        with self._attempting(api_request) as attempt:
+            attempt.response = self._pipeline.send(api_request, transport)
+        return attempt.response
+
+    @contextmanager
+    def _attempting(self, api_request):
+        """
+        set timeout of an attempt and let it through the circuit breaker,
+        then record there `response` set on the yielded object or the error raised
+        """
+        self._set_timeout(api_request)
+        self._circuit_breaker_allow()
+        attempt = SimpleNamespace(response=None)
+        try:
+            yield attempt
+        except NETWORK_ERRORS:
+            self._circuit_breaker_record(True)
+            raise
+        except BaseException:
+            self._circuit_breaker_release()
+            raise
+        self._circuit_breaker_record(attempt.response.status >= 500)
+
+    def _time_left(self):
+        """seconds left until deadline of the client or of the operation, or None"""
+        return remaining_time(self._deadline, current_deadline())
+
+    def _set_timeout(self, api_request):
+        """set timeout of request not exceeding time left, raise `DeadlineExceeded` if none"""
+        left = self._time_left()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded('Deadline has passed before request to {}'.format(
+                api_request.url))
+        api_request.timeout = cap_timeout(self._timeout, left)
+
+    def _circuit_breaker_allow(self):
+        """raise `CircuitOpen` if requests should not be sent now"""
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.allow()
+
+    def _circuit_breaker_record(self, failed):
+        """record result of a request let through the circuit breaker"""
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record(failed)
+
+    def _circuit_breaker_release(self):
+        """let another request through the circuit breaker if this one ended without result"""
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.release()
+
+    def _retry_delay(self, attempt, response, error):
+        """
+        seconds to wait before retrying the request after an attempt,
+        or None if it should not be retried
+        """
+        # pylint: disable=unused-argument
+        status = response.status if response is not None else None
+        if self._retry is None:
+            return None
+        delay = self._retry.delay(
+            self._node, attempt, status, response.headers if response is not None else None)
+        left = self._time_left()
+        if delay is None or (left is not None and delay >= left):
+            return None
+        self._metrics_count('retries')
+        return delay
+
+    def _transport(self, request, api_request):
+        """send request which passed through middlewares"""
+        if self._rate_limiter:
+            self._rate_limiter.acquire()
+        started = self._metrics_start()
+        if self._http_transport is not None:
+            response = self._http_transport.send(api_request)
+        else:
+            res = request(
+                api_request.url, timeout=api_request.timeout, **api_request.transport_kwargs())
+            response = ApiResponse(res.status_code, res.headers, res.content, res)
+        self._metrics_response(started, api_request, response)
+        if self._rate_limiter:
+            self._rate_limiter.update(response.headers, response.status)
+        return response
+
+    def _response_body(self, response, cache_key, cache_entry, request_kwargs):
+        """check response which passed through middlewares and return its body"""
+        self._response_cache_invalidate(request_kwargs)
+        if cache_entry is not None and response.status == 304:
+            self._metrics_count('cache_hits')
+            return self._http_cache.hit(cache_entry)
+        if response.status != self._node.retcode:
+            response.raise_for_status()
             msg = _("""
-            Got return code {res.status_code}, but {node.retcode} was
-            expected for {node.uri}. It may be a typo in Habitica apiDoc.
-            Please file an issue to https://github.com/HabitRPG/habitica/issues""")
+                Got return code {res.status}, but {node.retcode} was
+                expected for {node.uri}. It may be a typo in Habitica apiDoc.
+                Please file an issue to https://github.com/HabitRPG/habitica/issues""")
             msg = textwrap.dedent(msg)
-            msg = msg.replace('\n', ' ').format(res=res, node=self._node)
+            msg = msg.replace('\n', ' ').format(res=response, node=self._node)
             if self._strict:
                 raise WrongReturnCode(msg)
             warnings.warn(msg)
-        return res.json()['data']
+        if cache_key is not None:
+            self._http_cache.store(cache_key, response.headers, response.body)
+        return response.body
 
     def __call__(self, **kwargs) -> Union[Dict, List]:
+        if self._projections is not None and 'fields' not in kwargs:
+            return self._projected_call(**kwargs)
         return self._request(*self._prepare_request(**kwargs))
 
+    def _projected_call(self, projection_site=None, **kwargs):
+        """get fields of the document read at the call site before and track reads"""
+        if (self._node.method, self._node.uri) not in PROJECTION_PARAMS:
+            return self._request(*self._prepare_request(**kwargs))
+        site = projection_site or _call_site()
+        fields = self._projections.fields(site)
+        data = self._request(*self._prepare_request(fields=fields, **kwargs))
+        if not isinstance(data, dict):
+            return data
+        return self._projections.track(
+            site, data, fields, lambda: self._request(*self._prepare_request(**kwargs)))
+
+
+def _call_site() -> str:
+    """
+    name function of first frame calling into this module, like `module:Class.method`.
+    Line numbers and paths are left out, so the name stays the same when code is edited
+    or moved to another machine
+    """
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    while frame.f_back is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    code = frame.f_code
+    module = frame.f_globals.get('__name__')
+    if not module or module == '__main__':
+        module = os.path.basename(code.co_filename)
+    return '{}:{}'.format(module, getattr(code, 'co_qualname', code.co_name))
+
+
+class _CursorDoc:
+    """Renders docstring of an endpoint only when `__doc__` of a cursor is requested"""
+    def __init__(self, doc: Optional[str]) -> None:
+        self.doc = doc
+
+    def __get__(self, instance, owner=None) -> Optional[str]:
+        node = instance.__dict__.get('_node') if instance is not None else None
+        if isinstance(node, ApiEndpoint):
+            return node.render_docstring()
+        return self.doc
+
+
+Habitipy.__doc__ = _CursorDoc(Habitipy.__doc__)  # type: ignore
 
-def download_api(branch=None, timeout=None) -> str:
-    """download API documentation from _branch_ of Habitica\'s repo on Github"""
+
+def download_api(branch=None, timeout=DEFAULT_TIMEOUT) -> str:
+    """
+    download API documentation from _branch_ of Habitica\'s repo on Github,
+    waiting for connection and data no longer than `timeout`
+    """
+    if isinstance(timeout, (int, float)):
+        timeout = (timeout, timeout)
     habitica_github_api = 'https://api.github.com/repos/HabitRPG/habitica'
     if not branch:
         branch = requests.get(
@@ -299,6 +1143,9 @@ def download_api(branch=None, timeout=None) -> str:
             timeout=timeout
         ).json()['tag_name']
     curl = local['curl']['-sL', habitica_github_api + '/tarball/{}'.format(branch)]
+    if timeout:
+        # abort if connection is not made or the download stalls for the timeout
+        curl = curl['--connect-timeout', str(timeout[0]), '-Y', '1', '-y', str(timeout[1])]
     tar = local['tar'][
         'axzf', '-', '--wildcards', '*/website/server/controllers/api-v3/*', '--to-stdout']
     grep = local['grep']['@api']
@@ -315,89 +1162,340 @@ def save_apidoc(text: str) -> None:
         f.write(text)
 
 
+def read_apidoc(file_or_branch, from_github=False, save_github_version=True) -> str:
+    """read apiDoc text from file or from _branch_ of Habitica\'s repo on Github"""
+    if from_github:
+        text = download_api(file_or_branch)
+        if save_github_version:
+            save_apidoc(text)
+        return text
+    with open(file_or_branch, encoding='utf-8') as f:
+        return f.read()
+
+
+def apidoc_digest(text: str, strict=False) -> str:
+    """hash of apiDoc `text` identifying a precompiled API tree in cache"""
+    header = '{}:{}:'.format(APIDOC_PARSER_VERSION, int(bool(strict)))
+    return hashlib.sha256((header + text).encode('utf-8')).hexdigest()
+
+
+def _load_cached_api_tree() -> Tuple[Optional[str], Optional['ApiNode']]:
+    if APIDOC_CACHE_FILE is None:
+        return None, None
+    try:
+        with open(local.path(APIDOC_CACHE_FILE), 'rb') as f:
+            version, digest, tree = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError,
+            AttributeError, ImportError, IndexError, TypeError, ValueError):
+        return None, None
+    if version != APIDOC_PARSER_VERSION or not isinstance(tree, ApiNode):
+        return None, None
+    return digest, tree
+
+
+def _save_cached_api_tree(digest: str, tree: 'ApiNode') -> None:
+    if APIDOC_CACHE_FILE is None:
+        return
+    cache = local.path(APIDOC_CACHE_FILE)
+    try:
+        if not cache.dirname.exists():
+            cache.dirname.mkdir()
+        with open(cache, 'wb') as f:
+            pickle.dump((APIDOC_PARSER_VERSION, digest, tree), f, pickle.HIGHEST_PROTOCOL)
+    except OSError as error:
+        warnings.warn('Failed to save API cache: {}'.format(error))
+
+
+def _apidoc_source(from_github=False, branch=None):
+    """branch to download apiDoc from or file to read it from"""
+    if from_github:
+        return branch
+    source = local.path(APIDOC_LOCAL_FILE)
+    if not source.exists():
+        source = pkg_resources.resource_filename('habitipy', 'apidoc.txt')
+    return source
+
+
+# API trees loaded by shared_api_tree, by apiDoc source
+_SHARED_API_TREES = {}  # type: Dict[Tuple[str, bool, bool, bool], ApiNode]
+_SHARED_API_TREES_LOCK = threading.Lock()
+
+
+def shared_api_tree(from_github=False, branch=None, strict=False, lazy=False) -> 'ApiNode':
+    """
+    API tree loaded only once per process from the same apiDoc as `Habitipy` would use
+
+    The tree is shared by all clients it is passed to as `apis`,
+    so it should not be changed.
+    """
+    source = _apidoc_source(from_github, branch)
+    key = (str(source), bool(from_github), bool(strict), bool(lazy))
+    with _SHARED_API_TREES_LOCK:
+        tree = _SHARED_API_TREES.get(key)
+        if tree is None:
+            tree = _SHARED_API_TREES[key] = load_api_tree(
+                source, from_github, strict=strict, lazy=lazy)
+    return tree
+
+
+def load_api_tree(file_or_branch, from_github=False, strict=False, lazy=False) -> 'ApiNode':
+    """
+    read apiDoc and return API tree, using precompiled cache if possible
+
+    Cache is stored at `APIDOC_CACHE_FILE` and is keyed by contents of
+    apiDoc and `APIDOC_PARSER_VERSION`, so it is rebuilt automatically
+    whenever either of them changes. Set `APIDOC_CACHE_FILE` to None to disable it.
+
+    If `lazy`, cache is not used: endpoints of each top-level group are parsed
+    when it is entered for the first time, see `LazyApiNode`. This is faster
+    for short scripts which use only a few groups.
+    """
+    if lazy:
+        return lazy_api_tree(read_apidoc(file_or_branch, from_github), strict)
+    cached_digest, tree = _load_cached_api_tree()
+    text = read_apidoc(file_or_branch, from_github)
+    digest = apidoc_digest(text, strict)
+    if tree is not None and cached_digest == digest:
+        return tree
+    with warnings.catch_warnings():
+        warnings.simplefilter('error' if strict else 'ignore')
+        tree = Habitipy._make_apis_dict(  # pylint: disable=protected-access
+            parse_apidoc_text(text))
+    _save_cached_api_tree(digest, tree)
+    return tree
+
+
 def parse_apidoc(
     file_or_branch,
     from_github=False,
     save_github_version=True
 ) -> List['ApiEndpoint']:
-    """read file and parse apiDoc lines"""
-    apis = []  # type: List[ApiEndpoint]
-    regex = r'(?P<group>\([^)]*\)){0,1} *(?P<type_>{[^}]*}){0,1} *'
-    regex += r'(?P<field>[^ ]*) *(?P<description>.*)$'
-    param_regex = re.compile(r'^@apiParam {1,}' + regex)
-    success_regex = re.compile(r'^@apiSuccess {1,}' + regex)
+    """read file and parse apiDoc lines, streaming a local file"""
     if from_github:
-        text = download_api(file_or_branch)
-        if save_github_version:
-            save_apidoc(text)
-    else:
-        with open(file_or_branch, encoding='utf-8') as f:
-            text = f.read()
-    for line in text.split('\n'):
-        line = line.replace('\n', '')
-        if line.startswith('@api '):
-            if apis:
-                if not apis[-1].retcode:
-                    apis[-1].retcode = 200
-            split_line = line.split(' ')
-            assert len(split_line) >= 3
-            method = split_line[1]
-            uri = split_line[2]
-            assert method[0] == '{'
-            assert method[-1] == '}'
-            method = method[1:-1]
-            if not uri.startswith(API_URI_BASE):
-                warnings.warn(_("Wrong api url: {}").format(uri))  # noqa: Q000
-            title = ' '.join(split_line[3:])
-            apis.append(ApiEndpoint(method, uri, title))
-        elif line.startswith('@apiParam '):
-            res = next(param_regex.finditer(line)).groupdict()
-            apis[-1].add_param(**res)
-        elif line.startswith('@apiSuccess '):
-            res = next(success_regex.finditer(line)).groupdict()
-            apis[-1].add_success(**res)
-    if apis:
-        if not apis[-1].retcode:
-            apis[-1].retcode = 200
+        return parse_apidoc_text(read_apidoc(file_or_branch, from_github, save_github_version))
+    with open(file_or_branch, 'rb') as file:
+        return parse_apidoc_tokens(tokenize(file, tags=PARSED_TAGS))
+
+
+def parse_apidoc_text(
+        text: str, shared: Optional[Dict[Tuple[str, str, str], 'Param']] = None
+) -> List['ApiEndpoint']:
+    """parse apiDoc lines, reusing params of identical lines from `shared` dict if given"""
+    return parse_apidoc_tokens(tokenize(text, tags=PARSED_TAGS), shared)
+
+
+def parse_apidoc_tokens(
+        tokens: Iterable[Token],
+        shared: Optional[Dict[Tuple[str, str, str], 'Param']] = None,
+        defines: Optional[Dict[str, List[Token]]] = None) -> List['ApiEndpoint']:
+    """
+    make endpoints of apiDoc `tokens` from `habitipy.apidoc.tokenize`,
+    which need only tags of `PARSED_TAGS`
+
+    Params of `@apiDefine` blocks are added to endpoints having `@apiUse` of them,
+    wherever the blocks are, a later block of the same name replacing an earlier one.
+    Known blocks can be passed in `defines` dict, which is updated with blocks found
+    in `tokens`. `@apiIgnore` marks the next endpoint.
+    Params of identical lines are reused from `shared` dict if given.
+    Raises `ApidocError` with the line number if `tokens` make no sense.
+    """
+    apis = []  # type: List[ApiEndpoint]
+    uses = []  # type: List[Tuple[ApiEndpoint, str]]
+    # params of identical lines are shared by endpoints
+    shared = {} if shared is None else shared
+    defines = {} if defines is None else defines
+    define = None  # type: Optional[List[Token]]
+    ignore = None  # type: Optional[str]
+    for token in tokens:
+        tag = token.tag
+        if tag in PARAM_TAG_GROUPS:
+            if define is not None:
+                define.append(token)
+            elif apis:
+                apis[-1].add_token(token, shared)
+            else:
+                raise _outside_error(token)
+        elif tag == 'api':
+            apis.append(_endpoint(token, ignore))
+            ignore, define = None, None
+        elif tag == 'apiDefine':
+            define = defines[token.args[0].split(' ')[0]] = []
+        elif tag == 'apiIgnore':
+            ignore = token.args[0]
+        elif define is None and (tag in ENDPOINT_ATTR_TAGS or tag == 'apiUse'):
+            _apply_token(apis, token, uses)
+    for endpoint, name in uses:
+        for token in defines.get(name, ()):
+            endpoint.add_token(token, shared, any_retcode=True)
+    for endpoint in apis:
+        endpoint.retcode = endpoint.retcode or 200
     return apis
 
 
+def _endpoint(token: Token, ignore: Optional[str]) -> 'ApiEndpoint':
+    """endpoint of @api `token` with `ignore` hint of @apiIgnore before it"""
+    method, uri, title = token.args
+    if not uri.startswith(API_URI_BASE):
+        warnings.warn(_("Wrong api url: {}").format(uri))  # noqa: Q000
+    endpoint = ApiEndpoint(method[1:-1], uri, title)
+    endpoint.ignore = ignore
+    return endpoint
+
+
+def _apply_token(apis: List['ApiEndpoint'], token: Token, uses) -> None:
+    """set attribute of the last endpoint by `token` or remember its @apiUse in `uses`"""
+    if not apis:
+        raise _outside_error(token)
+    if token.tag == 'apiUse':
+        uses.append((apis[-1], token.args[0].strip()))
+    else:
+        setattr(apis[-1], ENDPOINT_ATTR_TAGS[token.tag], token.args[0])
+
+
+def _outside_error(token: Token) -> ApidocError:
+    return ApidocError(token.line, '@{} is outside of @api block'.format(token.tag))
+
+
 class ApiEndpoint:
     """
     Represents a single api endpoint.
+
+    Strings of endpoints are interned and identical params of different
+    endpoints are the same `Param` objects, so params should not be changed.
+    `name`, `group` and `description` are set by `@apiName`, `@apiGroup` and
+    `@apiDescription` tags and `ignore` by `@apiIgnore` tag before the endpoint.
     """
+    # pylint: disable=too-many-instance-attributes
+    __slots__ = (
+        'method', 'uri', 'parted_uri', 'title', 'params', 'retcode',
+        'name', 'group', 'description', 'ignore', '_validators')
+
     def __init__(self, method, uri, title=''):
-        self.method = method
+        self.method = sys.intern(method)
         self.uri = uri
-        self.parted_uri = uri[1:].split('/')
+        self.parted_uri = tuple(map(sys.intern, uri[1:].split('/')))
         self.title = title
-        self.params = defaultdict(dict)
+        self.params = {}  # type: Dict[str, Dict[str, Param]]
         self.retcode = None
+        self.name = None  # type: Optional[str]
+        self.group = None  # type: Optional[str]
+        self.description = None  # type: Optional[str]
+        # hint of @apiIgnore if the endpoint is not meant to be used
+        self.ignore = None  # type: Optional[str]
+        # validators compiled from params of groups, see `_validator`
+        self._validators = {}  # type: Dict[Tuple[str, ...], Callable[..., List[str]]]
+
+    def __getstate__(self):
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__ if name != '_validators'}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._validators = {}
+
+    def _add(self, group, param):
+        self.params.setdefault(sys.intern(group), {})[param.field] = param
 
-    def add_param(self, group=None, type_='', field='', description=''):
-        """parse and append a param"""
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def add_param(self, group=None, type_='', field='', description='', shared=None):
+        """parse and append a param, reusing an equal one from `shared` dict if given"""
         group = group or '(Parameter)'
         group = group.lower()[1:-1]
-        p = Param(type_, field, description)
-        self.params[group][p.field] = p
+        self._add(group, _param(shared, type_, field, description))
 
-    def add_success(self, group=None, type_='', field='', description=''):
-        """parse and append a success data param"""
+    def add_success(self, group=None, type_='', field='', description='', shared=None):
+        """parse and append a success data param, reusing one from `shared` dict if given"""
         group = group or '(200)'
         group = int(group.lower()[1:-1])
         self.retcode = self.retcode or group
         if group != self.retcode:
             raise ValueError('Two or more retcodes!')
         type_ = type_ or '{String}'
-        p = Param(type_, field, description)
-        self.params['responce'][p.field] = p
+        self._add('responce', _param(shared, type_, field, description))
+
+    def add_token(self, token, shared=None, any_retcode=False):
+        """
+        parse and append a param of @apiParam, @apiBody or @apiSuccess `token`
+        from `habitipy.apidoc.tokenize`, reusing an equal one from `shared` dict if given.
+        Raise `ApidocError` if retcode of a success param is not the one of the endpoint,
+        unless `any_retcode`
+        """
+        group, type_, field, description = token.args
+        if not field:
+            raise ApidocError(token.line, 'field of @{} is missing'.format(token.tag))
+        if token.tag == 'apiSuccess':
+            if not any_retcode:
+                self._check_retcode(token.line, group)
+            group, type_ = 'responce', type_ or '{String}'
+        else:
+            group = (group or PARAM_TAG_GROUPS[token.tag]).lower()[1:-1]
+        self._add(group, _param(shared, type_, field, description))
+
+    def _check_retcode(self, line, group):
+        try:
+            retcode = int(group[1:-1]) if group else 200
+        except ValueError as error:
+            raise ApidocError(line, 'retcode should be a number, got {}'.format(group)) from error
+        self.retcode = self.retcode or retcode
+        if retcode != self.retcode:
+            raise ApidocError(line, 'Two or more retcodes!')
 
     def __repr__(self):
         return '<@api {{{self.method}}} {self.uri} {self.title}>'.format(self=self)
 
+    def _validator(self, *groups: str) -> Callable[..., List[str]]:
+        """
+        get a function checking params of `groups` against apiDoc,
+        compiled on first use. It takes an object holding params of each group
+        and returns descriptions of problems found
+        """
+        if groups in self._validators:
+            return self._validators[groups]
+        required_body = REQUIRED_BODY_PARAMS.get((self.method, self.uri), frozenset())
+        checks = [
+            (index, tuple(param.path), param.field,
+             param.is_optional or (group == 'body' and param.name not in required_body),
+             param.name, param.compile_check(text=group in ('path', 'query')))
+            for index, group in enumerate(groups)
+            for param in self.params.get(group, {}).values()]
+
+        def validator(*values) -> List[str]:
+            problems = []
+            for index, parents, field, is_optional, name, check in checks:
+                obj = values[index]  # type: Any
+                for part in parents:
+                    obj = obj.get(part) if isinstance(obj, dict) else None
+                if not isinstance(obj, dict):
+                    continue
+                if field not in obj:
+                    if not is_optional:
+                        problems.append('{} is missing'.format(name))
+                    continue
+                problem = check(obj[field])
+                if problem:
+                    problems.append(problem)
+            return problems
+        self._validators[groups] = validator
+        return validator
+
+    def validate_request(self, path: Dict, query: Dict, body: Dict) -> List[str]:
+        """
+        check values of `path`, `query` and `body` params against apiDoc,
+        return descriptions of problems found
+        """
+        return self._validator('path', 'query', 'body')(path, query, body)
+
+    def validate_response(self, response: Any) -> List[str]:
+        """check decoded response against apiDoc success params, return problems found"""
+        return self._validator('responce')(response)
+
     def render_docstring(self):
         """make a nice docstring for ipython"""
         res = '{{{self.method}}} {self.uri} {self.title}\n'.format(self=self)
+        if self.description:
+            res += '\n' + self.description + '\n'
         if self.params:
             for group, params in self.params.items():
                 res += '\n' + group + ' params:\n'
@@ -406,53 +1504,135 @@ class ApiEndpoint:
         return res
 
 
-# TODO: fix type checking
+_uuid_regex = re.compile(
+    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+_number_regex = re.compile(r'^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+# quoted words in param description, like 'party' for groupId, are accepted instead of UUID
+_alias_regex = re.compile(r"'([\w-]+)'")
+_type_aliases = {'sring': 'string'}
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# checks of JSON values of body and responce params by apiDoc type
 _valid_types = {
     'string': lambda x: isinstance(x, str),
-    'sring': lambda x: isinstance(x, str),
-    'number': lambda x: isinstance(x, float),
-    'uuid': lambda u: isinstance(u, str) and u.replace('-', '') == uuid.UUID(u).hex
-}
+    'number': _is_number,
+    'integer': lambda x: isinstance(x, int) and not isinstance(x, bool),
+    'boolean': lambda x: isinstance(x, bool),
+    'uuid': lambda x: isinstance(x, str) and _uuid_regex.match(x) is not None,
+    'object': lambda x: isinstance(x, dict),
+    'array': lambda x: isinstance(x, list),
+    'date': lambda x: isinstance(x, str) or _is_number(x),
+}  # type: Dict[str, Callable[[Any], bool]]
+# checks of path and query params, which are sent as text
+_valid_text_types = {
+    'number': lambda x: _number_regex.match(x) is not None,
+    'integer': lambda x: x.lstrip('-').isdigit(),
+    'boolean': lambda x: x in ('true', 'false'),
+    'uuid': lambda x: _uuid_regex.match(x) is not None,
+}  # type: Dict[str, Callable[[str], bool]]
+
+
+def _as_text(value) -> str:
+    """render value of a path or query param as it is sent"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
 
 
 class Param:
     """represents param of request or responce"""
+    __slots__ = (
+        'is_optional', 'field', 'default', 'path', 'type', 'possible_values', 'description')
+
     def __init__(self, type_, field, description):
         self.is_optional = field[0] == '[' and field[-1] == ']'
-        self.field = field[1:-1] if self.is_optional else field
-        if '=' in self.field:
-            self.field, self.default = self.field.split('=')
+        field = field[1:-1] if self.is_optional else field
+        if '=' in field:
+            field, self.default = field.split('=')
         else:
             self.default = ''
-        self.field = self.field.split('.')
-        if len(self.field) > 1:
-            self.path, self.field = self.field[:-1], self.field[-1]
-        else:
-            self.field = self.field[0]
-            self.path = []
+        *path, field = map(sys.intern, field.split('.'))
+        self.field = field
+        self.path = tuple(path)
+        self.possible_values = ()
         if type_:
-            self.type = type_[1:-1] if len(type_) > 2 else type_
-            if '=' in self.type:
-                self.type, self.possible_values = self.type.split('=')
-                self.possible_values = list(map(
-                    lambda s: s if s[0] != '"' else s[1:-1],
-                    self.possible_values.split(',')))
-            else:
-                self.possible_values = []
-            self.type = self.type.lower()
+            type_ = type_[1:-1] if len(type_) > 2 else type_
+            if '=' in type_:
+                type_, possible_values = type_.split('=')
+                self.possible_values = tuple(
+                    sys.intern(s if s[0] != '"' else s[1:-1])
+                    for s in possible_values.split(','))
+            self.type = sys.intern(type_.lower())
         else:
             self.type = None
-            self.possible_values = []
         self.description = description
 
-    def validate(self, obj):
-        """check if obj has this api param"""
-        if self.path:
-            for i in self.path:
-                obj = obj[i]
-        obj = obj[self.field]
+    @property
+    def name(self) -> str:
+        """full name of the param, like `challenge.groupId`"""
+        return '.'.join(self.path + (self.field,))
 
-        raise NotImplementedError('Validation is not implemented yet')
+    def compile_check(self, text=False) -> Callable[[Any], Optional[str]]:
+        """
+        make a function checking a value of this param and returning a problem or None
+
+        `text` params, i.e. path and query ones, are checked as they are sent in URL.
+        """
+        # pylint: disable=too-many-locals
+        type_ = (self.type or '').strip()
+        type_ = _type_aliases.get(type_, type_)
+        is_array = type_.endswith('[]')
+        type_ = type_[:-2] if is_array else type_
+        if text and is_array:
+            return lambda value: None
+        check_type = (_valid_text_types if text else _valid_types).get(type_)
+        aliases = frozenset(_alias_regex.findall(self.description)) if type_ == 'uuid' else ()
+        numeric = type_ in ('number', 'integer')
+        allowed = frozenset(v.strip().strip('"\'') for v in self.possible_values)
+        if numeric:
+            try:
+                allowed = frozenset(map(float, allowed))
+            except ValueError:
+                allowed = frozenset()
+        name, expected = self.name, self.type
+
+        def check(value):
+            if text:
+                value = _as_text(value)
+            if value in aliases:
+                return None
+            if check_type is not None and not check_type(value):
+                return '{} should be of type {}, got {!r}'.format(name, expected, value)
+            if allowed and (float(value) if numeric else _as_text(value)) not in allowed:
+                return '{} should be one of {}, got {!r}'.format(
+                    name, ', '.join(sorted(map(str, allowed))), value)
+            return None
+        if not is_array:
+            return check
+
+        def check_array(value):
+            if not isinstance(value, list):
+                return '{} should be an array, got {!r}'.format(name, value)
+            for item in value:
+                problem = check(item)
+                if problem:
+                    return problem
+            return None
+        return check_array
+
+    def validate(self, obj) -> Optional[str]:
+        """check if obj has this api param, return description of a problem or None"""
+        for part in self.path:
+            if not isinstance(obj, dict) or part not in obj:
+                return None
+            obj = obj[part]
+        if not isinstance(obj, dict) or self.field not in obj:
+            return None if self.is_optional else '{} is missing'.format(self.name)
+        return self.compile_check()(obj[self.field])
 
     def render_docstring(self):
         """make a nice docstring for ipython"""
@@ -463,3 +1643,14 @@ class Param:
         type_ = 'of type "' + str(self.type) + '"'
         res = ' '.join([opt, '"' + self.field + '"', default, type_, can_be, '\n'])
         return res.replace('  ', ' ').lstrip()
+
+
+def _param(shared, type_, field, description) -> Param:
+    """`Param` of an apiDoc line, taken from `shared` dict of params by line if possible"""
+    if shared is None:
+        return Param(type_, field, description)
+    key = (type_, field, description)
+    param = shared.get(key)
+    if param is None:
+        param = shared[key] = Param(type_, field, description)
+    return param
@@ -0,0 +1,135 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    streaming tokenizer of apiDoc comments
+"""
+import codecs
+import re
+from functools import partial
+from typing import AbstractSet, Any, Iterator, NamedTuple, Optional, Tuple
+
+# characters read from file-like sources at once
+CHUNK_SIZE = 1 << 16
+# tags whose arguments are `(group) {type} field description`, like @apiParam
+FIELD_TAGS = frozenset(('apiParam', 'apiBody', 'apiSuccess', 'apiError', 'apiHeader'))
+# arguments of FIELD_TAGS, all of them optional
+_field_regex = re.compile(r'(\([^)]*\))? *({[^}]*})? *([^ ]*) *(.*)')
+
+
+class ApidocError(ValueError):
+    """apiDoc can't be parsed"""
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__('line {}: {}'.format(line, message))
+        self.line = line
+
+
+class Token(NamedTuple):
+    """
+    apiDoc tag with its arguments
+
+    Arguments are split according to the tag:
+
+    - `api`: method in braces, URI and title, like `('{get}', '/api/v3/user', 'Get user')`
+    - `FIELD_TAGS`: group in parentheses or None, type in braces or None,
+      field and description, like `('(Body)', '{String}', '[text]', 'Text of the task')`
+    - other tags: the rest of the line, like `('GetUser',)` for @apiName
+    """
+    line: int
+    tag: str
+    args: Tuple[Any, ...]
+
+
+# makes `Token` of a tuple without calling `Token.__new__` written in Python
+_token = partial(tuple.__new__, Token)
+
+
+def _chunks(source) -> Iterator[Any]:
+    """chunks of str or bytes read from `source`"""
+    if isinstance(source, (str, bytes)):
+        yield source
+        return
+    read = getattr(source, 'read', None)
+    if read is None:
+        yield from source
+        return
+    chunk = read(CHUNK_SIZE)
+    while chunk:
+        yield chunk
+        chunk = read(CHUNK_SIZE)
+
+
+def _text_chunks(source) -> Iterator[str]:
+    """chunks of whole lines of `source`, decoding bytes as UTF-8"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    tail = ''
+    for chunk in _chunks(source):
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        end = chunk.rfind('\n') + 1
+        if end:
+            yield tail + chunk[:end]
+            tail = chunk[end:]
+        else:
+            tail += chunk
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def tokenize(
+        source, first_line: int = 1, tags: Optional[AbstractSet[str]] = None) -> Iterator[Token]:
+    """
+    Tokens of apiDoc `source`, read in a single pass
+
+    `source` can be a string, bytes, a file-like object opened in text or binary
+    mode or an iterable of string or bytes chunks, which are not read before
+    tokens are needed. Lines not starting with an `@api` tag are skipped,
+    as well as lines of tags not in `tags` if it is given.
+    Raises `ApidocError` with the line number if a line can't be tokenized.
+
+    # Arguments
+    source : apiDoc text
+    first_line : number of the first line of `source`, for blocks of a larger text
+    tags : names of tags to tokenize, like `{'api', 'apiParam'}`, all of them by default
+
+    # Example
+    ```python
+    with open('apidoc.txt', 'rb') as apidoc:
+        for token in tokenize(apidoc):
+            if token.tag == 'api':
+                print(token.line, *token.args)
+    ```
+    """
+    number = first_line
+    for text in _text_chunks(source):
+        # the number of the last, unfinished line of a chunk is the first one of the next chunk
+        for number, line in enumerate(text.split('\n'), number):
+            if not line.startswith('@api'):
+                continue
+            tag, _, rest = line.rstrip('\r').partition(' ')
+            tag = tag[1:]
+            if tags is not None and tag not in tags:
+                continue
+            rest = rest.lstrip(' ')
+            if tag in FIELD_TAGS:
+                args = _field_args(rest)  # type: Tuple[Any, ...]
+            elif tag == 'api':
+                args = _api_args(number, rest)
+            else:
+                args = (rest,)
+            yield _token((number, tag, args))
+
+
+def _field_args(rest):
+    """group, type, field and description of a tag of `FIELD_TAGS`"""
+    return _field_regex.match(rest).groups()
+
+
+def _api_args(number: int, rest: str) -> Tuple[str, str, str]:
+    """method, URI and title of @api tag on line `number`"""
+    parts = rest.split(' ', 2)
+    if len(parts) < 2 or not parts[1]:
+        raise ApidocError(number, '@api should be followed by {method} and URI')
+    method = parts[0]
+    if len(method) < 3 or method[0] != '{' or method[-1] != '}':
+        raise ApidocError(number, 'method of @api should be in braces, got {!r}'.format(method))
+    return method, parts[1], parts[2] if len(parts) > 2 else ''
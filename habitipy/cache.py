@@ -0,0 +1,305 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    caches of API responses
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import (
+    Any, Awaitable, Callable, Dict, FrozenSet, Mapping, NamedTuple, Optional, Tuple)
+
+from .deadline import DeadlineExceeded
+
+# number of responses kept by a cache
+DEFAULT_MAX_ENTRIES = 256
+
+
+def credentials_digest(headers: Mapping[str, str]) -> str:
+    """hash of credentials from request `headers`, so they are not kept in cache keys"""
+    creds = '{}:{}'.format(headers.get('x-api-user', ''), headers.get('x-api-key', ''))
+    return hashlib.sha256(creds.encode('utf-8')).hexdigest()
+
+
+class HttpCacheEntry(NamedTuple):
+    """Validators and body of a cached response"""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: bytes
+
+
+class HttpCache:
+    """
+    HTTP conditional request cache for GET endpoints
+
+    Keeps `ETag` and `Last-Modified` validators and bodies of responses
+    for each URL, query and credentials. Next request for the same resource
+    is sent with `If-None-Match`/`If-Modified-Since` headers and the
+    stored body is used when the server answers `304 Not Modified`.
+    Bodies are decoded again on each hit, so results can be safely modified.
+
+    Thread-safe. Validators and bodies are kept per credentials, so one cache can serve
+    `Habitipy` objects of several users.
+
+    # Arguments
+    max_entries : number of responses to keep, least recently used are dropped first
+
+    # Example
+    ```python
+    from habitipy import Habitipy
+    from habitipy.cache import HttpCache
+    cache = HttpCache()
+    api = Habitipy(conf, http_cache=cache)
+    api.user.get()
+    api.user.get()  # served from cache if user was not changed
+    print(cache.hits, cache.misses)
+    ```
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # type: OrderedDict[Tuple, HttpCacheEntry]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params: Optional[Mapping[str, Any]], headers: Mapping[str, str]) -> Tuple:
+        """make cache key of a request"""
+        query = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return (url, query, credentials_digest(headers))
+
+    def validate(
+            self, key: Tuple,
+            headers: Dict[str, str]) -> Tuple[Optional[HttpCacheEntry], Dict[str, str]]:
+        """return cached entry for `key` and request `headers` with its validators added"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, headers
+            self._entries.move_to_end(key)
+        headers = dict(headers)
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return entry, headers
+
+    def hit(self, entry: HttpCacheEntry) -> bytes:
+        """count a `304 Not Modified` response and return the cached body"""
+        with self._lock:
+            self.hits += 1
+        return entry.body
+
+    def store(self, key: Tuple, headers: Mapping[str, str], body: bytes) -> None:
+        """count a full response and remember it if it has validators"""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        with self._lock:
+            self.misses += 1
+            if not etag and not last_modified:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = HttpCacheEntry(etag, last_modified, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """forget all responses"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# seconds for which ResponseCache serves a response without asking the server
+DEFAULT_TTL = 30.0
+# segment of API paths denoting documents of the authenticated user (`/user`, `/tasks/user`)
+USER_SEGMENT = 'user'
+
+
+@lru_cache(maxsize=None)
+def resource_tags(method: str, parted_uri: Tuple[str, ...]) -> FrozenSet[str]:
+    """
+    get invalidation tags of an endpoint from its path relative to API base
+
+    A GET endpoint is tagged with its top-level group (`tasks` for `/tasks/:taskId`)
+    and with `user` if it returns documents of the authenticated user (`/tasks/user`).
+    A mutating endpoint is tagged with its top-level group and with `user`,
+    as any change made by the user can change the user's document too.
+    Cached GET responses sharing a tag with a mutating call are invalidated by it.
+    """
+    tags = {parted_uri[0]} if parted_uri else set()
+    if method != 'get' or USER_SEGMENT in parted_uri:
+        tags.add(USER_SEGMENT)
+    return frozenset(tags)
+
+
+class ResponseCacheEntry(NamedTuple):
+    """Cached response of ResponseCache"""
+    expires: float
+    tags: FrozenSet[str]
+    body: bytes
+
+
+class ResponseCache:
+    """
+    In-process cache of GET responses with time-to-live and automatic invalidation
+
+    Responses are kept for `ttl` seconds for each endpoint, URL, query and credentials.
+    POST, PUT and DELETE calls invalidate cached responses of the same credentials
+    sharing a resource tag with them (see `resource_tags`): e.g. scoring a task with
+    `POST /tasks/:taskId/score/:direction` invalidates `/tasks/user` and `/user`.
+    Bodies are decoded again on each hit, so results can be safely modified.
+
+    Thread-safe. Entries are kept per credentials, so `Habitipy` objects of different users
+    can share one cache without seeing responses of each other.
+
+    # Arguments
+    ttl : seconds to serve a response from cache
+    max_entries : number of responses to keep, least recently used are dropped first
+    clock : monotonic clock, `time.monotonic` by default
+
+    # Example
+    ```python
+    from habitipy import Habitipy
+    from habitipy.cache import ResponseCache
+    api = Habitipy(conf, response_cache=ResponseCache(ttl=60))
+    api.user.get()
+    api.user.get()  # no request is made
+    api.tasks[tid].score['up'].post()
+    api.user.get()  # user is requested again
+    ```
+    """
+    def __init__(
+            self,
+            ttl: float = DEFAULT_TTL,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()  # type: OrderedDict[Tuple, ResponseCacheEntry]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+            method: str, uri: str, url: str,
+            params: Optional[Mapping[str, Any]], headers: Mapping[str, str]) -> Tuple:
+        """make cache key of a request to endpoint `method` `uri`"""
+        query = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return (credentials_digest(headers), method, uri, url, query)
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        """return body of a fresh cached response or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.body
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, tags: FrozenSet[str], body: bytes) -> None:
+        """remember response `body` with resource `tags`"""
+        with self._lock:
+            self._entries[key] = ResponseCacheEntry(self._clock() + self.ttl, tags, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tags: FrozenSet[str], headers: Mapping[str, str]) -> None:
+        """drop responses for credentials from `headers` sharing any of resource `tags`"""
+        creds = credentials_digest(headers)
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if key[0] == creds and not tags.isdisjoint(entry.tags)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """forget all responses"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SingleFlight:
+    """
+    Coalesces identical GET requests in flight
+
+    While a request for some URL, query and credentials is in flight, other threads
+    or coroutines making the same request wait for it and share its response
+    instead of sending their own. Callers decode the shared body separately,
+    so results can be safely modified. Errors are shared too.
+
+    Thread-safe. Only `Habitipy` objects sharing one instance coalesce their requests,
+    and requests made with different credentials are never coalesced.
+
+    # Example
+    ```python
+    from concurrent.futures import ThreadPoolExecutor
+    from habitipy import Habitipy
+    from habitipy.cache import SingleFlight
+    flight = SingleFlight()
+    apis = [Habitipy(conf, single_flight=flight) for _ in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        users = list(pool.map(lambda api: api.user.get(), apis))  # one request is made
+    ```
+    """
+    key = staticmethod(HttpCache.key)
+
+    def __init__(self) -> None:
+        self.shared = 0
+        self._calls = {}  # type: Dict[Tuple, Future]
+        self._tasks = {}  # type: Dict[Tuple, asyncio.Future]
+        self._lock = threading.Lock()
+
+    def run(self, key: Tuple, func: Callable[[], bytes], timeout: Optional[float] = None) -> bytes:
+        """
+        call `func` unless a call for `key` is in flight, return its result.
+        Raise `DeadlineExceeded` if the call in flight takes more than `timeout` seconds
+        """
+        call = Future()  # type: Future
+        with self._lock:
+            waiting = self._calls.setdefault(key, call)
+            if waiting is not call:
+                self.shared += 1
+        if waiting is not call:
+            try:
+                return waiting.result(None if timeout is None else max(timeout, 0))
+            except FutureTimeoutError:
+                raise DeadlineExceeded('Deadline has passed waiting for the same request') from None
+        try:
+            call.set_result(func())
+        except BaseException as error:
+            call.set_exception(error)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+    async def run_async(self, key: Tuple, func: Callable[[], Awaitable[bytes]]) -> bytes:
+        """await `func()` unless a call for `key` is in flight on this loop, return its result"""
+        key = (id(asyncio.get_running_loop()),) + key
+        task = self._tasks.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = self._tasks[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # one caller being cancelled should not cancel the request for others
+        return await asyncio.shield(task)
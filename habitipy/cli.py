@@ -9,17 +9,22 @@ import logging
 import os
 import json
 import uuid
+import sys
 import time
 from bisect import bisect
 from collections.abc import Mapping
 from collections import defaultdict
 from itertools import chain
 from textwrap import dedent
-from typing import List, Union, Dict, Any  # pylint: disable=unused-import
+from typing import List, Union, Dict, Any, Optional, Tuple  # pylint: disable=unused-import
 import pkg_resources
 from plumbum import local, cli, colors
 import requests
 from .api import Habitipy
+from .cache import ResponseCache
+from .ratelimit import RateLimiter
+from .deadline import Deadline, DeadlineExceeded
+from .retry import CircuitBreaker, RetryPolicy
 from .util import assert_secure_file, secure_filestore
 from .util import get_translation_functions, get_translation_for
 from .util import prettify
@@ -172,6 +177,7 @@ class Content(Mapping):
         """get content from server or cache"""
         if Content._cache and not self._rebuild_cache:
             return Content._cache
+        codec = self._api._json_codec  # pylint: disable=protected-access
         if not os.path.exists(CONTENT_JSON) or self._rebuild_cache:
             content_endpoint = self._api.content.get
             # pylint: disable=protected-access
@@ -183,14 +189,14 @@ class Content(Mapping):
                     Content._lang_from_locale())
                 if lang in server_lang.possible_values
             ), {}))  # default
-            with open(CONTENT_JSON, 'w', encoding='utf-8') as f:
-                json.dump(Content._cache, f)
+            with open(CONTENT_JSON, 'wb') as f:
+                f.write(codec.dumps(Content._cache))
             return Content._cache
         try:
-            with open(CONTENT_JSON, encoding='utf-8') as f:
-                Content._cache = json.load(f)
+            with open(CONTENT_JSON, 'rb') as f:
+                Content._cache = codec.loads(f.read())
             return Content._cache
-        except JSONDecodeError:
+        except ValueError:  # JSONDecodeError of any codec
             self._rebuild_cache = True
             return self._get()
 
@@ -217,16 +223,48 @@ class Content(Mapping):
 class ApplicationWithApi(ConfiguredApplication):
     """Application with configured Habitica API"""
     api = None  # type: Habitipy
+    # shared by all commands run by one `habitipy` process, so a command invoking
+    # another one to show its results does not request unchanged data again
+    response_cache = None  # type: Optional[ResponseCache]
+    # fields of the user document needed by the command, all by default
+    USER_FIELDS = ()  # type: Tuple[str, ...]
+    deadline = cli.SwitchAttr(
+        ['--deadline'], argtype=float, default=None, argname='SECONDS',
+        help=_("Stop making requests SECONDS after start"))  # noqa: Q000
 
     def main(self, *_args):
         super().main()
-        self.api = Habitipy(self.config)
+        self.api = Habitipy(
+            self.config, rate_limiter=RateLimiter(),
+            response_cache=ApplicationWithApi.response_cache,
+            retry=RetryPolicy(), circuit_breaker=CircuitBreaker(),
+            deadline=Deadline(self.deadline) if self.deadline else None)
+
+    @classmethod
+    def run(cls, argv=None, exit=True):  # pylint: disable=redefined-builtin
+        """
+        run the command, exiting with status 1 if its deadline has passed.
+        Instance returned with `exit=False` is None in that case
+        """
+        try:
+            return super().run(argv, exit=exit)
+        except DeadlineExceeded:
+            logging.getLogger(cls.__module__ + '.' + cls.__qualname__).error(
+                _('Deadline has passed, stopping'))
+            if exit:
+                sys.exit(1)
+            return None, 1
+
+    def get_user(self):
+        """get fields of the user document listed in `USER_FIELDS`"""
+        return self.api.user.get(fields=self.USER_FIELDS)
 
 
 class HabiticaCli(ConfiguredApplication):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("tools and library for Habitica restful API")  # noqa: Q000
     VERSION = pkg_resources.get_distribution('habitipy').version
     def main(self):
+        ApplicationWithApi.response_cache = ResponseCache()
         if self.nested_command:
             return
         super().main()
@@ -236,10 +274,11 @@ class HabiticaCli(ConfiguredApplication):  # pylint: disable=missing-class-docst
 @HabiticaCli.subcommand('status')
 class Status(ApplicationWithApi):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Show HP, XP, GP, and more")  # noqa: Q000
+    USER_FIELDS = ('stats', 'items', 'party')
 
     def main(self):
         super().main()
-        user = self.api.user.get()
+        user = self.get_user()
         for key in ['hp', 'mp', 'exp']:
             user['stats'][key] = round(user['stats'][key])
         user['stats']['class'] = _(user['stats']['class']).capitalize()
@@ -408,9 +447,11 @@ class Pets(ApplicationWithApi):
 @Pets.subcommand('list')
 class ListPets(Pets):
     """Lists all pets from the inventory."""
+    USER_FIELDS = ('items.pets', 'items.mounts', 'items.eggs', 'items.hatchingPotions')
+
     def main(self):  # pylint: disable=too-many-branches
         super().main()
-        user = self.api.user.get()
+        user = self.get_user()
         print(_('Pets:'))
 
         color_specifier = self.color_specifier
@@ -457,9 +498,11 @@ class ListPets(Pets):
 @Pets.subcommand('feed')
 class FeedPet(Pets):
     """Feeds a pet or pets with specified food."""
+    USER_FIELDS = ('items.pets', 'items.mounts')
     sleep_time = cli.SwitchAttr(
-        ['-S', '--sleep-time'], argtype=int, default=1,
-        help=_('Time to wait between feeding each pet to avoid overloading the server'))  # pylint: disable=line-too-long
+        ['-S', '--sleep-time'], argtype=int, default=0,
+        help=_("Additional time to wait between feeding each pet. "  # noqa: Q000
+               "Requests are paced according to server's rate limit anyway"))  # noqa: Q000
     maximum_food = cli.SwitchAttr(
         ['-M', '--maxmimum-food'], argtype=int, default=10,
         help=_('Maximum amount of food to feed a pet')
@@ -472,9 +515,10 @@ class FeedPet(Pets):
             return
 
         food = food[0]
-        user = self.api.user.get()
+        user = self.get_user()
         pets = user['items']['pets']
         mounts = user['items']['mounts']
+        feed = self.api.endpoint('post', '/user/feed/:pet/:food')
 
         color_specifier = self.color_specifier
         if color_specifier:
@@ -494,7 +538,7 @@ class FeedPet(Pets):
             if food_needed > 0 and pet not in mounts:
                 food_amount = min(food_needed, self.maximum_food)
                 print(_(f'feeding {food_amount} {food} to {color} {pettype}'))
-                response = self.api.user.feed[pet][food].post(uri_params={
+                response = feed(pet, food, uri_params={
                     'amount': food_amount,
                 })
                 print(_(f'   new fullness: {self.get_full_percent(response)}%'))
@@ -506,9 +550,11 @@ class FeedPet(Pets):
 @Pets.subcommand('hatch')
 class HatchPet(Pets):
     """Hatches pets with eggs when possible."""
+    USER_FIELDS = ('items.pets', 'items.eggs', 'items.hatchingPotions')
     sleep_time = cli.SwitchAttr(
-        ['-S', '--sleep-time'], argtype=int, default=1,
-        help=_('Time to wait between feeding each pet to avoid overloading the server'))  # pylint: disable=line-too-long
+        ['-S', '--sleep-time'], argtype=int, default=0,
+        help=_("Additional time to wait between feeding each pet. "  # noqa: Q000
+               "Requests are paced according to server's rate limit anyway"))  # noqa: Q000
     maximum_food = cli.SwitchAttr(
         ['-M', '--maxmimum-food'], argtype=int, default=10,
         help=_('Maximum amount of food to feed a pet')
@@ -516,8 +562,9 @@ class HatchPet(Pets):
 
     def main(self):
         super().main()
-        user = self.api.user.get()
+        user = self.get_user()
         pets = user['items']['pets']
+        hatch = self.api.endpoint('post', '/user/hatch/:egg/:hatchingPotion')
 
         color_specifier = self.color_specifier
         if color_specifier:
@@ -536,7 +583,7 @@ class HatchPet(Pets):
 
             if self.is_hatchable(user, pettype, color):
                 print(_(f'hatching {color} {pettype}'))
-                self.api.user.hatch[pettype][color].post()
+                hatch(pettype, color)
                 time.sleep(self.sleep_time)
             else:
                 print(_(f'NOT hatching {color} {pettype}'))
@@ -546,10 +593,11 @@ class HatchPet(Pets):
 class Food(ApplicationWithApi):
     """Lists food from the inventory."""
     DESCRIPTION = _('List inventory food and their quantities available')
+    USER_FIELDS = ('items.food',)
 
     def main(self):
         super().main()
-        user = self.api.user.get()
+        user = self.get_user()
         food_list = user['items']['food']
         food_list_keys = sorted(food_list, key=lambda x: food_list[x])
         for food in food_list_keys:
@@ -566,8 +614,9 @@ class Cast(ApplicationWithApi):
         help=_("Number of times to cast the spell.")
     )  # noqa: Q000
     sleep_time = cli.SwitchAttr(
-        ['-S', '--sleep-time'], argtype=int, default=1,
-        help=_("Time to wait between each cast to avoid overloading the server"))  # noqa: Q000
+        ['-S', '--sleep-time'], argtype=int, default=0,
+        help=_("Additional time to wait between each cast. "  # noqa: Q000
+               "Requests are paced according to server's rate limit anyway"))  # noqa: Q000
 
     def main(self, *_arguments):
         super().main()
@@ -578,10 +627,11 @@ class CastNoArguments(Cast):
     def main(self, *arguments):
         super().main()
         spell = arguments[0]
+        cast = self.api.endpoint('post', '/user/class/cast/:spellId')
 
         for _i in range(self.cast_count):
             print(_(f"casting {spell}..."))
-            _response = self.api.user["class"].cast[spell].post()
+            _response = cast(spell)
             time.sleep(self.sleep_time)
 
 
@@ -604,11 +654,10 @@ class CastOnTask(Cast):
             self.log.error(_("selection number is too high"))
             return
 
+        cast = self.api.endpoint('post', '/user/class/cast/:spellId')
         for _i in range(self.cast_count):
             print(_(f"casting {spell}..."))
-            self.api.user["class"].cast[spell].post(uri_params = {
-                'targetId': tasks[number-1]['id'],
-            })
+            cast(spell, targetId=tasks[number-1]['id'])
             time.sleep(self.sleep_time)
 
 
@@ -848,11 +897,15 @@ class TasksChange(ApplicationWithApi):
         ['--dry-run', '--noop'],
         help=_("If passed, won't actually change anything on habitipy server"),  # noqa: Q000
         default=False)
+    jobs = cli.SwitchAttr(
+        ['-j', '--jobs'], argtype=int, default=1,
+        help=_("Number of tasks to change at the same time"))  # noqa: Q000
     more_tasks = []  # type: List[Dict[str, Any]]
     ids_can_overlap = False
     NO_TASK_ID = _("No task_ids found!")  # noqa: Q000
     TASK_ID_INVALID = _("Task id {} is invalid")  # noqa: Q000
     PARSED_TASK_IDS = _("Parsed task ids {}")  # noqa: Q000
+    TASK_CHANGE_FAILED = _("Failed to change task {}: {}")  # noqa: Q000
     def main(self, *task_ids: TaskId):  # type: ignore
         super().main()
         task_id = []  # type: List[Union[str,int]]
@@ -890,14 +943,30 @@ class TasksChange(ApplicationWithApi):
         idstr = ' '.join(self.changing_tasks.keys())
         self.log.info(self.PARSED_TASK_IDS.format(idstr))  # noqa: Q000
         self.tasks = self.api.tasks
+        self.score_task = self.api.endpoint('post', '/tasks/:taskId/score/:direction')
+        self.delete_task = self.api.endpoint('delete', '/tasks/:taskId')
         if not self.ids_can_overlap:
             changing_tasks_ids = list(set(changing_tasks_ids))
-        for tid in changing_tasks_ids:
+        failed = self.change(changing_tasks_ids)
+        self.domain_print()
+        return 1 if failed else None
+
+    def change(self, changing_tasks_ids: List[str]) -> bool:
+        """do self.op on tasks, `jobs` at a time, and report results; True if any failed"""
+        with self.api.batch(max_workers=self.jobs) as batch:
             if not self.noop:
-                self.op(tid)
+                for tid in changing_tasks_ids:
+                    batch.add(self.op, tid)
+        errors = [error for _result, error in batch.results] or [None] * len(changing_tasks_ids)
+        failed = False
+        for tid, error in zip(changing_tasks_ids, errors):
+            if error:
+                self.log.error(self.TASK_CHANGE_FAILED.format(tid, error))
+                failed = True
+                continue
             res = self.log_op(tid)
             print(prettify(res))
-        self.domain_print()
+        return failed
 
     def validate(self, task):  # pylint: disable=unused-argument
         """check if task is valid for the operation"""
@@ -957,7 +1026,7 @@ class HabitsAdd(ApplicationWithApi):  # pylint: disable=missing-class-docstring
 class HabitsDelete(HabitsChange):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Delete a habit with task_id")  # noqa: Q000
     def op(self, tid):
-        self.tasks[tid].delete()
+        self.delete_task(tid)
 
     def log_op(self, tid):
         return _("Deleted habit {text}").format(**self.changing_tasks[tid])  # noqa: Q000
@@ -967,7 +1036,7 @@ class HabitsDelete(HabitsChange):  # pylint: disable=missing-class-docstring
 class HabitsUp(HabitsChange):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Up (+) a habit with task_id")  # noqa: Q000
     def op(self, tid):
-        self.tasks[tid].score['up'].post()
+        self.score_task(tid, 'up')
 
     def validate(self, task):
         return task['up']
@@ -980,7 +1049,7 @@ class HabitsUp(HabitsChange):  # pylint: disable=missing-class-docstring
 class HabitsDown(HabitsChange):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Down (-) a habit with task_id")  # noqa: Q000
     def op(self, tid):
-        self.tasks[tid].score['down'].post()
+        self.score_task(tid, 'down')
 
     def validate(self, task):
         return task['down']
@@ -1000,7 +1069,7 @@ class DailysChange(TasksChange):  # pylint: disable=missing-class-docstring,abst
 class DailysUp(DailysChange):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Check a dayly with task_id")  # noqa: Q000
     def op(self, tid):
-        self.tasks[tid].score['up'].post()
+        self.score_task(tid, 'up')
 
     def log_op(self, tid):
         return _("Completed daily {text}").format(**self.changing_tasks[tid])  # noqa: Q000
@@ -1010,7 +1079,7 @@ class DailysUp(DailysChange):  # pylint: disable=missing-class-docstring
 class DailyDown(DailysChange):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Uncheck a daily with task_id")  # noqa: Q000
     def op(self, tid):
-        self.tasks[tid].score['down'].post()
+        self.score_task(tid, 'down')
 
     def log_op(self, tid):
         return _("Unchecked daily {text}").format(**self.changing_tasks[tid])  # noqa: Q000
@@ -1026,7 +1095,7 @@ class TodosChange(TasksChange):  # pylint: disable=missing-class-docstring,abstr
 class TodosUp(TodosChange):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Check a todo with task_id")  # noqa: Q000
     def op(self, tid):
-        self.tasks[tid].score['up'].post()
+        self.score_task(tid, 'up')
 
     def log_op(self, tid):
         return _("Completed todo {text}").format(**self.changing_tasks[tid])  # noqa: Q000
@@ -1036,7 +1105,7 @@ class TodosUp(TodosChange):  # pylint: disable=missing-class-docstring
 class TodosDelete(TodosChange):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Delete a todo with task_id")  # noqa: Q000
     def op(self, tid):
-        self.tasks[tid].delete()
+        self.delete_task(tid)
 
     def log_op(self, tid):
         return _("Deleted todo {text}").format(**self.changing_tasks[tid])  # noqa: Q000
@@ -1077,14 +1146,15 @@ class RewardsBuy(TasksChange):  # pylint: disable=missing-class-docstring
     def main(self, *reward_id: RewardId):
         ApplicationWithApi.main(self)
         self.more_tasks = get_additional_rewards(self.api)
+        self.buy = self.api.endpoint('post', '/user/buy/:key')
         super().main(*reward_id)
 
     def op(self, tid):
         t = self.changing_tasks[tid]
         if t['type'] != 'rewards':
-            self.api.user.buy[t['key']].post()
+            self.buy(t['key'])
         else:
-            self.tasks[tid].score['up'].post()
+            self.score_task(tid, 'up')
 
     def log_op(self, tid):
         return _("Bought reward {text}").format(**self.changing_tasks[tid])  # noqa: Q000
@@ -1145,11 +1215,12 @@ class Server(ApplicationWithApi):  # pylint: disable=missing-class-docstring
 @HabiticaCli.subcommand('spells')
 class Spells(ApplicationWithApi):  # pylint: disable=missing-class-docstring
     DESCRIPTION = _("Prints all available spells")  # noqa: Q000
+    USER_FIELDS = ('stats',)
     def main(self):
         if self.nested_command:
             return
         super().main()
-        user = self.api.user.get()
+        user = self.get_user()
         content = Content(self.api)
         user_level = user['stats']['lvl']
         if user_level < 10:
@@ -0,0 +1,100 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    time budgets of operations spanning many requests
+"""
+import contextvars
+import time
+from typing import Callable, Optional, Tuple
+
+_CURRENT = contextvars.ContextVar(
+    'habitipy_deadline', default=None)  # type: contextvars.ContextVar[Optional[Deadline]]
+
+
+class DeadlineExceeded(TimeoutError):
+    """time budget of the operation is spent"""
+
+
+class Deadline:
+    """
+    Time budget of an operation made of many requests
+
+    Within `with` block of a deadline, each request made by `Habitipy` or
+    `HabitipyAsync` waits for connection and response no longer than the time left,
+    and is not retried if the time left is shorter than the wait before the retry.
+    When the time is over, requests raise `DeadlineExceeded` without being sent.
+    Calls of `Batch`, `map` and `gather` started within the block follow the deadline
+    too. Calls which have not started when it expires are cancelled.
+
+    Deadlines can be nested: the inner one can not end later than the outer one.
+
+    # Arguments
+    seconds : time budget
+    clock : function returning time in seconds, `time.monotonic` by default
+
+    # Example
+    ```python
+    from habitipy.deadline import Deadline, DeadlineExceeded
+    try:
+        with Deadline(60):
+            for tid in task_ids:
+                api.tasks[tid].score['up'].post()
+    except DeadlineExceeded:
+        print('not all tasks were scored in a minute')
+    ```
+    """
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self.expires = clock() + seconds
+        self._outer = None  # type: Optional[Deadline]
+        self._tokens = []  # type: list
+
+    def remaining(self) -> float:
+        """seconds left, not less than 0"""
+        left = max(0.0, self.expires - self._clock())
+        if self._outer is not None:
+            left = min(left, self._outer.remaining())
+        return left
+
+    @property
+    def expired(self) -> bool:
+        """whether the time is over"""
+        return self.remaining() <= 0
+
+    def check(self) -> None:
+        """raise `DeadlineExceeded` if the time is over"""
+        if self.expired:
+            raise DeadlineExceeded('Deadline of the operation has passed')
+
+    def __enter__(self) -> 'Deadline':
+        outer = _CURRENT.get()
+        if outer is not None and outer is not self:
+            self._outer = outer
+        self._tokens.append(_CURRENT.set(self))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _CURRENT.reset(self._tokens.pop())
+        if not self._tokens:
+            self._outer = None
+
+
+def current_deadline() -> Optional[Deadline]:
+    """deadline of the innermost `with Deadline(...)` block, or None"""
+    return _CURRENT.get()
+
+
+def remaining_time(*deadlines: Optional[Deadline]) -> Optional[float]:
+    """seconds left until the earliest of `deadlines`, or None if all of them are None"""
+    left = [deadline.remaining() for deadline in deadlines if deadline is not None]
+    return min(left) if left else None
+
+
+def cap_timeout(
+        timeout: Optional[Tuple[float, float]],
+        left: Optional[float]) -> Optional[Tuple[float, float]]:
+    """connect and read `timeout` shortened to `left` seconds"""
+    if left is None:
+        return timeout
+    if timeout is None:
+        return (left, left)
+    return (min(timeout[0], left), min(timeout[1], left))
@@ -0,0 +1,270 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    per-endpoint metrics of requests with Prometheus and StatsD exporters
+"""
+import bisect
+import re
+import socket
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# upper bounds of latency histogram buckets, seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# default StatsD daemon address
+DEFAULT_STATSD_ADDRESS = ('127.0.0.1', 8125)
+# counters kept for each endpoint
+COUNTERS = ('requests', 'bytes_out', 'bytes_in', 'retries', 'cache_hits')
+# Prometheus names and help of counters
+PROMETHEUS_COUNTERS = (
+    ('habitipy_requests_total', 'requests', 'Requests sent'),
+    ('habitipy_request_bytes_total', 'bytes_out', 'Bytes of request bodies'),
+    ('habitipy_response_bytes_total', 'bytes_in', 'Bytes of response bodies'),
+    ('habitipy_retries_total', 'retries', 'Retried requests'),
+    ('habitipy_cache_hits_total', 'cache_hits', 'Responses served from caches'),
+)
+# Prometheus names and help of histograms
+PROMETHEUS_HISTOGRAMS = (
+    ('habitipy_request_duration_seconds', 'latency', 'Request latency'),
+    ('habitipy_decode_duration_seconds', 'decode', 'JSON decoding time'),
+)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """counts of observed values not exceeding each of `buckets` upper bounds"""
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """add `value` to the histogram"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """cumulative counts of buckets with upper bounds as text, ending with `+Inf`"""
+        bounds = ['{:g}'.format(bound) for bound in self.buckets] + ['+Inf']
+        res = []
+        total = 0
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            res.append((bound, total))
+        return res
+
+    def snapshot(self) -> Dict[str, Any]:
+        """plain dict copy of the histogram"""
+        return {'count': self.count, 'sum': self.sum, 'buckets': dict(self.cumulative())}
+
+
+class _EndpointMetrics:  # pylint: disable=too-few-public-methods
+    """metrics of one endpoint"""
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.statuses = {}  # type: Dict[int, int]
+        self.latency = Histogram(buckets)
+        self.decode = Histogram(buckets)
+
+
+@lru_cache(maxsize=1024)
+def _statsd_name(method: str, uri: str) -> str:
+    return method + '.' + re.sub(r'[^A-Za-z0-9_]+', '_', uri).strip('_')
+
+
+class StatsdClient:
+    """
+    Sends metrics to StatsD daemon over UDP
+
+    Metrics of an endpoint are named like `habitipy.get.api_v3_user.latency`.
+    Sending never blocks and errors are ignored, like StatsD clients usually do.
+
+    # Arguments
+    host : StatsD daemon host
+    port : StatsD daemon port
+    prefix : prefix of metric names
+    """
+    def __init__(
+            self, host: str = DEFAULT_STATSD_ADDRESS[0], port: int = DEFAULT_STATSD_ADDRESS[1],
+            prefix: str = 'habitipy') -> None:
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def send(self, method: str, uri: str, lines: Sequence[str]) -> None:
+        """send `lines` like `latency:12.5|ms` for endpoint `method` `uri`"""
+        name = '{}.{}.'.format(self.prefix, _statsd_name(method, uri))
+        try:
+            self._socket.sendto('\n'.join(name + line for line in lines).encode(), self.address)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """close the socket"""
+        self._socket.close()
+
+
+class Metrics:
+    """
+    Collects metrics of requests made by `Habitipy` and `HabitipyAsync` per endpoint
+
+    For each endpoint, like `{get} /api/v3/user`, it counts requests, HTTP statuses,
+    bytes sent and received, retries and responses served from caches and keeps
+    histograms of request latency and of JSON decoding time.
+    Responses served from the response cache are only counted as cache hits.
+
+    Thread-safe. `Habitipy` objects sharing one `Metrics` add to the same counters
+    and histograms.
+
+    # Arguments
+    buckets : upper bounds of histogram buckets, seconds
+    statsd : `StatsdClient` to send each observation to
+    clock : function returning time in seconds, `time.perf_counter` by default
+
+    # Example
+    ```python
+    from habitipy import Habitipy
+    from habitipy.metrics import Metrics, start_http_server
+    metrics = Metrics()
+    api = Habitipy(conf, metrics=metrics)
+    start_http_server(metrics, 9110)  # scrape http://127.0.0.1:9110/metrics
+    ...
+    for endpoint, data in metrics.snapshot().items():
+        print(endpoint, data['requests'], data['latency']['sum'])
+    ```
+    """
+    def __init__(
+            self,
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+            statsd: Optional[StatsdClient] = None,
+            clock: Callable[[], float] = time.perf_counter) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.statsd = statsd
+        self.clock = clock
+        self._endpoints = {}  # type: Dict[Tuple[str, str], _EndpointMetrics]
+        self._lock = threading.Lock()
+
+    def _get(self, method: str, uri: str) -> _EndpointMetrics:
+        key = (method, uri)
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints.setdefault(key, _EndpointMetrics(self.buckets))
+        return endpoint
+
+    def observe_request(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, method: str, uri: str, status: int,
+            latency: float, bytes_out: int, bytes_in: int) -> None:
+        """record a request to endpoint `method` `uri` which got response `status`"""
+        with self._lock:
+            endpoint = self._get(method, uri)
+            endpoint.counters['requests'] += 1
+            endpoint.counters['bytes_out'] += bytes_out
+            endpoint.counters['bytes_in'] += bytes_in
+            endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+            endpoint.latency.observe(latency)
+        if self.statsd is not None:
+            self.statsd.send(method, uri, [
+                'latency:{:.3f}|ms'.format(latency * 1000), 'status.{}:1|c'.format(status),
+                'bytes_out:{}|c'.format(bytes_out), 'bytes_in:{}|c'.format(bytes_in)])
+
+    def observe_decode(self, method: str, uri: str, seconds: float) -> None:
+        """record time taken to decode a response of endpoint `method` `uri`"""
+        with self._lock:
+            self._get(method, uri).decode.observe(seconds)
+        if self.statsd is not None:
+            self.statsd.send(method, uri, ['decode:{:.3f}|ms'.format(seconds * 1000)])
+
+    def count(self, method: str, uri: str, counter: str, value: int = 1) -> None:
+        """increase `counter` of endpoint `method` `uri`, like `retries` or `cache_hits`"""
+        with self._lock:
+            self._get(method, uri).counters[counter] += value
+        if self.statsd is not None:
+            self.statsd.send(method, uri, ['{}:{}|c'.format(counter, value)])
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """plain dict copy of metrics by endpoint, like `{get} /api/v3/user`"""
+        with self._lock:
+            return {
+                '{{{}}} {}'.format(method, uri): dict(
+                    endpoint.counters,
+                    statuses=dict(endpoint.statuses),
+                    latency=endpoint.latency.snapshot(),
+                    decode=endpoint.decode.snapshot())
+                for (method, uri), endpoint in self._endpoints.items()}
+
+    def reset(self) -> None:
+        """forget all metrics"""
+        with self._lock:
+            self._endpoints.clear()
+
+    def prometheus(self) -> str:
+        """metrics in Prometheus text exposition format"""
+        lines = []  # type: List[str]
+        with self._lock:
+            endpoints = [
+                ({'method': method, 'endpoint': uri}, endpoint)
+                for (method, uri), endpoint in sorted(self._endpoints.items())]
+            for name, counter, doc in PROMETHEUS_COUNTERS:
+                lines.extend(('# HELP {} {}'.format(name, doc), '# TYPE {} counter'.format(name)))
+                lines.extend(
+                    '{}{} {}'.format(name, _labels(labels), endpoint.counters[counter])
+                    for labels, endpoint in endpoints)
+            name = 'habitipy_responses_total'
+            lines.extend((
+                '# HELP {} Responses by HTTP status'.format(name),
+                '# TYPE {} counter'.format(name)))
+            lines.extend(
+                '{}{} {}'.format(name, _labels(dict(labels, status=status)), count)
+                for labels, endpoint in endpoints
+                for status, count in sorted(endpoint.statuses.items()))
+            for name, attr, doc in PROMETHEUS_HISTOGRAMS:
+                lines.extend(('# HELP {} {}'.format(name, doc), '# TYPE {} histogram'.format(name)))
+                for labels, endpoint in endpoints:
+                    lines.extend(_prometheus_histogram(name, labels, getattr(endpoint, attr)))
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    return '{' + ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in sorted(labels.items())) + '}'
+
+
+def _prometheus_histogram(name: str, labels: Dict[str, Any], histogram: Histogram) -> List[str]:
+    lines = [
+        '{}_bucket{} {}'.format(name, _labels(dict(labels, le=bound)), count)
+        for bound, count in histogram.cumulative()]
+    lines.append('{}_sum{} {!r}'.format(name, _labels(labels), histogram.sum))
+    lines.append('{}_count{} {}'.format(name, _labels(labels), histogram.count))
+    return lines
+
+
+def start_http_server(
+        metrics: Metrics, port: int, addr: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    serve `metrics` in Prometheus format at `http://addr:port/metrics` in a daemon thread.
+    Call `shutdown()` of the returned server to stop it
+    """
+    class Handler(BaseHTTPRequestHandler):
+        """returns metrics for any GET request"""
+        def do_GET(self):  # pylint: disable=invalid-name
+            """respond with metrics"""
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,209 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    middleware chain between API clients and HTTP transport
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+try:
+    import aiohttp  # pylint: disable=import-error
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore
+
+
+class ApiRequest:  # pylint: disable=too-few-public-methods
+    """
+    Request to Habitica API passing through middlewares
+
+    Middlewares can change any attribute before the request is sent.
+
+    # Arguments
+    endpoint : resolved `ApiEndpoint` of the request
+    url : URL of the request
+    params : query params
+    headers : HTTP headers
+    data : encoded body, or None for requests without a body
+    timeout : seconds to wait for connection and for response data, or None to wait forever
+    """
+    __slots__ = ('endpoint', 'url', 'params', 'headers', 'data', 'timeout')
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+            self, endpoint, url: str, params: Dict[str, Any],
+            headers: Dict[str, str], data: Any = None,
+            timeout: Optional[Tuple[float, float]] = None) -> None:
+        self.endpoint = endpoint
+        self.url = url
+        self.params = params
+        self.headers = headers
+        self.data = data
+        self.timeout = timeout
+
+    @property
+    def method(self) -> str:
+        """HTTP method of the request, like `get`"""
+        return self.endpoint.method
+
+    def transport_kwargs(self) -> Dict[str, Any]:
+        """keyword arguments of `requests` and `aiohttp` request functions except timeout"""
+        kwargs = {'headers': self.headers, 'params': self.params}  # type: Dict[str, Any]
+        if self.data is not None:
+            kwargs['data'] = self.data
+        return kwargs
+
+    def __repr__(self) -> str:
+        return '<ApiRequest {} {}>'.format(self.method.upper(), self.url)
+
+
+class ApiResponse:  # pylint: disable=too-few-public-methods
+    """
+    Response to `ApiRequest` returned by a transport or by a middleware
+
+    # Arguments
+    status : HTTP status code
+    headers : HTTP headers
+    body : undecoded body
+    raw : response object of the transport, or None if a middleware made the response
+    """
+    __slots__ = ('status', 'headers', 'body', 'raw')
+
+    def __init__(self, status: int, headers: Any, body: bytes, raw: Any = None) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.raw = raw
+
+    def raise_for_status(self) -> None:
+        """
+        raise HTTP error if status is an error. Responses of `requests` and `aiohttp`,
+        which are made by default, raise their own `requests.HTTPError` and
+        `aiohttp.ClientResponseError`. Responses of other transports and ones made
+        by middlewares raise `requests.HTTPError` with `raw` response, or with
+        the `ApiResponse` itself if `raw` is None
+        """
+        if self.status < 400:
+            return
+        if isinstance(self.raw, requests.Response) or (
+                aiohttp is not None and isinstance(self.raw, aiohttp.ClientResponse)):
+            self.raw.raise_for_status()
+        raise requests.HTTPError(
+            '{} {} Error'.format(self.status, 'Client' if self.status < 500 else 'Server'),
+            response=self if self.raw is None else self.raw)  # type: ignore
+
+    def __repr__(self) -> str:
+        return '<ApiResponse {}>'.format(self.status)
+
+
+class Middleware:
+    """
+    Base of middlewares, which does nothing
+
+    Before a request is sent, `process_request` of each middleware is called in order.
+    If it returns an `ApiResponse`, the request is not sent and next middlewares are
+    skipped. Then `process_response` of each middleware which has seen the request
+    is called in reverse order and can change or replace the response.
+
+    Middlewares work with both `Habitipy` and `HabitipyAsync`, and should be
+    thread-safe if the client is used from several threads.
+
+    # Example
+    ```python
+    class Offline(Middleware):
+        def process_request(self, request):
+            if request.method == 'get' and request.endpoint.uri == '/api/v3/status':
+                return ApiResponse(200, {}, b'{"success": true, "data": {"status": "up"}}')
+            return None
+
+    api = Habitipy(conf, middlewares=[Offline(), LoggingMiddleware()])
+    ```
+    """
+    def process_request(self, request: ApiRequest) -> Optional[ApiResponse]:
+        """change `request` or return a response to it without sending it"""
+        # pylint: disable=unused-argument
+        return None
+
+    def process_response(self, request: ApiRequest, response: ApiResponse) -> ApiResponse:
+        """change or replace `response` to `request`"""
+        # pylint: disable=unused-argument
+        return response
+
+
+class HeadersMiddleware(Middleware):
+    """
+    Adds `headers` to each request, like authentication of a proxy
+
+    # Arguments
+    headers : headers to add, replacing ones of the same name
+    """
+    def __init__(self, headers: Dict[str, str]) -> None:
+        self.headers = dict(headers)
+
+    def process_request(self, request: ApiRequest) -> Optional[ApiResponse]:
+        request.headers = dict(request.headers, **self.headers)
+        return super().process_request(request)
+
+
+class LoggingMiddleware(Middleware):
+    """
+    Logs requests and statuses of responses
+
+    # Arguments
+    logger : logger to use, `habitipy.middleware` by default
+    level : logging level of messages
+    """
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.DEBUG) -> None:
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def process_request(self, request: ApiRequest) -> Optional[ApiResponse]:
+        self.logger.log(self.level, '%s %s', request.method.upper(), request.url)
+        return super().process_request(request)
+
+    def process_response(self, request: ApiRequest, response: ApiResponse) -> ApiResponse:
+        self.logger.log(
+            self.level, '%s %s -> %s (%d bytes)',
+            request.method.upper(), request.url, response.status, len(response.body))
+        return response
+
+
+class Pipeline:
+    """
+    Chain of middlewares in front of a transport
+
+    `send` works with a transport returning an `ApiResponse` and
+    `send_async` with a coroutine function returning it.
+    """
+    def __init__(self, middlewares: Iterable[Middleware] = ()) -> None:
+        self.middlewares = tuple(middlewares)
+
+    def _before(self, request: ApiRequest) -> Tuple[List[Middleware], Optional[ApiResponse]]:
+        """run `process_request` of middlewares until one returns a response"""
+        seen = []
+        for middleware in self.middlewares:
+            seen.append(middleware)
+            response = middleware.process_request(request)
+            if response is not None:
+                return seen, response
+        return seen, None
+
+    @staticmethod
+    def _after(seen: List[Middleware], request: ApiRequest, response: ApiResponse) -> ApiResponse:
+        """run `process_response` of middlewares which have seen the request"""
+        for middleware in reversed(seen):
+            response = middleware.process_response(request, response)
+        return response
+
+    def send(self, request: ApiRequest, transport) -> ApiResponse:
+        """pass `request` through middlewares and `transport`"""
+        seen, response = self._before(request)
+        if response is None:
+            response = transport(request)
+        return self._after(seen, request, response)
+
+    async def send_async(self, request: ApiRequest, transport) -> ApiResponse:
+        """pass `request` through middlewares and asynchronous `transport`"""
+        seen, response = self._before(request)
+        if response is None:
+            response = await transport(request)
+        return self._after(seen, request, response)
@@ -0,0 +1,239 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    compact typed models of Habitica documents
+"""
+# pylint: disable=protected-access
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+
+class Model:
+    """
+    Base of compact models of Habitica documents
+
+    Models keep known fields of a document in `__slots__`, which takes less memory
+    than the dict decoded from JSON. Nested documents, like `stats` of a user,
+    are kept as decoded and turned into models only when accessed. Values are never copied.
+    Fields not known to the model are kept in a dict.
+
+    Fields can be accessed both as attributes and as items, so models can replace dicts
+    in code that reads documents:
+
+    ```python
+    user = User.from_dict(api.user.get())
+    user.stats.hp == user['stats']['hp']
+    ```
+    """
+    __slots__ = ('_extra',)
+    # field name -> name of slot holding it
+    _slots = {}  # type: Dict[str, str]
+    # field name -> model of nested document
+    _nested = {}  # type: Dict[str, Type[Model]]
+
+    def __init__(self, **fields: Any) -> None:
+        self._extra = None  # type: Optional[Dict[str, Any]]
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Model':
+        """make a model of a decoded document"""
+        obj = cls.__new__(cls)
+        extra = None
+        slots = cls._slots
+        for key, value in data.items():
+            slot = slots.get(key)
+            if slot is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+            else:
+                object.__setattr__(obj, slot, value)
+        obj._extra = extra  # pylint: disable=attribute-defined-outside-init
+        return obj
+
+    def keys(self) -> List[str]:
+        """names of fields present in the document"""
+        res = [field for field, slot in self._slots.items() if hasattr(self, slot)]
+        return res + list(self._extra or ())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """get value of field `key` if it is present, or `default`"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """turn the model and materialized nested models back into dicts"""
+        res = {}
+        for key in self:
+            value = self[key]
+            res[key] = value.to_dict() if isinstance(value, Model) else value
+        return res
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._slots:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._slots:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._slots:
+            return hasattr(self, self._slots[key])
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __repr__(self) -> str:
+        return '<{} {}>'.format(self.__class__.__name__, ' '.join(self.keys()))
+
+
+def _nested_property(field: str, slot: str) -> property:
+    def getter(self):
+        try:
+            value = getattr(self, slot)
+        except AttributeError:
+            raise AttributeError(field) from None
+        if isinstance(value, dict):
+            value = self._nested[field].from_dict(value)
+            object.__setattr__(self, slot, value)
+        return value
+
+    def setter(self, value):
+        object.__setattr__(self, slot, value)
+    return property(getter, setter, doc='nested document {}'.format(field))
+
+
+def make_model(name: str, paths: Iterable[str]) -> Type[Model]:
+    """
+    Make a model class of a document with fields at dotted `paths`
+
+    `paths` are like `stats.hp`, as returned by `/models/:model/paths`.
+    Fields with nested paths become nested models. Fields which can not be
+    attributes are kept in a dict of unknown fields.
+    """
+    children = {}  # type: Dict[str, List[str]]
+    for path in paths:
+        field, _, rest = path.partition('.')
+        if not field.isidentifier() or field.startswith('__') or hasattr(Model, field):
+            continue
+        children.setdefault(field, [])
+        if rest:
+            children[field].append(rest)
+    slots = {}
+    nested = {}
+    namespace = {}  # type: Dict[str, Any]
+    for field, subpaths in children.items():
+        if subpaths:
+            slots[field] = '_nested_' + field
+            nested[field] = make_model(name + field[0].upper() + field[1:], subpaths)
+            namespace[field] = _nested_property(field, slots[field])
+        else:
+            slots[field] = field
+    namespace.update({
+        '__slots__': tuple(slots.values()),
+        '__doc__': 'Model of {} document'.format(name),
+        '_slots': slots,
+        '_nested': nested,
+    })
+    return type(name, (Model,), namespace)
+
+
+def model_from_api(api, model: str) -> Type[Model]:
+    """
+    Make a model class using `/models/:model/paths` of Habitica
+
+    `model` is a name of Habitica model, like `user`, `task`, `tag` or `group`.
+    """
+    return make_model(model[0].upper() + model[1:], api.models[model].paths.get())
+
+
+USER_PATHS = (
+    '_id', 'id', '_v', '_ABtests', '_subSignature', 'achievements',
+    'auth.local.username', 'auth.local.lowerCaseUsername', 'auth.local.email',
+    'auth.timestamps.created', 'auth.timestamps.loggedin', 'auth.timestamps.updated',
+    'auth.facebook', 'auth.google', 'auth.apple',
+    'backer', 'balance', 'challenges', 'contributor', 'extra', 'flags', 'guilds',
+    'history', 'inbox', 'invitations', 'invitesSent',
+    'items.currentMount', 'items.currentPet', 'items.eggs', 'items.food',
+    'items.gear.costume', 'items.gear.equipped', 'items.gear.owned',
+    'items.hatchingPotions', 'items.lastDrop', 'items.mounts', 'items.pets',
+    'items.quests', 'items.special',
+    'lastCron', 'loginIncentives', 'migration', 'needsCron', 'newMessages', 'notifications',
+    'party._id', 'party.order', 'party.orderAscending', 'party.quest',
+    'permissions', 'pinnedItems', 'pinnedItemsOrder', 'preferences',
+    'profile.blurb', 'profile.imageUrl', 'profile.name',
+    'purchased', 'pushDevices',
+    'stats.buffs', 'stats.class', 'stats.con', 'stats.exp', 'stats.gp', 'stats.hp',
+    'stats.int', 'stats.lvl', 'stats.maxHealth', 'stats.maxMP', 'stats.mp', 'stats.per',
+    'stats.points', 'stats.str', 'stats.toNextLevel', 'stats.training',
+    'tags', 'tasksOrder', 'unpinnedItems', 'webhooks')
+TASK_PATHS = (
+    '_id', 'id', 'alias', 'attribute', 'byHabitica',
+    'challenge.broken', 'challenge.id', 'challenge.shortName', 'challenge.taskId',
+    'challenge.winner',
+    'checklist', 'collapseChecklist', 'completed', 'counterDown', 'counterUp', 'createdAt',
+    'date', 'dateCompleted', 'daysOfMonth', 'down', 'everyX', 'frequency', 'group',
+    'history', 'isDue', 'nextDue', 'notes', 'priority', 'reminders',
+    'repeat.f', 'repeat.m', 'repeat.s', 'repeat.su', 'repeat.t', 'repeat.th', 'repeat.w',
+    'startDate', 'streak', 'tags', 'text', 'type', 'up', 'updatedAt', 'userId', 'value',
+    'weeksOfMonth', 'yesterDaily')
+TAG_PATHS = ('id', 'name', 'challenge', 'group')
+GROUP_PATHS = (
+    '_id', 'id', 'balance', 'bannedWordsAllowed', 'categories', 'challengeCount', 'chat',
+    'description', 'leader', 'leaderOnly', 'managers', 'memberCount', 'name', 'privacy',
+    'purchased',
+    'quest.active', 'quest.extra', 'quest.key', 'quest.leader', 'quest.members',
+    'quest.progress.collect', 'quest.progress.down', 'quest.progress.hp', 'quest.progress.up',
+    'summary', 'type')
+User = make_model('User', USER_PATHS)
+Task = make_model('Task', TASK_PATHS)
+Tag = make_model('Tag', TAG_PATHS)
+Group = make_model('Group', GROUP_PATHS)
+# models of documents returned by endpoints
+RESPONSE_MODELS = {
+    ('get', '/api/v3/user'): User,
+    ('put', '/api/v3/user'): User,
+    ('get', '/api/v3/tasks/user'): Task,
+    ('post', '/api/v3/tasks/user'): Task,
+    ('get', '/api/v3/tasks/challenge/:challengeId'): Task,
+    ('get', '/api/v3/tasks/group/:groupId'): Task,
+    ('get', '/api/v3/tasks/:taskId'): Task,
+    ('put', '/api/v3/tasks/:taskId'): Task,
+    ('get', '/api/v3/tags'): Tag,
+    ('post', '/api/v3/tags'): Tag,
+    ('get', '/api/v3/tags/:tagId'): Tag,
+    ('put', '/api/v3/tags/:tagId'): Tag,
+    ('get', '/api/v3/groups'): Group,
+    ('post', '/api/v3/groups'): Group,
+    ('get', '/api/v3/groups/:groupId'): Group,
+    ('put', '/api/v3/groups/:groupId'): Group,
+}  # type: Dict[Tuple[str, str], Type[Model]]
+
+
+def wrap_response(method: str, uri: str, data: Any) -> Any:
+    """turn documents in `data` returned by endpoint `method` `uri` into models"""
+    model = RESPONSE_MODELS.get((method, uri))  # type: Optional[Type[Model]]
+    if model is None:
+        return data
+    if isinstance(data, dict):
+        return model.from_dict(data)
+    if isinstance(data, list):
+        return [model.from_dict(item) if isinstance(item, dict) else item for item in data]
+    return data
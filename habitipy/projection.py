@@ -0,0 +1,264 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    field projections learned from access to returned documents
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+# file to keep access profiles between runs
+DEFAULT_PROFILES_FILE = '~/.config/habitipy/projections.json'
+# seconds after which profiles of call sites which were not used are forgotten
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+# profiles kept in files, saved when the interpreter exits
+_KEPT = weakref.WeakSet()  # type: weakref.WeakSet
+
+
+@atexit.register
+def _save_kept() -> None:
+    for profiles in list(_KEPT):
+        profiles.save()
+
+
+def _coverage(fields: Optional[Iterable[str]]) -> Optional[Dict[str, Optional[Dict]]]:
+    """
+    make a dict of top-level fields requested by projection `fields` to dicts of
+    second-level fields requested, or to None for fields requested whole.
+    Return None if the whole document was requested
+    """
+    if fields is None:
+        return None
+    covered = {}  # type: Dict[str, Optional[Dict]]
+    for field in fields:
+        top, _, rest = field.partition('.')
+        if not rest:
+            covered[top] = None
+        elif covered.get(top, {}) is not None:
+            covered.setdefault(top, {})[rest] = None  # type: ignore
+    return covered
+
+
+class AccessProfiles:  # pylint: disable=too-many-instance-attributes
+    """
+    Field projections learned from fields actually read at each call site
+
+    Documents returned to a call site are `TrackedDocument`s which record read fields
+    and second-level fields. Next calls from the same site request only those fields.
+    If the code reads a field which was not requested, the whole document is fetched
+    and the field is remembered for the site.
+
+    Profiles are kept in JSON file `path` and saved by `save` or when the interpreter exits.
+    Profiles of call sites not used for `max_age` seconds are dropped on saving,
+    so sites which were changed or removed don't pile up in the file.
+
+    # Arguments
+    path : file to keep profiles between runs, or None to keep them in memory
+    max_age : seconds to keep profiles of call sites which are not used
+    clock : function returning time in seconds, `time.time` by default
+
+    # Example
+    ```python
+    from habitipy import Habitipy
+    from habitipy.projection import AccessProfiles, DEFAULT_PROFILES_FILE
+    api = Habitipy(conf, projections=AccessProfiles(DEFAULT_PROFILES_FILE))
+    user = api.user.get()  # gets only stats after the first run
+    print(user['stats']['hp'])
+    ```
+    """
+    def __init__(
+            self, path: Optional[str] = None, max_age: float = DEFAULT_MAX_AGE,
+            clock: Callable[[], float] = time.time) -> None:
+        self.path = os.path.expanduser(path) if path else None
+        self.max_age = max_age
+        self._clock = clock
+        self._profiles = {}  # type: Dict[str, Set[str]]
+        # time each call site was last used at
+        self._seen = {}  # type: Dict[str, float]
+        self._used = set()  # type: Set[str]
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.path:
+            try:
+                with open(self.path, encoding='utf-8') as file:
+                    self._load(json.load(file))
+            except (OSError, ValueError, AttributeError, TypeError, KeyError):
+                pass
+            _KEPT.add(self)
+
+    def _load(self, saved: Dict[str, Any]) -> None:
+        """read profiles saved by `save`"""
+        now = self._clock()
+        for site, profile in saved.items():
+            if isinstance(profile, list):  # saved without time of use
+                profile = {'fields': profile, 'seen': now}
+            self._profiles[site] = set(profile['fields'])
+            self._seen[site] = float(profile['seen'])
+
+    def _use(self, site: str) -> None:
+        """remember that call `site` is used in this run, holding `_lock`"""
+        if site not in self._used:
+            self._used.add(site)
+            self._seen[site] = self._clock()
+            self._dirty = True
+
+    def fields(self, site: str) -> Optional[List[str]]:
+        """fields to request for call `site`, or None to request the whole document"""
+        with self._lock:
+            self._use(site)
+            paths = self._profiles.get(site)
+            if not paths:
+                return None
+            return sorted(p for p in paths if p.partition('.')[0] not in paths or '.' not in p)
+
+    def record(self, site: str, path: str) -> None:
+        """remember that field `path` was read at call `site`"""
+        with self._lock:
+            self._use(site)
+            paths = self._profiles.setdefault(site, set())
+            if path not in paths:
+                paths.add(path)
+                self._dirty = True
+
+    def track(
+            self, site: str, document: Dict[str, Any],
+            fields: Optional[List[str]], fetch: Callable[[], Dict[str, Any]]) -> 'TrackedDocument':
+        """
+        wrap `document` returned to call `site` with `fields` requested
+        to record fields read. `fetch` should return the whole document
+        """
+        return TrackedDocument(document, _Tracker(self, site, fetch), covered=_coverage(fields))
+
+    def save(self) -> None:
+        """write profiles to the file if they have changed"""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            oldest = self._clock() - self.max_age
+            for site in [site for site, seen in self._seen.items() if seen < oldest]:
+                self._profiles.pop(site, None)
+                del self._seen[site]
+            profiles = {
+                site: {'fields': sorted(paths), 'seen': self._seen[site]}
+                for site, paths in self._profiles.items()}
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump(profiles, file, indent=1, sort_keys=True)
+
+
+class _Tracker:
+    """call site and the whole document shared by all parts of one TrackedDocument"""
+    def __init__(self, profiles: AccessProfiles, site: str, fetch: Callable[[], Dict]) -> None:
+        self.profiles = profiles
+        self.site = site
+        self._fetch = fetch
+        self._document = None  # type: Optional[Dict[str, Any]]
+
+    def record(self, path: str) -> None:
+        """remember that field `path` was read"""
+        self.profiles.record(self.site, path)
+
+    def document(self) -> Dict[str, Any]:
+        """the whole document, fetched once"""
+        if self._document is None:
+            self._document = self._fetch()
+        return self._document
+
+
+class TrackedDocument(dict):
+    """
+    Document recording fields read from it
+
+    Top-level fields and fields of top-level dicts are recorded.
+    Reading a field which was not requested fetches the whole document.
+    Iterating over a dict records it as read whole.
+    """
+    def __init__(
+            self, data: Dict[str, Any], tracker: _Tracker, prefix: str = '',
+            covered: Optional[Dict[str, Optional[Dict]]] = None) -> None:
+        super().__init__(data)
+        self._tracker = tracker
+        self._prefix = prefix
+        # fields requested, see `_coverage`. None if the dict was requested whole
+        self._covered = covered
+
+    def _missing(self, key) -> bool:
+        return (
+            self._covered is not None
+            and key not in self._covered
+            and not dict.__contains__(self, key))
+
+    def _complete(self) -> None:
+        """add fields which were not requested from the whole document"""
+        if self._covered is None:
+            return
+        document = self._tracker.document()  # type: Any
+        if self._prefix:
+            document = document.get(self._prefix[:-1])
+        if not isinstance(document, dict):
+            document = {}
+        for key, value in document.items():
+            if not dict.__contains__(self, key):
+                dict.__setitem__(self, key, value)
+        self._covered = None
+
+    def _read(self, key) -> None:
+        if not isinstance(key, str):
+            return
+        missing = self._missing(key)
+        if missing:
+            self._complete()
+        value = dict.get(self, key)
+        if self._prefix or missing or not isinstance(value, dict):
+            self._tracker.record(self._prefix + key)
+        elif not isinstance(value, TrackedDocument):
+            covered = self._covered.get(key) if self._covered is not None else None
+            dict.__setitem__(self, key, TrackedDocument(
+                value, self._tracker, prefix=key + '.', covered=covered))
+
+    def _read_whole(self) -> None:
+        self._complete()
+        if self._prefix:
+            self._tracker.record(self._prefix[:-1])
+        else:
+            for key in dict.keys(self):
+                self._tracker.record(key)
+
+    def __getitem__(self, key):
+        self._read(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        self._read(key)
+        return dict.__contains__(self, key)
+
+    def __iter__(self):
+        self._read_whole()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._read_whole()
+        return dict.__len__(self)
+
+    def keys(self):
+        self._read_whole()
+        return dict.keys(self)
+
+    def values(self):
+        self._read_whole()
+        return dict.values(self)
+
+    def items(self):
+        self._read_whole()
+        return dict.items(self)
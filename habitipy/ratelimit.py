@@ -0,0 +1,141 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    client-side pacing of requests according to Habitica's rate limit
+"""
+import re
+import time
+import threading
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Callable, Mapping, Optional
+
+# Habitica allows 30 requests per minute for each user
+DEFAULT_RATE_LIMIT = 30
+DEFAULT_RATE_PERIOD = 60.0
+# Habitica renders reset time as a javascript Date:
+# 'Mon Dec 20 2021 16:48:09 GMT+0000 (Coordinated Universal Time)'
+_js_date_regex = re.compile(
+    r'^\w{3} (?P<date>\w{3} \d{1,2} \d{4} \d{2}:\d{2}:\d{2}) GMT(?P<tz>[+-]\d{4})')
+
+
+def parse_reset(value: str, now: Optional[float] = None) -> Optional[float]:
+    """
+    parse `X-RateLimit-Reset` header value and return number of seconds left until reset
+
+    Understands javascript and HTTP dates, unix timestamps and plain numbers of seconds.
+    Returns None if `value` can not be parsed.
+    """
+    now = time.time() if now is None else now
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        pass
+    else:
+        # unix timestamps in seconds or milliseconds are way bigger than any sane delay
+        if number > 1e11:
+            return max(0.0, number / 1000 - now)
+        if number > 1e9:
+            return max(0.0, number - now)
+        return max(0.0, number)
+    match = _js_date_regex.match(value)
+    try:
+        if match:
+            reset = datetime.strptime(
+                '{date} {tz}'.format(**match.groupdict()), '%b %d %Y %H:%M:%S %z')
+        else:
+            reset = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if reset.tzinfo is None:
+        return None
+    return max(0.0, reset.timestamp() - now)
+
+
+class RateLimiter:
+    """
+    Token bucket pacing requests just under Habitica's rate limit
+
+    Bucket holds up to `limit` tokens and is refilled at `limit` tokens per `period` seconds.
+    Each request takes one token. Bucket is corrected after each response using
+    `X-RateLimit-Limit`, `X-RateLimit-Remaining`, `X-RateLimit-Reset` and `Retry-After` headers,
+    so requests are never sent faster than the server permits.
+
+    Thread-safe. `Habitipy` objects sharing one `RateLimiter` take tokens from the same
+    bucket, so share it only between objects using the same credentials.
+
+    # Arguments
+    limit : number of requests allowed per `period`
+    period : length of rate limiting window in seconds
+    clock : monotonic clock used for pacing, `time.monotonic` by default
+
+    # Example
+    ```python
+    from habitipy import Habitipy
+    from habitipy.ratelimit import RateLimiter
+    api = Habitipy(conf, rate_limiter=RateLimiter())
+    for tid in task_ids:
+        api.tasks[tid].score['up'].post()  # as fast as Habitica allows
+    ```
+    """
+    def __init__(
+            self,
+            limit: int = DEFAULT_RATE_LIMIT,
+            period: float = DEFAULT_RATE_PERIOD,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.limit = limit
+        self.period = period
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(limit)
+        self._updated = clock()
+        self._not_before = self._updated
+
+    @property
+    def rate(self) -> float:
+        """tokens added to the bucket each second"""
+        return self.limit / self.period
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(float(self.limit), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """take a token and return number of seconds to wait before making a request"""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            wait = max(0.0, self._not_before - now)
+            if self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self.rate)
+            self._tokens -= 1
+            return wait
+
+    def acquire(self) -> None:
+        """block until a request can be made"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def update(self, headers: Mapping[str, str], status: Optional[int] = None) -> None:
+        """correct the bucket using rate limiting headers of a response"""
+        limit = headers.get('X-RateLimit-Limit')
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        retry_after = headers.get('Retry-After')
+        reset_in = parse_reset(reset) if reset else None
+        retry_in = parse_reset(retry_after) if retry_after else None
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if limit and limit.isdigit() and int(limit) > 0:
+                self.limit = int(limit)
+            if remaining and remaining.isdigit():
+                self._tokens = min(self._tokens, float(remaining))
+                if int(remaining) == 0 and reset_in is not None:
+                    self._not_before = max(self._not_before, now + reset_in)
+            if status == 429:
+                self._tokens = min(self._tokens, 0.0)
+                delay = retry_in if retry_in is not None else reset_in
+                if delay is not None:
+                    self._not_before = max(self._not_before, now + delay)
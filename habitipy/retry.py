@@ -0,0 +1,230 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    retries with exponential backoff and circuit breaker
+"""
+import asyncio
+import itertools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, FrozenSet, Iterable, Optional, Tuple, Type
+
+import urllib3
+
+from .deadline import DeadlineExceeded
+
+try:
+    import aiohttp  # pylint: disable=import-error
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore
+try:
+    import httpx  # pylint: disable=import-error
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+
+# statuses of responses worth retrying: rate limit and server errors
+DEFAULT_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# errors of transports meaning the request could not be made or answered
+NETWORK_ERRORS = (OSError, asyncio.TimeoutError, urllib3.exceptions.HTTPError) + (
+    (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) if aiohttp else ()) + (
+    (httpx.TransportError,) if httpx else ())  # type: Tuple[Type[BaseException], ...]
+
+
+class CircuitOpen(ConnectionError):
+    """Habitica is considered down and the request was not sent"""
+
+
+# function deciding on retry of an attempt by its number and result or error
+Decision = Callable[[int, Any, Optional[BaseException]], Optional[float]]
+
+
+def retrying(attempt: Callable[[], Any], delay: Decision) -> Any:
+    """
+    call `attempt` while `delay`, called with number of the attempt and its result
+    or network error, returns seconds to wait before the next one instead of None.
+    Return result of the last attempt or raise its error
+    """
+    for number in itertools.count():
+        try:
+            result, error = attempt(), None
+        except (CircuitOpen, DeadlineExceeded):
+            raise
+        except NETWORK_ERRORS as exc:
+            result, error = None, exc
+        wait = delay(number, result, error)
+        if wait is None:
+            if error is not None:
+                raise error
+            return result
+        time.sleep(wait)
+    return None  # pragma: no cover
+
+
+async def retrying_async(attempt: Callable[[], Awaitable], delay: Decision) -> Any:
+    """`retrying` for coroutine function `attempt`"""
+    for number in itertools.count():
+        try:
+            result, error = await attempt(), None
+        except (CircuitOpen, DeadlineExceeded):
+            raise
+        except NETWORK_ERRORS as exc:
+            result, error = None, exc
+        wait = delay(number, result, error)
+        if wait is None:
+            if error is not None:
+                raise error
+            return result
+        await asyncio.sleep(wait)
+    return None  # pragma: no cover
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests to retry and how long to wait before it
+
+    GET requests are always retried. Other requests could have been done by the server
+    before the failure, so they are retried only if they were rejected by rate limiting
+    (status 429) or if their endpoints are listed in `safe`. Waiting time grows
+    exponentially from `backoff` up to `max_backoff` and is randomly shortened
+    by up to `jitter` part of it, so clients failed at once don't retry at once.
+    `Retry-After` header of a response is honored unless it asks to wait
+    more than `max_retry_after`.
+
+    # Arguments
+    attempts : maximum number of attempts of each request, including the first one
+    backoff : seconds to wait before the first retry
+    max_backoff : maximum seconds to wait between attempts
+    jitter : part of waiting time which is random, from 0 to 1
+    statuses : statuses of responses to retry
+    safe : endpoints of mutations which are safe to retry, like `('put', '/api/v3/user')`
+    max_retry_after : maximum seconds to wait if asked by `Retry-After`
+    sample : function returning a random number in [0, 1), `random.random` by default
+
+    # Example
+    ```python
+    from habitipy import Habitipy
+    from habitipy.retry import RetryPolicy, CircuitBreaker
+    policy = RetryPolicy(attempts=5, safe=[('put', '/api/v3/user')])
+    api = Habitipy(conf, retry=policy, circuit_breaker=CircuitBreaker())
+    ```
+    """
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    def __init__(
+            self,
+            attempts: int = 3,
+            backoff: float = 0.5,
+            max_backoff: float = 30.0,
+            jitter: float = 1.0,
+            statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+            safe: Iterable[Tuple[str, str]] = (),
+            max_retry_after: float = 60.0,
+            sample: Callable[[], float] = random.random) -> None:
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)  # type: FrozenSet[int]
+        self.safe = frozenset(safe)  # type: FrozenSet[Tuple[str, str]]
+        self.max_retry_after = max_retry_after
+        self._sample = sample
+
+    def delay(self, endpoint, attempt: int, status: Optional[int], headers: Any) -> Optional[float]:
+        """
+        seconds to wait before retrying request to `endpoint` failed on `attempt` (from 0)
+        with `status` and `headers` of response, or with a network error if `status` is None.
+        None if the request should not be retried
+        """
+        if attempt + 1 >= self.attempts:
+            return None
+        if status is not None and status not in self.statuses:
+            return None
+        if (endpoint.method != 'get' and status != 429
+                and (endpoint.method, endpoint.uri) not in self.safe):
+            return None
+        retry_after = _retry_after(headers)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay * (1 - self.jitter * self._sample())
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    """seconds to wait asked by `Retry-After` header"""
+    value = headers.get('retry-after') if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests after `failures` consecutive failures
+
+    Network errors and server errors (5xx) are failures. When there are too many
+    of them, requests fail at once with `CircuitOpen` for `reset_timeout` seconds.
+    Then one request is let through: if it succeeds, requests are sent again,
+    otherwise the breaker stays open for another `reset_timeout`.
+
+    Thread-safe. Failures of all `Habitipy` objects sharing one breaker are counted
+    together, and it opens for all of them.
+
+    # Arguments
+    failures : number of consecutive failures opening the breaker
+    reset_timeout : seconds to wait before trying a request again
+    clock : function returning time in seconds, `time.monotonic` by default
+    """
+    def __init__(
+            self, failures: int = 5, reset_timeout: float = 30.0,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failed = 0
+        self._opened_at = None  # type: Optional[float]
+        self._trial = False
+
+    @property
+    def is_open(self) -> bool:
+        """whether requests are not sent now"""
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> None:
+        """raise `CircuitOpen` if a request should not be sent now"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if not self._trial and self._clock() - self._opened_at >= self.reset_timeout:
+                self._trial = True
+                return
+        raise CircuitOpen('Habitica seems to be down, not sending requests for a while')
+
+    def release(self) -> None:
+        """
+        let another request through if the one let through ended
+        without a result to record, like on cancellation
+        """
+        with self._lock:
+            self._trial = False
+
+    def record(self, failed: bool) -> None:
+        """record result of a request let through"""
+        with self._lock:
+            if not failed:
+                self._failed = 0
+                self._opened_at = None
+            else:
+                self._failed += 1
+                if self._trial or self._failed >= self.failures:
+                    self._opened_at = self._clock()
+            self._trial = False
@@ -0,0 +1,248 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    HTTP transports sending requests which passed through middlewares
+"""
+from typing import Any, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+import urllib3
+
+from .middleware import ApiRequest, ApiResponse
+
+try:
+    import httpx  # pylint: disable=import-error
+except ImportError:  # pragma: no cover
+    httpx = None  # type: ignore
+try:
+    import aiohttp  # pylint: disable=import-error
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore
+
+# number of keep-alive connections kept in pool of a transport
+DEFAULT_POOL_SIZE = 10
+
+
+def make_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """make `requests.Session` keeping up to `pool_size` connections to each host"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _url(request: ApiRequest) -> str:
+    """URL of `request` with query params"""
+    if not request.params:
+        return request.url
+    return request.url + ('&' if '?' in request.url else '?') + urlencode(request.params)
+
+
+def aiohttp_timeout(timeout: Optional[Tuple[float, float]]) -> Any:
+    """`aiohttp.ClientTimeout` of connect and read `timeout`"""
+    if timeout is None:
+        return aiohttp.ClientTimeout()
+    return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+
+
+def _body(request: ApiRequest) -> Optional[bytes]:
+    return request.data.encode() if isinstance(request.data, str) else request.data
+
+
+class Transport:
+    """
+    Base of transports used by `Habitipy` to send requests
+
+    Transports passed to `Habitipy` are not closed by it.
+    """
+    def send(self, request: ApiRequest) -> ApiResponse:
+        """send `request` and return the response with its body read"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """close connections of the transport"""
+
+    def __enter__(self) -> 'Transport':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class AsyncTransport:
+    """
+    Base of transports used by `HabitipyAsync` to send requests
+
+    Transports passed to `HabitipyAsync` are not closed by it.
+    """
+    async def send(self, request: ApiRequest) -> ApiResponse:
+        """send `request` and return the response with its body read"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """close connections of the transport"""
+
+    async def __aenter__(self) -> 'AsyncTransport':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+class RequestsTransport(Transport):
+    """
+    Transport using `requests`, which `Habitipy` uses by default
+
+    # Arguments
+    session (None, requests.Session): session to use. By default one is created
+        and closed by `close`
+    pool_size : maximum number of keep-alive connections of a created session
+    """
+    def __init__(
+            self, session: Optional[requests.Session] = None,
+            pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self._owns_session = session is None
+        self.session = session if session is not None else make_session(pool_size)
+
+    def send(self, request: ApiRequest) -> ApiResponse:
+        res = getattr(self.session, request.method)(
+            request.url, timeout=request.timeout, **request.transport_kwargs())
+        return ApiResponse(res.status_code, res.headers, res.content, res)
+
+    def close(self) -> None:
+        if self._owns_session:
+            self.session.close()
+
+
+def _urllib3_timeout(request: ApiRequest) -> Any:
+    if request.timeout is None:
+        return None
+    connect, read = request.timeout
+    return urllib3.Timeout(connect=connect, read=read)
+
+
+class Urllib3Transport(Transport):
+    """
+    Transport using `urllib3` directly, with less overhead per request than `requests`
+
+    # Arguments
+    pool_manager (None, urllib3.PoolManager): pool manager to use.
+        By default one is created and cleared by `close`
+    pool_size : maximum number of keep-alive connections to each host of a created pool manager
+    """
+    def __init__(
+            self, pool_manager: Optional[urllib3.PoolManager] = None,
+            pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self._owns_pool = pool_manager is None
+        self.pool_manager = pool_manager or urllib3.PoolManager(maxsize=pool_size, block=False)
+
+    def send(self, request: ApiRequest) -> ApiResponse:
+        res = self.pool_manager.request(
+            request.method.upper(), _url(request), body=_body(request),
+            headers=request.headers, redirect=False, retries=False,
+            timeout=_urllib3_timeout(request))
+        return ApiResponse(res.status, res.headers, res.data, res)
+
+    def close(self) -> None:
+        if self._owns_pool:
+            self.pool_manager.clear()
+
+
+def _httpx_client(name: str, http2: bool, pool_size: int) -> Any:
+    """make `httpx.Client` or `httpx.AsyncClient` named `name`"""
+    if httpx is None:
+        raise ImportError('httpx is required for this transport: pip install habitipy[http2]')
+    return getattr(httpx, name)(http2=http2, limits=httpx.Limits(max_connections=pool_size))
+
+
+def _httpx_timeout(request: ApiRequest) -> Any:
+    if request.timeout is None:
+        return None
+    connect, read = request.timeout
+    return httpx.Timeout(read, connect=connect)
+
+
+class HttpxTransport(Transport):
+    """
+    Transport using `httpx`, with HTTP/2 over TLS by default
+
+    # Arguments
+    client (None, httpx.Client): client to use. By default one is created and closed by `close`
+    http2 : use HTTP/2 in a created client. Requires `h2` package
+    pool_size : maximum number of connections of a created client
+    """
+    def __init__(
+            self, client=None, http2: bool = True, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self._owns_client = client is None
+        self.client = client if client is not None else _httpx_client(
+            'Client', http2, pool_size)
+
+    def send(self, request: ApiRequest) -> ApiResponse:
+        res = self.client.request(
+            request.method.upper(), request.url, params=request.params,
+            headers=request.headers, content=_body(request), timeout=_httpx_timeout(request))
+        return ApiResponse(res.status_code, res.headers, res.content, res)
+
+    def close(self) -> None:
+        if self._owns_client:
+            self.client.close()
+
+
+class HttpxAsyncTransport(AsyncTransport):
+    """
+    Asynchronous transport using `httpx`, with HTTP/2 over TLS by default.
+    With HTTP/2 concurrent requests are multiplexed over one connection
+
+    # Arguments
+    client (None, httpx.AsyncClient): client to use. By default one is created
+        and closed by `close`
+    http2 : use HTTP/2 in a created client. Requires `h2` package
+    pool_size : maximum number of connections of a created client
+    """
+    def __init__(
+            self, client=None, http2: bool = True, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self._owns_client = client is None
+        self.client = client if client is not None else _httpx_client(
+            'AsyncClient', http2, pool_size)
+
+    async def send(self, request: ApiRequest) -> ApiResponse:
+        res = await self.client.request(
+            request.method.upper(), request.url, params=request.params,
+            headers=request.headers, content=_body(request), timeout=_httpx_timeout(request))
+        return ApiResponse(res.status_code, res.headers, res.content, res)
+
+    async def close(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+
+
+class AiohttpTransport(AsyncTransport):
+    """
+    Asynchronous transport using `aiohttp`, which `HabitipyAsync` uses by default
+
+    # Arguments
+    session (None, aiohttp.ClientSession): session to use. By default one is created
+        on first request and closed by `close`
+    pool_size : maximum number of connections of a created session
+    """
+    def __init__(self, session=None, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        if aiohttp is None:
+            raise ImportError('aiohttp is required for this transport: pip install habitipy[aio]')
+        self._owns_session = session is None
+        self.session = session
+        self.pool_size = pool_size
+
+    async def send(self, request: ApiRequest) -> ApiResponse:
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size))
+        async with self.session.request(
+                request.method, request.url, timeout=aiohttp_timeout(request.timeout),
+                **request.transport_kwargs()) as resp:
+            return ApiResponse(resp.status, resp.headers, await resp.read(), resp)
+
+    async def close(self) -> None:
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
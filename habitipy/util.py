@@ -4,19 +4,28 @@
 """
 # pylint: disable=invalid-name
 import os
+import json
 import gettext
 from contextlib import contextmanager
 from functools import partial
 from textwrap import dedent
 import re
 from math import ceil
-from typing import Tuple
+from typing import Any, Callable, Dict, Tuple, Union
 import pkg_resources
 from plumbum import colors
 try:
     from emoji import emojize
 except ImportError:
     emojize = None  # type: ignore
+try:
+    import orjson  # pylint: disable=import-error
+except ImportError:
+    orjson = None  # type: ignore
+try:
+    import ujson  # type: ignore  # pylint: disable=import-error
+except ImportError:
+    ujson = None  # type: ignore
 
 
 # pylint: disable=too-many-arguments
@@ -183,3 +192,53 @@ def get_translation_functions(package_name: str, names: Tuple[str, ...] = ('gett
     """finds and installs translation functions for package"""
     translation = get_translation_for(package_name)
     return [getattr(translation, x) for x in names]
+
+
+class JsonCodec:  # pylint: disable=too-few-public-methods
+    """
+    JSON encoder and decoder working with bytes
+
+    # Arguments
+    name : name of the codec
+    dumps : function serializing an object to `bytes`
+    loads : function deserializing `bytes` or `str`
+    """
+    def __init__(
+            self, name: str,
+            dumps: Callable[[Any], bytes],
+            loads: Callable[[Union[bytes, str]], Any]) -> None:
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return '<JsonCodec {}>'.format(self.name)
+
+
+JSON_CODECS = {
+    'json': JsonCodec('json', lambda obj: json.dumps(obj).encode('utf-8'), json.loads)
+}  # type: Dict[str, JsonCodec]
+if ujson:
+    JSON_CODECS['ujson'] = JsonCodec(
+        'ujson', lambda obj: ujson.dumps(obj, ensure_ascii=False).encode('utf-8'), ujson.loads)
+if orjson:
+    JSON_CODECS['orjson'] = JsonCodec(
+        'orjson', orjson.dumps, orjson.loads)  # pylint: disable=no-member
+
+
+def get_json_codec(codec: Union[None, str, JsonCodec] = None) -> JsonCodec:
+    """
+    find JSON codec by name
+
+    If `codec` is None, the fastest installed one is returned:
+    `orjson`, `ujson` or `json` from standard library.
+    """
+    if isinstance(codec, JsonCodec):
+        return codec
+    if codec is None:
+        return next(
+            JSON_CODECS[name] for name in ('orjson', 'ujson', 'json') if name in JSON_CODECS)
+    try:
+        return JSON_CODECS[codec]
+    except KeyError:
+        raise ValueError('JSON codec {} is not available'.format(codec)) from None
@@ -0,0 +1,76 @@
+"""
+    habitipy - tools and library for Habitica restful API
+    sampled checking of API responses against apiDoc
+"""
+import random
+import threading
+import warnings
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+# share of responses checked by default
+DEFAULT_SAMPLE_RATE = 0.01
+
+
+class ResponseValidator:
+    """
+    Checks a sample of responses against `@apiSuccess` definitions of apiDoc
+
+    Each response is checked with probability `rate`, so API drift is detected
+    without paying for validation of every call. Numbers of checked responses
+    and of mismatching ones are counted per endpoint, like `'{get} /api/v3/user'`,
+    and problems found in the last mismatching response of each endpoint are kept.
+
+    Thread-safe. `Habitipy` objects sharing one validator add to the same counters
+    and keep the problems found in one place.
+
+    # Arguments
+    rate : share of responses to check, from 0 to 1
+    warn : issue a warning for each mismatching response
+    sample : function returning a random number in [0, 1), `random.random` by default
+
+    # Example
+    ```python
+    from habitipy import Habitipy
+    from habitipy.validation import ResponseValidator
+    validator = ResponseValidator(rate=0.01)
+    api = Habitipy(conf, response_validator=validator)
+    ...
+    for endpoint, count in validator.mismatches.items():
+        print(endpoint, count, validator.checked[endpoint], validator.problems[endpoint])
+    ```
+    """
+    def __init__(
+            self,
+            rate: float = DEFAULT_SAMPLE_RATE,
+            warn: bool = False,
+            sample: Callable[[], float] = random.random) -> None:
+        self.rate = rate
+        self.warn = warn
+        self.checked = Counter()  # type: Counter[str]
+        self.mismatches = Counter()  # type: Counter[str]
+        self.problems = {}  # type: Dict[str, List[str]]
+        self._sample = sample
+        self._lock = threading.Lock()
+
+    def check(self, endpoint, response: Any) -> None:
+        """check decoded `response` of ApiEndpoint `endpoint` if it is sampled"""
+        if self.rate <= 0 or (self.rate < 1 and self._sample() >= self.rate):
+            return
+        problems = endpoint.validate_response(response)
+        name = '{{{}}} {}'.format(endpoint.method, endpoint.uri)
+        with self._lock:
+            self.checked[name] += 1
+            if problems:
+                self.mismatches[name] += 1
+                self.problems[name] = problems
+        if problems and self.warn:
+            warnings.warn('Response of {} does not match apiDoc: {}'.format(
+                name, '; '.join(problems)))
+
+    def reset(self) -> None:
+        """forget counters and problems"""
+        with self._lock:
+            self.checked.clear()
+            self.mismatches.clear()
+            self.problems.clear()
@@ -34,7 +34,9 @@ setup(
     },
     extras_require={
         'emoji':  ['emoji'],
-        'aio':  ['aiohttp']
+        'aio':  ['aiohttp'],
+        'orjson':  ['orjson'],
+        'http2':  ['httpx[http2]'],
     },
     classifiers=[
         'License :: OSI Approved :: MIT License',
@@ -1 +1,5 @@
 from . import *
+from habitipy import api
+
+# tests must not write precompiled API tree to home directory of the user
+api.APIDOC_CACHE_FILE = None
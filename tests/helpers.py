@@ -0,0 +1,9 @@
+class FakeClock:
+    """clock for tests, moved by setting `now` or by `step` on each reading"""
+    def __init__(self, now=0.0, step=0.0):
+        self.now = now
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
@@ -0,0 +1,196 @@
+import unittest
+import asyncio
+
+try:
+    from aiohttp import web, ClientResponseError, ClientSession
+    from aiohttp.test_utils import TestServer
+    from habitipy.aio import HabitipyAsync
+    from habitipy.metrics import Metrics
+    from habitipy.middleware import ApiResponse, HeadersMiddleware, Middleware
+    from habitipy.transport import AiohttpTransport
+    from habitipy.retry import CircuitBreaker, RetryPolicy
+    from habitipy.deadline import Deadline, DeadlineExceeded
+except ImportError:  # pragma: no cover
+    web = None
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class TestHabitipyAsync(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.user_requests = 0
+        self.status_requests = 0
+
+        async def score(request):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            if request.match_info['taskId'] == 'bad':
+                return web.json_response({'error': 'NotFound'}, status=404)
+            return web.json_response({'data': request.match_info['taskId']})
+
+        async def user(request):
+            self.user_requests += 1
+            await asyncio.sleep(0.01)
+            return web.json_response({'data': {'id': request.headers['x-api-user']}})
+
+        async def status(request):
+            self.status_requests += 1
+            if self.status_requests == 1:
+                return web.json_response({'error': 'Unavailable'}, status=503)
+            return web.json_response({'data': {'status': 'up'}})
+
+        app = web.Application()
+        app.router.add_get('/api/v3/status', status)
+        app.router.add_post('/api/v3/tasks/{taskId}/score/{direction}', score)
+        app.router.add_get('/api/v3/user', user)
+        self.server = TestServer(app)
+        self.loop.run_until_complete(self.server.start_server())
+        self.conf = {
+            'url': str(self.server.make_url('')).rstrip('/'),
+            'login': 'login', 'password': 'password'}
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.server.close())
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_owned_session(self):
+        async def main():
+            async with HabitipyAsync(self.conf) as api:
+                user = await api.user.get()
+                session = api._aio.session
+                self.assertIs(api.tasks._aio, api._aio)
+            self.assertTrue(session.closed)
+            return user
+        self.assertEqual(self.run_async(main()), {'id': 'login'})
+
+    def test_explicit_session(self):
+        async def main():
+            api = HabitipyAsync(self.conf)
+            async with ClientSession() as session:
+                user = await api.user.get(session)
+                score = api.endpoint('post', '/tasks/:taskId/score/:direction')
+                task = await score(session, 'tid', 'up')
+            await api.close()
+            self.assertIsNone(api._aio.session)
+            return user, task
+        self.assertEqual(self.run_async(main()), ({'id': 'login'}, 'tid'))
+
+    def test_gather(self):
+        async def main():
+            async with HabitipyAsync(self.conf, limit=3) as api:
+                ids = ['a', 'bad', 'c', 'd', 'e', 'f']
+                results = await api.gather(
+                    [api.tasks[tid].score['up'].post() for tid in ids], limit=5)
+                score = api.endpoint('post', '/tasks/:taskId/score/:direction')
+                mapped = await score.map([(tid, 'up') for tid in ids], max_workers=2)
+            return results, mapped
+        results, mapped = self.run_async(main())
+        for res in results, mapped:
+            self.assertEqual([r.result for r in res], ['a', None, 'c', 'd', 'e', 'f'])
+            self.assertIsInstance(res[1].error, ClientResponseError)
+        self.assertLessEqual(self.max_in_flight, 3)
+
+    def test_single_flight(self):
+        async def main():
+            async with HabitipyAsync(self.conf) as api:
+                users = await asyncio.gather(*[api.user.get() for _ in range(5)])
+                users[0]['id'] = None
+                return users, await api.user.get()
+        users, user = self.run_async(main())
+        self.assertEqual(users[1:], [{'id': 'login'}] * 4)
+        self.assertEqual(user, {'id': 'login'})
+        self.assertEqual(self.user_requests, 2)
+
+    def test_middlewares(self):
+        class Status(Middleware):
+            def process_request(self, request):
+                if request.endpoint.uri == '/api/v3/status':
+                    return ApiResponse(200, {}, b'{"data": {"status": "up"}}')
+                return None
+
+        async def main():
+            async with HabitipyAsync(self.conf, middlewares=[
+                    HeadersMiddleware({'x-api-user': 'proxy'}), Status()]) as api:
+                return await api.user.get(), await api.status.get()
+        self.assertEqual(self.run_async(main()), ({'id': 'proxy'}, {'status': 'up'}))
+        self.assertEqual(self.user_requests, 1)
+
+    def test_transport(self):
+        async def main():
+            async with AiohttpTransport() as transport:
+                api = HabitipyAsync(self.conf, transport=transport)
+                users = await asyncio.gather(*[api.user.get(fields=['id']) for _ in range(3)])
+                await api.close()
+                return users
+        self.assertEqual(self.run_async(main()), [{'id': 'login'}] * 3)
+        self.assertEqual(self.user_requests, 1)
+
+    def test_retry(self):
+        async def main():
+            async with HabitipyAsync(self.conf, retry=RetryPolicy(backoff=0)) as api:
+                return await api.status.get()
+        self.assertEqual(self.run_async(main()), {'status': 'up'})
+        self.assertEqual(self.status_requests, 2)
+
+    def test_circuit_breaker_cancelled_trial(self):
+        breaker = CircuitBreaker(failures=1, reset_timeout=0)
+
+        async def main():
+            async with HabitipyAsync(self.conf, circuit_breaker=breaker) as api:
+                with self.assertRaises(ClientResponseError):
+                    await api.status.get()
+                trial = asyncio.ensure_future(api.tasks['task'].score['up'].post())
+                await asyncio.sleep(0.005)
+                trial.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await trial
+                return await api.user.get()
+        self.assertEqual(self.run_async(main()), {'id': 'login'})
+        self.assertFalse(breaker.is_open)
+
+    def test_deadline(self):
+        async def main():
+            async with HabitipyAsync(self.conf) as api:
+                with Deadline(0.005):
+                    return await api.gather(
+                        [api.tasks[str(i)].score['up'].post() for i in range(3)])
+        for result, error in self.run_async(main()):
+            self.assertIsNone(result)
+            self.assertIsInstance(error, DeadlineExceeded)
+
+    def test_timeout(self):
+        timeouts = []
+
+        class Timeouts(Middleware):
+            def process_request(self, request):
+                timeouts.append(request.timeout)
+                return None
+
+        async def main():
+            async with HabitipyAsync(self.conf, middlewares=[Timeouts()], timeout=5) as api:
+                await api.user.get()
+                with Deadline(1):
+                    await api.user.get()
+        self.run_async(main())
+        self.assertEqual(timeouts[0], (5, 5))
+        self.assertLessEqual(timeouts[1][1], 1)
+
+    def test_metrics(self):
+        metrics = Metrics()
+
+        async def main():
+            async with HabitipyAsync(self.conf, metrics=metrics) as api:
+                await api.user.get()
+        self.run_async(main())
+        user = metrics.snapshot()['{get} /api/v3/user']
+        self.assertEqual(user['requests'], 1)
+        self.assertEqual(user['statuses'], {200: 1})
+        self.assertGreater(user['bytes_in'], 0)
+        self.assertEqual(user['decode']['count'], 1)
@@ -1,7 +1,7 @@
 import unittest
 import tempfile
 import os
-from habitipy.api import parse_apidoc, ApiEndpoint
+from habitipy.api import parse_apidoc, index_apidoc, ApiEndpoint
 
 test_data = """
 @api {post} /api/v3/user/webhook Create a new webhook - BETA
@@ -96,6 +96,30 @@ class TestParsedEndpoints(unittest.TestCase):
             for attr, expected in zip(endpoint_attrs, expected_values):
                 self.assertEqual(getattr(obj, attr), expected)
 
+    def test_shared_params(self):
+        post, put, _ = self.ret
+        self.assertIs(post.params['body']['label'], put.params['body']['label'])
+        self.assertIsNot(post.params['body']['url'], put.params['body']['url'])
+        self.assertEqual(post.params['body']['type'].possible_values,
+                         ('taskActivity', 'groupChatReceived'))
+        self.assertEqual(put.parted_uri, ('api', 'v3', 'user', 'webhook', ':id'))
+        self.assertFalse(hasattr(put, '__dict__'))
+        self.assertFalse(hasattr(put.params['path']['id'], '__dict__'))
+
+    def test_index(self):
+        index = index_apidoc(test_data)
+        self.assertEqual(list(index), ['user'])
+        blocks = [test_data[start:end] for start, end, _ in index['user']]
+        self.assertEqual(''.join(blocks), test_data[test_data.index('@api '):])
+        for start, _, line in index['user']:
+            self.assertEqual(test_data.count('\n', 0, start) + 1, line)
+        self.assertEqual([block.split(' ')[2] for block in blocks], [
+            '/api/v3/user/webhook', '/api/v3/user/webhook/:id', '/api/v3/user/webhook/:id'])
+        self.assertEqual(index_apidoc('@api {get} /status Status\n'), {'': [(0, 26, 1)]})
+        text = '@apiDefine A\n@apiSuccess {String} a\n\n@apiIgnore\n@api {get} /api/v3/status S\n'
+        self.assertEqual(index_apidoc(text), {
+            '@apiDefine': [(0, 37, 1)], 'status': [(37, len(text), 4)]})
+
     def test_retcodes(self):
         for retcode, obj in zip([201,200,200], self.ret):
             self.assertEqual(obj.retcode, retcode)
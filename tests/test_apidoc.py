@@ -0,0 +1,87 @@
+import io
+import unittest
+
+from habitipy.apidoc import ApidocError, Token, tokenize
+from habitipy.api import parse_apidoc_text
+
+apidoc = """/**
+@apiDefine TaskSuccess
+@apiSuccess {Object} data The task
+
+@apiIgnore Not ready yet
+@api {post} /api/v3/tasks/user Create a task
+@apiName CreateUserTasks
+@apiGroup Task
+@apiDescription Creates a task of the user
+@apiBody {String} text Text of the task
+@apiUse TaskSuccess
+@api {get} /api/v3/status Get status
+@apiSuccess {String} data.status 'up'
+*/
+"""
+# pylint: disable=missing-docstring
+
+
+class TestTokenize(unittest.TestCase):
+    def test_tokens(self):
+        tokens = list(tokenize(apidoc))
+        self.assertEqual(tokens[0], Token(2, 'apiDefine', ('TaskSuccess',)))
+        self.assertEqual(tokens[1], Token(3, 'apiSuccess', (None, '{Object}', 'data', 'The task')))
+        self.assertEqual(tokens[3], Token(
+            6, 'api', ('{post}', '/api/v3/tasks/user', 'Create a task')))
+        self.assertEqual([token.tag for token in tokens][4:], [
+            'apiName', 'apiGroup', 'apiDescription', 'apiBody', 'apiUse', 'api', 'apiSuccess'])
+        self.assertEqual(list(tokenize(apidoc, tags={'apiName'})), [
+            Token(7, 'apiName', ('CreateUserTasks',))])
+
+    def test_sources(self):
+        expected = list(tokenize(apidoc))
+        data = apidoc.encode('utf-8')
+        self.assertEqual(list(tokenize(data)), expected)
+        self.assertEqual(list(tokenize(io.BytesIO(data))), expected)
+        self.assertEqual(list(tokenize(io.StringIO(apidoc))), expected)
+        chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+        self.assertEqual(list(tokenize(iter(chunks))), expected)
+
+    def test_multibyte_chunks(self):
+        data = '@api {get} /api/v3/status Статус\r\n'.encode('utf-8')
+        tokens = list(tokenize([data[i:i + 1] for i in range(len(data))]))
+        self.assertEqual(tokens, [Token(1, 'api', ('{get}', '/api/v3/status', 'Статус'))])
+
+    def test_errors(self):
+        for text in ('\n\n@api /api/v3/status', '\n\n@api get /api/v3/status Status'):
+            with self.assertRaises(ApidocError) as context:
+                list(tokenize(text))
+            self.assertEqual(context.exception.line, 3)
+            self.assertTrue(str(context.exception).startswith('line 3: '))
+        with self.assertRaises(ApidocError) as context:
+            list(tokenize('@api /status', first_line=10))
+        self.assertEqual(context.exception.line, 10)
+
+
+class TestParse(unittest.TestCase):
+    def test_tags(self):
+        create, status = parse_apidoc_text(apidoc)
+        self.assertEqual(create.name, 'CreateUserTasks')
+        self.assertEqual(create.group, 'Task')
+        self.assertEqual(create.description, 'Creates a task of the user')
+        self.assertEqual(create.ignore, 'Not ready yet')
+        self.assertIn('Creates a task', create.render_docstring())
+        self.assertEqual(list(create.params['body']), ['text'])
+        self.assertEqual(list(create.params['responce']), ['data'])
+        self.assertEqual(create.retcode, 200)
+        self.assertIsNone(status.ignore)
+        self.assertEqual(list(status.params['responce']), ['status'])
+
+    def test_errors(self):
+        cases = [
+            ('@apiParam {String} text Text\n', 1, 'outside of @api block'),
+            ('@api {get} /api/v3/status S\n@apiParam {String}\n', 2, 'field'),
+            ('@api {get} /api/v3/status S\n@apiSuccess (201) {String} a\n'
+             '@apiSuccess {String} b\n', 3, 'retcodes'),
+        ]
+        for text, line, message in cases:
+            with self.assertRaises(ApidocError) as context:
+                parse_apidoc_text(text)
+            self.assertEqual(context.exception.line, line)
+            self.assertIn(message, str(context.exception))
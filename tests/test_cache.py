@@ -0,0 +1,155 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import responses
+
+from habitipy import Habitipy
+from habitipy.cache import HttpCache, ResponseCache, SingleFlight, resource_tags
+from habitipy.deadline import DeadlineExceeded
+
+from .helpers import FakeClock
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+
+
+class TestHttpCache(unittest.TestCase):
+    def test_store(self):
+        cache = HttpCache(max_entries=2)
+        headers = {'x-api-user': 'login', 'x-api-key': 'password'}
+        key = cache.key('https://habitica.com/api/v3/user', {}, headers)
+        self.assertEqual(cache.validate(key, headers), (None, headers))
+        cache.store(key, {}, b'{}')
+        self.assertEqual(len(cache), 0)
+        cache.store(key, {'ETag': 'W/"1"'}, b'{"data": 1}')
+        entry, validated = cache.validate(key, headers)
+        self.assertEqual(validated['If-None-Match'], 'W/"1"')
+        self.assertNotIn('If-None-Match', headers)
+        self.assertEqual(cache.hit(entry), b'{"data": 1}')
+        other = cache.key(
+            "https://habitica.com/api/v3/user", {}, dict(headers, **{"x-api-user": "other"}))
+        self.assertNotEqual(key, other)
+        for i in range(3):
+            cache.store(cache.key(str(i), {}, headers), {'Last-Modified': 'then'}, b'')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.validate(key, headers)[0], None)
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+
+    def test_habitipy(self):
+        cache = HttpCache()
+        api = Habitipy(CONF, http_cache=cache)
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/user',
+                json={'data': {'stats': {'hp': 50}}}, headers={'ETag': 'W/"abc"'})
+            rsps.add(responses.GET, url='https://habitica.com/api/v3/user', status=304)
+            user = api.user.get()
+            user['stats']['hp'] = 0
+            self.assertEqual(api.user.get(), {'stats': {'hp': 50}})
+            self.assertNotIn('If-None-Match', rsps.calls[0].request.headers)
+            self.assertEqual(rsps.calls[1].request.headers['If-None-Match'], 'W/"abc"')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_resource_tags(self):
+        score = resource_tags('post', ('tasks', ':taskId', 'score', ':direction'))
+        self.assertEqual(score, {'tasks', 'user'})
+        self.assertEqual(resource_tags('get', ('tasks', 'user')), {'tasks', 'user'})
+        self.assertEqual(resource_tags('get', ('user',)), {'user'})
+        self.assertEqual(resource_tags('get', ('groups', ':groupId')), {'groups'})
+        self.assertEqual(resource_tags('get', ('content',)), {'content'})
+
+    def test_expiry(self):
+        clock = FakeClock(1000.0)
+        cache = ResponseCache(ttl=10, max_entries=2, clock=clock)
+        headers = {'x-api-user': 'login', 'x-api-key': 'password'}
+        key = cache.key('get', '/api/v3/user', 'https://habitica.com/api/v3/user', {}, headers)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, frozenset(['user']), b'{}')
+        self.assertEqual(cache.get(key), b'{}')
+        clock.now += 11
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(len(cache), 0)
+        cache.put(key, frozenset(['user']), b'{}')
+        other = dict(headers, **{'x-api-user': 'other'})
+        cache.invalidate(frozenset(['user']), other)
+        self.assertEqual(cache.get(key), b'{}')
+        cache.invalidate(frozenset(['groups']), headers)
+        self.assertEqual(cache.get(key), b'{}')
+        cache.invalidate(frozenset(['tasks', 'user']), headers)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+    def test_habitipy(self):
+        cache = ResponseCache()
+        api = Habitipy(CONF, response_cache=cache)
+        with responses.RequestsMock() as rsps:
+            for path in ['user', 'tasks/user', 'groups/party']:
+                rsps.add(
+                    responses.GET, url='https://habitica.com/api/v3/' + path,
+                    json={'data': {'path': path}})
+            rsps.add(
+                responses.POST, url='https://habitica.com/api/v3/tasks/tid/score/up',
+                json={'data': {}})
+            user = api.user.get()
+            user['path'] = None
+            self.assertEqual(api.user.get(), {'path': 'user'})
+            api.tasks.user.get()
+            api.groups.party.get()
+            self.assertEqual(len(rsps.calls), 3)
+            api.tasks['tid'].score['up'].post()
+            api.user.get()
+            api.tasks.user.get()
+            api.groups.party.get()
+            self.assertEqual(
+                [call.request.url.split('/v3/')[1] for call in rsps.calls[3:]],
+                ['tasks/tid/score/up', 'user', 'tasks/user'])
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_run(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return b'{}'
+
+        def waiter():
+            while flight.shared < 4:
+                time.sleep(0.001)
+            release.set()
+
+        with ThreadPoolExecutor(6) as pool:
+            results = [pool.submit(flight.run, ('key',), fetch) for _ in range(5)]
+            pool.submit(waiter)
+            self.assertEqual([r.result() for r in results], [b'{}'] * 5)
+        self.assertEqual(len(calls), 1)
+
+        def fail():
+            raise ValueError('boom')
+        with self.assertRaises(ValueError):
+            flight.run(('key',), fail)
+        self.assertEqual(flight.run(('key',), fetch), b'{}')
+        self.assertEqual(len(calls), 2)
+
+    def test_run_timeout(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def fetch():
+            started.set()
+            release.wait(5)
+            return b'{}'
+
+        with ThreadPoolExecutor(1) as pool:
+            leader = pool.submit(flight.run, ('key',), fetch)
+            started.wait(5)
+            with self.assertRaises(DeadlineExceeded):
+                flight.run(('key',), fetch, 0.01)
+            release.set()
+            self.assertEqual(leader.result(), b'{}')
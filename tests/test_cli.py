@@ -230,6 +230,41 @@ class TestCli(unittest.TestCase):
             cli.TasksPrint.domain_format.assert_has_calls(data_calls)
             self.assertTrue(cli.prettify.called)
 
+    def test_list_pets(self):
+        items = {
+            'pets': {'Wolf-Base': -1, 'Fox-Red': 10},
+            'mounts': {},
+            'eggs': {'Wolf': 1},
+            'hatchingPotions': {'Base': 1},
+            'food': {'Meat': 3},
+        }
+
+        def user_callback(req):
+            fields = req.params['userFields'].split(',')
+            data = {'items': {
+                field.partition('.')[2]: items[field.partition('.')[2]] for field in fields}}
+            return 200, {}, json.dumps({'data': data})
+
+        output = []
+        with responses.RequestsMock() as rsps, \
+                patch('builtins.print', lambda *args: output.extend(args)), \
+                patch.object(cli.ConfiguredApplication, 'main', cfg_main):
+            rsps.add_callback(
+                responses.GET, url='https://habitica.com/api/v3/user', callback=user_callback)
+            instance, retcode = cli.ListPets.invoke(config_filename=self.file.name)
+            self.assertNotIn('items.food', rsps.calls[0].request.params['userFields'])
+        self.assertIsNotNone(instance)
+        self.assertIsNone(retcode)
+        self.assertTrue(any('hatchable' in line for line in output))
+
+    def test_deadline(self):
+        with responses.RequestsMock(), to_devnull(), \
+                patch.object(cli.ConfiguredApplication, 'main', cfg_main):
+            instance, retcode = cli.HatchPet.run(
+                ['hatch', '-c', self.file.name, '--deadline', '1e-9'], exit=False)
+        self.assertIsNone(instance)
+        self.assertEqual(retcode, 1)
+
     @settings(suppress_health_check=[HealthCheck.too_slow])
     @given(test_data())
     def test_tasks_change(self, arg):
@@ -0,0 +1,79 @@
+import time
+import unittest
+
+import responses
+
+from habitipy import Habitipy
+from habitipy.deadline import Deadline, DeadlineExceeded, current_deadline
+from habitipy.retry import RetryPolicy
+
+from .helpers import FakeClock
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+USER_URL = 'https://habitica.com/api/v3/user'
+
+
+class TestDeadline(unittest.TestCase):
+    def test_nesting(self):
+        clock = FakeClock()
+        self.assertIsNone(current_deadline())
+        with Deadline(10, clock) as outer:
+            with Deadline(20, clock) as inner:
+                self.assertIs(current_deadline(), inner)
+                self.assertEqual(inner.remaining(), 10)
+                clock.now = 4
+                self.assertEqual(inner.remaining(), 6)
+            self.assertIs(current_deadline(), outer)
+            clock.now = 11
+            self.assertTrue(outer.expired)
+            with self.assertRaises(DeadlineExceeded):
+                outer.check()
+        self.assertIsNone(current_deadline())
+        self.assertEqual(inner.remaining(), 9)
+
+    def test_timeouts(self):
+        clock = FakeClock()
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, url=USER_URL, json={'data': {}})
+            Habitipy(CONF).user.get()
+            Habitipy(CONF, timeout=3).user.get()
+            Habitipy(CONF, timeout=None).user.get()
+            with Deadline(5, clock):
+                Habitipy(CONF).user.get()
+                Habitipy(CONF, timeout=None).user.get()
+            Habitipy(CONF, deadline=Deadline(30, clock)).user.get()
+            self.assertEqual(
+                [call.request.req_kwargs['timeout'] for call in rsps.calls],
+                [(10.0, 60.0), (3, 3), None, (5, 5), (5, 5), (10.0, 30)])
+
+    def test_expired(self):
+        clock = FakeClock()
+        api = Habitipy(CONF, retry=RetryPolicy(backoff=2, jitter=0))
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, url=USER_URL, status=503, body='{}')
+            with Deadline(1, clock):
+                with self.assertRaises(Exception):
+                    api.user.get()
+                self.assertEqual(len(rsps.calls), 1)
+                clock.now = 1
+                with self.assertRaises(DeadlineExceeded):
+                    api.user.get()
+                self.assertEqual(len(rsps.calls), 1)
+
+    def test_batch(self):
+        api = Habitipy(CONF)
+        seen = []
+
+        def call():
+            seen.append(current_deadline())
+            time.sleep(0.3)
+            return 'done'
+        with Deadline(0.1) as deadline:
+            with api.batch(max_workers=1) as batch:
+                for _ in range(3):
+                    batch.add(call)
+        self.assertEqual(seen, [deadline])
+        self.assertEqual(batch.results[0], ('done', None))
+        for result, error in batch.results[1:]:
+            self.assertIsNone(result)
+            self.assertIsInstance(error, DeadlineExceeded)
@@ -1,6 +1,11 @@
 import unittest
 from unittest.mock import patch, MagicMock, call
 import os
+import json
+import sys
+import tempfile
+import threading
+import warnings
 
 import pkg_resources
 import responses
@@ -23,6 +28,295 @@ class TestHabitipy(unittest.TestCase):
         self.assertIn('class_', dir(api.user))
         self.assertNotIn('class', dir(api.user))
 
+    def test_cursor_cache(self):
+        api = Habitipy(None)
+        self.assertIs(api.user.class_, api['user']['class'])
+        self.assertIs(api.tasks['tid'].score['up'].post, api['tasks', 'tid', 'score', 'up', 'post'])
+        with patch('habitipy.api.CURSOR_CACHE_SIZE', 2):
+            first = api.tasks['first']
+            api.tasks['second']
+            api.tasks['third']
+            self.assertIsNot(api.tasks['first'], first)
+            self.assertEqual(api.tasks['first']._current, first._current)
+        with self.assertRaises(hapi.WrongPath):
+            api.user.get.abracadabra
+        with self.assertRaises(AttributeError):
+            api.__abracadabra__
+
+    def test_lazy_docstring(self):
+        api = Habitipy(None)
+        self.assertIn('Represents Habitica API', Habitipy.__doc__)
+        self.assertEqual(api.__doc__, Habitipy.__doc__)
+        self.assertNotIn('__doc__', vars(api.user.get))
+        self.assertTrue(api.user.get.__doc__.startswith('{get} /api/v3/user '))
+
+    def test_endpoint_handle(self):
+        conf = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+        api = Habitipy(conf)
+        score = api.endpoint('post', '/tasks/:taskId/score/:direction')
+        self.assertIs(score.endpoint, api.tasks['x'].score['up'].post._node)
+        self.assertEqual(score.path_params, ['taskId', 'direction'])
+        cast = api.endpoint('post', 'user/class/cast/:spellId')
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.POST,
+                url='https://habitica.com/api/v3/tasks/tid/score/up',
+                json={'data': {'hp': 50}})
+            rsps.add(
+                responses.POST,
+                url='https://habitica.com/api/v3/user/class/cast/smash?targetId=tid',
+                match_querystring=True,
+                json={'data': {}})
+            self.assertEqual(score('tid', 'up'), {'hp': 50})
+            self.assertEqual(score('tid', direction='up', scoreNotes='note'), {'hp': 50})
+            self.assertEqual(json.loads(rsps.calls[1].request.body), {'scoreNotes': 'note'})
+            self.assertEqual(rsps.calls[0].request.headers['x-api-user'], 'login')
+            cast('smash', targetId='tid')
+        with self.assertRaises(TypeError):
+            score('tid')
+        with self.assertRaises(TypeError):
+            score('tid', 'up', 'down')
+        with self.assertRaises(ValueError):
+            api.endpoint('user', '/tasks')
+
+    def test_shared_accounts(self):
+        conf = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+        tree = hapi.shared_api_tree()
+        self.assertIs(hapi.shared_api_tree(), tree)
+        with patch('habitipy.api.load_api_tree') as load:
+            api = Habitipy(conf, apis=tree, rate_limiter=hapi.RateLimiter(10))
+            self.assertFalse(load.called)
+        self.assertEqual(api.user.with_credentials('other', 'key')._current, ['api', 'v3', 'user'])
+        other = api.with_credentials('other', 'key')
+        self.assertIs(other._apis, tree)
+        self.assertIs(other._session, api._session)
+        self.assertEqual(other._rate_limiter.limit, 10)
+        self.assertIsNot(other._rate_limiter, api._rate_limiter)
+        self.assertEqual(api._conf['login'], 'login')
+        score = other.endpoint('post', '/tasks/:taskId/score/:direction')
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, url='https://habitica.com/api/v3/user', json={'data': {}})
+            rsps.add(
+                responses.POST,
+                url='https://habitica.com/api/v3/tasks/tid/score/up',
+                json={'data': {}})
+            other.user.get()
+            api.user.get(credentials=('third', 'key'))
+            score('tid', 'up', credentials=('fourth', 'key'))
+            score('tid', 'up')
+            self.assertEqual(
+                [call.request.headers['x-api-user'] for call in rsps.calls],
+                ['other', 'third', 'fourth', 'other'])
+            self.assertEqual(json.loads(rsps.calls[2].request.body), {})
+        other.close()
+        self.assertFalse(other._owns_session)
+
+    def test_lazy_tree(self):
+        eager = Habitipy(None)
+        with patch('habitipy.api._load_cached_api_tree') as load:
+            api = Habitipy(None, lazy=True)
+            self.assertFalse(load.called)
+        node = api._node
+        self.assertIsInstance(node, hapi.LazyApiNode)
+        self.assertEqual(sorted(dir(api)), sorted(dir(eager)))
+        self.assertEqual(node.paths, {})
+        self.assertEqual(api.user.get.__doc__, eager.user.get.__doc__)
+        self.assertEqual(list(node.paths), ['user'])
+        self.assertEqual(api.tasks['tid'].score['up'].post._current,
+                         eager.tasks['tid'].score['up'].post._current)
+        self.assertEqual(sorted(node.paths), ['tasks', 'user'])
+        self.assertEqual(sorted(dir(api)), sorted(dir(eager)))
+        with self.assertRaises(IndexError):
+            api.abracadabra
+
+    def test_cursor_close(self):
+        api = Habitipy(None)
+        with patch.object(api._session, 'close') as close:
+            with api.user:
+                pass
+            api.tasks.close()
+            self.assertFalse(close.called)
+            api.close()
+            self.assertTrue(close.called)
+
+    def test_cursor_cache_threads(self):
+        api = Habitipy(None)
+        errors = []
+
+        def use(thread, barrier):
+            barrier.wait()
+            try:
+                for i in range(3000):
+                    task = str(i * 8 + thread)
+                    self.assertEqual(api.tasks[task]._current, ['api', 'v3', 'tasks', task])
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            barrier = threading.Barrier(8)
+            threads = [threading.Thread(target=use, args=(i, barrier)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+
+    def test_lazy_tree_threads(self):
+        text = hapi.read_apidoc(hapi._apidoc_source())
+        errors = []
+
+        def use(tree, barrier):
+            node = tree.into('api').into('v3')
+            barrier.wait()
+            try:
+                for group in ('user', 'tasks', 'groups'):
+                    list(node.keys())
+                    self.assertTrue(node.can_into(group))
+                    node.into(group)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for _ in range(20):
+                tree = hapi.lazy_api_tree(text)
+                barrier = threading.Barrier(8)
+                threads = [
+                    threading.Thread(target=use, args=(tree, barrier)) for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+
+    def test_request_validation(self):
+        conf = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+        with self.assertRaises(ValueError):
+            Habitipy(conf, validation='sometimes')
+        api = Habitipy(conf, validation='strict')
+        add = api.tasks.user.post._node
+        self.assertEqual(add.validate_request({}, {}, {'type': 'todo', 'text': 'x'}), [])
+        self.assertEqual(
+            add.validate_request({}, {}, {'type': 'todo', 'text': 'x', 'priority': 1}), [])
+        self.assertEqual(add.validate_request({}, {}, {'type': 'todoo', 'priority': 3}), [
+            'text is missing',
+            "type should be one of daily, habit, reward, todo, got 'todoo'",
+            'priority should be one of 0.1, 1.0, 1.5, 2.0, got 3'])
+        self.assertEqual(add.validate_request({}, {}, {'type': 'todo', 'text': 5}), [
+            'text should be of type string, got 5'])
+        score = api.endpoint('post', '/tasks/:taskId/score/:direction')
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.POST,
+                url='https://habitica.com/api/v3/tasks/tid/score/up',
+                json={'data': {}})
+            score('tid', 'up', scoreNotes='note')
+            api.tasks['tid'].score['up'].post()
+            with self.assertRaises(hapi.WrongData):
+                score('tid', 'sideways', scoreNotes='note')
+            with self.assertRaises(hapi.WrongData):
+                api.tasks['tid'].score['sideways'].post()
+            self.assertEqual(len(rsps.calls), 2)
+        flag = api.groups[':groupId'].chat[':chatId'].flag.post._node
+        chat_id = '0c0a15b9-10a6-4bd8-9a03-2bfd5ab5f4b7'
+        self.assertEqual(flag.validate_request({'groupId': 'party', 'chatId': chat_id}, {}, {}), [])
+        self.assertEqual(
+            flag.validate_request({'groupId': chat_id.upper(), 'chatId': chat_id}, {}, {}), [])
+        self.assertEqual(
+            flag.validate_request({'groupId': 'nope', 'chatId': chat_id}, {}, {}),
+            ["groupId should be of type uuid, got 'nope'"])
+        api = Habitipy(conf, validation='warn')
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.POST,
+                url='https://habitica.com/api/v3/tasks/tid/score/up',
+                json={'data': {}})
+            rsps.add(
+                responses.POST,
+                url='https://habitica.com/api/v3/tasks/tid/score/sideways',
+                json={'data': {}})
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                api.tasks['tid'].score['up'].post()
+            self.assertEqual(caught, [])
+            with self.assertWarns(UserWarning):
+                api.tasks['tid'].score['sideways'].post()
+
+    def test_fields(self):
+        conf = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+        api = Habitipy(conf)
+        get_user = api.endpoint('get', '/user')
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/user', json={'data': {}})
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/tasks/user', json={'data': []})
+            api.user.get(fields=['stats', 'items.food'])
+            get_user(fields=('party',))
+            api.user.get()
+            api.tasks.user.get(fields=['text'])
+            urls = [call.request.url for call in rsps.calls]
+        self.assertEqual(urls, [
+            'https://habitica.com/api/v3/user?userFields=stats%2Citems.food',
+            'https://habitica.com/api/v3/user?userFields=party',
+            'https://habitica.com/api/v3/user',
+            'https://habitica.com/api/v3/tasks/user'])
+
+    def test_session(self):
+        conf = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+        api = Habitipy(conf, pool_size=3)
+        with patch.object(api._session, 'close') as close:
+            with api:
+                self.assertIs(api.user.get._session, api._session)
+                adapter = api._session.get_adapter('https://habitica.com')
+                self.assertEqual(adapter._pool_maxsize, 3)
+                with responses.RequestsMock() as rsps, \
+                        patch.object(api._session, 'get', wraps=api._session.get) as get:
+                    rsps.add(
+                        responses.GET, url='https://habitica.com/api/v3/user', json={'data': {}})
+                    api.user.get()
+                    api.endpoint('get', '/user')()
+                    self.assertEqual(get.call_count, 2)
+            self.assertTrue(close.called)
+        session = MagicMock()
+        with Habitipy(conf, session=session) as api:
+            self.assertIs(api.user._session, session)
+        self.assertFalse(session.close.called)
+
+    def test_batch(self):
+        conf = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+        api = Habitipy(conf)
+        with api.batch(max_workers=4) as batch:
+            for i in range(10):
+                self.assertEqual(batch.add(lambda x: 10 // x, i), i)
+        self.assertEqual(len(batch.results), 10)
+        self.assertIsInstance(batch.results[0].error, ZeroDivisionError)
+        self.assertEqual([r.result for r in batch.results[1:]], [10 // i for i in range(1, 10)])
+        with responses.RequestsMock() as rsps:
+            for tid in ['a', 'b', 'c']:
+                rsps.add(
+                    responses.POST,
+                    url='https://habitica.com/api/v3/tasks/{}/score/up'.format(tid),
+                    json={'data': tid})
+            rsps.add(
+                responses.POST, url='https://habitica.com/api/v3/tasks/d/score/up', status=404)
+            score = api.endpoint('post', '/tasks/:taskId/score/:direction')
+            results = score.map([('a', 'up'), {'taskId': 'b', 'direction': 'up'}, ('c', 'up'),
+                                 ('d', 'up')])
+            self.assertEqual([r.result for r in results], ['a', 'b', 'c', None])
+            self.assertIsNotNone(results[3].error)
+            rsps.add(responses.POST, url='https://habitica.com/api/v3/tasks/user',
+                     json={'data': {}}, status=201)
+            results = api.tasks.user.post.map([{'text': str(i)} for i in range(3)])
+            self.assertEqual(results, [({}, None)] * 3)
+
     def test_integration(self):
         api = Habitipy(None)
         with self.assertRaises(IndexError):
@@ -82,3 +376,22 @@ class TestHabitipy(unittest.TestCase):
             Habitipy(None)
             mock.assert_called_with(lp, encoding='utf-8')
         os.remove(lp)
+
+    def test_api_tree_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = os.path.join(tmp, 'apidoc.cache')
+            with patch('habitipy.api.APIDOC_CACHE_FILE', None):
+                Habitipy(None)
+            self.assertFalse(os.listdir(tmp))
+            with patch('habitipy.api.APIDOC_CACHE_FILE', cache):
+                Habitipy(None)
+                self.assertTrue(os.path.exists(cache))
+                with patch('habitipy.api.parse_apidoc_text') as parse:
+                    api = Habitipy(None)
+                    self.assertFalse(parse.called)
+                self.assertIn('user', dir(api))
+                with patch('habitipy.api.APIDOC_PARSER_VERSION', -1):
+                    with patch('habitipy.api.parse_apidoc_text', MagicMock(
+                            wraps=hapi.parse_apidoc_text)) as parse:
+                        Habitipy(None)
+                        self.assertTrue(parse.called)
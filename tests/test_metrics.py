@@ -0,0 +1,100 @@
+import socket
+import unittest
+import urllib.request
+
+import responses
+
+from habitipy import Habitipy
+from habitipy.cache import ResponseCache
+from habitipy.metrics import Histogram, Metrics, StatsdClient, start_http_server
+
+from .helpers import FakeClock
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [('0.1', 2), ('1', 3), ('+Inf', 4)])
+        self.assertEqual(histogram.snapshot()['count'], 4)
+        self.assertAlmostEqual(histogram.snapshot()['sum'], 2.65)
+
+    def test_habitipy(self):
+        metrics = Metrics(clock=FakeClock(step=0.02))
+        api = Habitipy(CONF, metrics=metrics, response_cache=ResponseCache())
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/user',
+                body='{"data": {"id": "login"}}')
+            rsps.add(
+                responses.POST, url='https://habitica.com/api/v3/tasks/tid/score/up',
+                body='{"data": {}}', status=404)
+            api.user.get()
+            api.user.get()
+            with self.assertRaises(Exception):
+                api.tasks['tid'].score['up'].post(scoreNotes='note')
+        snapshot = metrics.snapshot()
+        user = snapshot['{get} /api/v3/user']
+        self.assertEqual(user['requests'], 1)
+        self.assertEqual(user['cache_hits'], 1)
+        self.assertEqual(user['statuses'], {200: 1})
+        self.assertEqual(user['bytes_in'], 25)
+        self.assertEqual(user['bytes_out'], 0)
+        self.assertEqual(user['latency']['count'], 1)
+        self.assertAlmostEqual(user['latency']['sum'], 0.02)
+        self.assertEqual(user['decode']['count'], 2)
+        score = snapshot['{post} /api/v3/tasks/:taskId/score/:direction']
+        self.assertEqual(score['statuses'], {404: 1})
+        self.assertEqual(score['bytes_out'], len(api._json_codec.dumps({'scoreNotes': 'note'})))
+        self.assertEqual(score['decode']['count'], 0)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_prometheus(self):
+        metrics = Metrics(buckets=(0.1, 1))
+        metrics.observe_request('get', '/api/v3/user', 200, 0.05, 0, 10)
+        metrics.count('get', '/api/v3/user', 'retries')
+        text = metrics.prometheus()
+        self.assertIn('# TYPE habitipy_requests_total counter\n', text)
+        self.assertIn(
+            'habitipy_requests_total{endpoint="/api/v3/user",method="get"} 1\n', text)
+        self.assertIn(
+            'habitipy_responses_total{endpoint="/api/v3/user",method="get",status="200"} 1\n',
+            text)
+        self.assertIn(
+            'habitipy_retries_total{endpoint="/api/v3/user",method="get"} 1\n', text)
+        self.assertIn(
+            'habitipy_request_duration_seconds_bucket'
+            '{endpoint="/api/v3/user",le="0.1",method="get"} 1\n', text)
+        self.assertIn(
+            'habitipy_request_duration_seconds_count{endpoint="/api/v3/user",method="get"} 1\n',
+            text)
+        server = start_http_server(metrics, 0)
+        try:
+            url = 'http://127.0.0.1:{}/metrics'.format(server.server_address[1])
+            with urllib.request.urlopen(url) as res:
+                self.assertEqual(res.read().decode(), metrics.prometheus())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_statsd(self):
+        daemon = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        daemon.bind(('127.0.0.1', 0))
+        daemon.settimeout(5)
+        statsd = StatsdClient(port=daemon.getsockname()[1])
+        try:
+            metrics = Metrics(statsd=statsd)
+            metrics.observe_request('post', '/api/v3/tasks/:taskId/score/:direction',
+                                    200, 0.0125, 20, 10)
+            lines = daemon.recv(4096).decode().split('\n')
+        finally:
+            statsd.close()
+            daemon.close()
+        prefix = 'habitipy.post.api_v3_tasks_taskId_score_direction.'
+        self.assertEqual(lines, [
+            prefix + 'latency:12.500|ms', prefix + 'status.200:1|c',
+            prefix + 'bytes_out:20|c', prefix + 'bytes_in:10|c'])
@@ -0,0 +1,84 @@
+import logging
+import unittest
+
+import requests
+import responses
+
+from habitipy import Habitipy
+from habitipy.middleware import (
+    ApiResponse, HeadersMiddleware, LoggingMiddleware, Middleware, Pipeline)
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+
+
+class Recorder(Middleware):
+    def __init__(self, name, log, response=None):
+        self.name = name
+        self.log = log
+        self.response = response
+
+    def process_request(self, request):
+        self.log.append((self.name, 'request', request.endpoint.uri))
+        return self.response
+
+    def process_response(self, request, response):
+        self.log.append((self.name, 'response', response.status))
+        return response
+
+
+class TestPipeline(unittest.TestCase):
+    def test_order(self):
+        log = []
+        api = Habitipy(CONF, middlewares=[
+            Recorder('outer', log), HeadersMiddleware({'x-client': 'bot'}), Recorder('inner', log)])
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, url='https://habitica.com/api/v3/user', json={'data': {}})
+            self.assertEqual(api.user.get(), {})
+            self.assertEqual(rsps.calls[0].request.headers['x-client'], 'bot')
+            self.assertEqual(rsps.calls[0].request.headers['x-api-user'], 'login')
+        self.assertEqual(log, [
+            ('outer', 'request', '/api/v3/user'), ('inner', 'request', '/api/v3/user'),
+            ('inner', 'response', 200), ('outer', 'response', 200)])
+
+    def test_short_circuit(self):
+        log = []
+        cached = ApiResponse(200, {}, b'{"data": {"status": "up"}}')
+        api = Habitipy(CONF, middlewares=[
+            Recorder('outer', log), Recorder('cache', log, cached), Recorder('inner', log)])
+        with responses.RequestsMock():
+            self.assertEqual(api.status.get(), {'status': 'up'})
+        self.assertEqual(log, [
+            ('outer', 'request', '/api/v3/status'), ('cache', 'request', '/api/v3/status'),
+            ('cache', 'response', 200), ('outer', 'response', 200)])
+        api = Habitipy(CONF, middlewares=[Recorder('error', [], ApiResponse(404, {}, b''))])
+        with self.assertRaises(requests.HTTPError):
+            api.status.get()
+
+    def test_headers_changed_in_place(self):
+        class Counter(Middleware):
+            def process_request(self, request):
+                request.headers['x-count'] = request.headers.get('x-count', '') + '1'
+                return None
+
+        api = Habitipy(CONF, middlewares=[Counter()])
+        status = api.endpoint('get', '/status')
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, url='https://habitica.com/api/v3/status', json={'data': {}})
+            status()
+            status()
+            self.assertEqual(
+                [call.request.headers['x-count'] for call in rsps.calls], ['1', '1'])
+
+    def test_logging(self):
+        api = Habitipy(CONF, middlewares=[LoggingMiddleware(level=logging.INFO)])
+        with responses.RequestsMock() as rsps, \
+                self.assertLogs('habitipy.middleware', logging.INFO) as logs:
+            rsps.add(responses.GET, url='https://habitica.com/api/v3/user', body='{"data": {}}')
+            api.user.get()
+        self.assertEqual(logs.output, [
+            'INFO:habitipy.middleware:GET https://habitica.com/api/v3/user',
+            'INFO:habitipy.middleware:GET https://habitica.com/api/v3/user -> 200 (12 bytes)'])
+
+    def test_empty(self):
+        response = ApiResponse(200, {}, b'')
+        self.assertIs(Pipeline().send(None, lambda request: response), response)
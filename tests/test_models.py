@@ -0,0 +1,63 @@
+import sys
+import unittest
+
+import responses
+
+from habitipy import Habitipy
+from habitipy.models import Model, Task, User, make_model, model_from_api
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+
+
+class TestModels(unittest.TestCase):
+    def test_model(self):
+        stats = {'hp': 50, 'class': 'warrior', 'unknown': 1}
+        user = User.from_dict({'_id': 'uid', 'stats': stats, 'not-a-name': 2})
+        self.assertEqual(user._id, 'uid')
+        self.assertEqual(user['not-a-name'], 2)
+        self.assertIs(user._nested_stats, stats)
+        self.assertIsInstance(user.stats, Model)
+        self.assertIs(user.stats, user['stats'])
+        self.assertEqual(user.stats.hp, 50)
+        self.assertEqual(user['stats']['class'], 'warrior')
+        self.assertEqual(user.stats.get('mp', 0), 0)
+        self.assertNotIn('mp', user.stats)
+        self.assertIn('unknown', user.stats)
+        with self.assertRaises(AttributeError):
+            user.items
+        with self.assertRaises(KeyError):
+            user['items']
+        user['stats']['hp'] = 10
+        user['extra'] = {}
+        self.assertEqual(user.to_dict(), {
+            '_id': 'uid', 'stats': {'hp': 10, 'class': 'warrior', 'unknown': 1},
+            'extra': {}, 'not-a-name': 2})
+        self.assertEqual(sorted(Task(text='x', type='todo')), ['text', 'type'])
+
+    def test_make_model(self):
+        Thing = make_model('Thing', ['a.b.c', 'a.d', 'e', 'keys', 'f-g', '__v'])
+        self.assertEqual(Thing.__slots__, ('_nested_a', 'e'))
+        self.assertEqual(Thing._nested['a'].__name__, 'ThingA')
+        thing = Thing.from_dict({'a': {'b': {'c': 1}}, 'keys': 2})
+        self.assertEqual(thing.a.b.c, 1)
+        self.assertEqual(thing['keys'], 2)
+        self.assertLess(
+            sys.getsizeof(Thing.from_dict({'e': 1})), sys.getsizeof({'e': 1}))
+
+    def test_habitipy(self):
+        api = Habitipy(CONF, models=True)
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/user',
+                json={'data': {'stats': {'hp': 50}}})
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/tasks/user',
+                json={'data': [{'text': 'x'}]})
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/models/tag/paths',
+                json={'data': {'id': 'String', 'name': 'String', 'challenge.id': 'String'}})
+            self.assertEqual(api.user.get().stats.hp, 50)
+            tasks = api.tasks.user.get()
+            self.assertIsInstance(tasks[0], Task)
+            Tag = model_from_api(api, 'tag')
+            self.assertEqual(Tag.__slots__, ('id', 'name', '_nested_challenge'))
@@ -0,0 +1,117 @@
+import gc
+import json
+import os
+import tempfile
+import unittest
+import weakref
+
+import responses
+
+from habitipy import Habitipy
+from habitipy import projection
+from habitipy.projection import AccessProfiles
+
+from .helpers import FakeClock
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+USER = {
+    'stats': {'hp': 50, 'mp': 30},
+    'items': {'food': {'Meat': 1}, 'eggs': {}},
+    'profile': {'name': 'user'},
+}
+
+
+def user_handler(request):
+    fields = request.params.get('userFields')
+    if not fields:
+        return 200, {}, json.dumps({'data': USER})
+    data = {}
+    for field in fields.split(','):
+        top, _, rest = field.partition('.')
+        if rest:
+            data.setdefault(top, {})[rest] = USER[top][rest]
+        else:
+            data[top] = USER[top]
+    return 200, {}, json.dumps({'data': data})
+
+
+class TestAccessProfiles(unittest.TestCase):
+    def test_learning(self):
+        profiles = AccessProfiles()
+        api = Habitipy(CONF, projections=profiles)
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(
+                responses.GET, url='https://habitica.com/api/v3/user', callback=user_handler)
+            for _ in range(2):
+                user = api.user.get(projection_site='site')
+                self.assertEqual(user['stats']['hp'], 50)
+                self.assertEqual(user['items'].get('food'), {'Meat': 1})
+            self.assertEqual(profiles.fields('site'), ['items.food', 'stats.hp'])
+            self.assertIn('userFields=items.food%2Cstats.hp', rsps.calls[1].request.url)
+            self.assertEqual(len(rsps.calls), 2)
+            # a field which was not requested fetches the whole document once
+            self.assertEqual(user['profile']['name'], 'user')
+            self.assertEqual(user['stats']['mp'], 30)
+            self.assertEqual(len(rsps.calls), 3)
+            self.assertNotIn('userFields', rsps.calls[2].request.url)
+            self.assertEqual(
+                profiles.fields('site'),
+                ['items.food', 'profile', 'stats.hp', 'stats.mp'])
+            # iteration reads the dict whole
+            user = api.user.get(projection_site='site')
+            self.assertEqual(sorted(user['stats']), ['hp', 'mp'])
+            self.assertEqual(profiles.fields('site'), ['items.food', 'profile', 'stats'])
+            # explicit fields and other endpoints are not tracked
+            self.assertEqual(api.user.get(fields=['profile']), {'profile': {'name': 'user'}})
+        self.assertIsNone(profiles.fields('other'))
+
+    def test_call_site(self):
+        profiles = AccessProfiles()
+        api = Habitipy(CONF, projections=profiles)
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(
+                responses.GET, url='https://habitica.com/api/v3/user', callback=user_handler)
+            api.user.get()['stats']['hp']
+        site, = profiles._profiles
+        self.assertEqual(site, __name__ + ':TestAccessProfiles.test_call_site')
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'habitipy', 'projections.json')
+            profiles = AccessProfiles(path, clock=FakeClock())
+            profiles.record('site', 'stats')
+            profiles.save()
+            with open(path) as file:
+                self.assertEqual(json.load(file), {'site': {'fields': ['stats'], 'seen': 0}})
+            self.assertEqual(AccessProfiles(path).fields('site'), ['stats'])
+            with open(path, 'w') as file:
+                json.dump({'site': ['stats']}, file)
+            self.assertEqual(AccessProfiles(path).fields('site'), ['stats'])
+
+    def test_prune(self):
+        clock = FakeClock()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'projections.json')
+            profiles = AccessProfiles(path, max_age=10, clock=clock)
+            profiles.record('old', 'stats')
+            profiles.record('used', 'stats')
+            profiles.save()
+            clock.now = 5
+            profiles = AccessProfiles(path, max_age=10, clock=clock)
+            profiles.fields('used')
+            clock.now = 15
+            profiles.save()
+            with open(path) as file:
+                self.assertEqual(json.load(file), {'used': {'fields': ['stats'], 'seen': 5}})
+
+    def test_save_at_exit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'projections.json')
+            profiles = AccessProfiles(path)
+            profiles.record('site', 'stats')
+            projection._save_kept()
+            self.assertTrue(os.path.exists(path))
+            ref = weakref.ref(profiles)
+            del profiles
+            gc.collect()
+            self.assertIsNone(ref())
@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch
+import time
+
+import responses
+
+from habitipy import Habitipy
+from habitipy.ratelimit import RateLimiter, parse_reset
+
+from .helpers import FakeClock
+
+
+class TestParseReset(unittest.TestCase):
+    def test_formats(self):
+        now = 1640018889.0  # Mon Dec 20 2021 16:48:09 UTC
+        self.assertEqual(parse_reset('5', now), 5.0)
+        self.assertEqual(parse_reset(str(now + 7), now), 7.0)
+        self.assertEqual(parse_reset(str((now + 3) * 1000), now), 3.0)
+        self.assertEqual(
+            parse_reset('Mon Dec 20 2021 16:48:19 GMT+0000 (Coordinated Universal Time)', now),
+            10.0)
+        self.assertEqual(parse_reset('Mon, 20 Dec 2021 16:48:29 GMT', now), 20.0)
+        self.assertEqual(parse_reset('Mon Dec 20 2021 16:47:00 GMT+0000', now), 0.0)
+        self.assertIsNone(parse_reset('soon', now))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+        self.limiter = RateLimiter(limit=3, period=3.0, clock=self.clock)
+
+    def test_bucket(self):
+        self.assertEqual([self.limiter.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(self.limiter.reserve(), 1.0)
+        self.assertAlmostEqual(self.limiter.reserve(), 2.0)
+        self.clock.now += 10
+        self.assertEqual(self.limiter.reserve(), 0.0)
+
+    def test_headers(self):
+        self.limiter.update({'X-RateLimit-Limit': '6', 'X-RateLimit-Remaining': '1'})
+        self.assertEqual(self.limiter.limit, 6)
+        self.assertEqual(self.limiter.reserve(), 0.0)
+        self.assertAlmostEqual(self.limiter.reserve(), 0.5)
+        self.limiter.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '30'})
+        self.assertAlmostEqual(self.limiter.reserve(), 30.0)
+
+    def test_retry_after(self):
+        self.limiter.update({'Retry-After': '12'}, 429)
+        self.assertAlmostEqual(self.limiter.reserve(), 12.0)
+
+    def test_habitipy(self):
+        conf = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+        api = Habitipy(conf, rate_limiter=self.limiter)
+        with responses.RequestsMock() as rsps, patch('time.sleep') as sleep:
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/user', json={'data': {}},
+                headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '20'})
+            api.user.get()
+            self.assertFalse(sleep.called)
+            api.user.get()
+            sleep.assert_called_once_with(20.0)
@@ -0,0 +1,127 @@
+import unittest
+from email.utils import formatdate
+from unittest.mock import patch
+
+import requests
+import responses
+
+from habitipy import Habitipy
+from habitipy.metrics import Metrics
+from habitipy.middleware import Middleware
+from habitipy.retry import CircuitBreaker, CircuitOpen, RetryPolicy
+
+from .helpers import FakeClock
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+USER_URL = 'https://habitica.com/api/v3/user'
+FEED_URL = 'https://habitica.com/api/v3/user/feed/Wolf-Base/Meat'
+
+
+class Failing(Middleware):
+    def __init__(self):
+        self.failing = False
+
+    def process_request(self, request):
+        if self.failing:
+            raise ValueError('middleware failed')
+        return None
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        api = Habitipy(None)
+        self.get = api.user.get._node
+        self.feed = api.user.feed['pet']['food'].post._node
+
+    def test_delay(self):
+        policy = RetryPolicy(attempts=5, backoff=1, max_backoff=5, jitter=0.5, sample=lambda: 0.5)
+        self.assertEqual(
+            [policy.delay(self.get, attempt, 503, {}) for attempt in range(5)],
+            [0.75, 1.5, 3.0, 3.75, None])
+        self.assertIsNone(policy.delay(self.get, 0, 404, {}))
+        self.assertEqual(policy.delay(self.get, 0, None, None), 0.75)
+
+    def test_mutations(self):
+        policy = RetryPolicy(jitter=0)
+        self.assertIsNone(policy.delay(self.feed, 0, 503, {}))
+        self.assertIsNone(policy.delay(self.feed, 0, None, None))
+        self.assertEqual(policy.delay(self.feed, 0, 429, {}), 0.5)
+        policy = RetryPolicy(jitter=0, safe=[('post', self.feed.uri)])
+        self.assertEqual(policy.delay(self.feed, 0, 503, {}), 0.5)
+
+    def test_retry_after(self):
+        policy = RetryPolicy(max_retry_after=10)
+        self.assertEqual(policy.delay(self.get, 0, 429, {'retry-after': '3'}), 3)
+        self.assertIsNone(policy.delay(self.get, 0, 429, {'retry-after': '30'}))
+        with patch('habitipy.retry.time.time', return_value=1000):
+            date = formatdate(1005, usegmt=True)
+            self.assertEqual(policy.delay(self.get, 0, 503, {'retry-after': date}), 5)
+        policy = RetryPolicy(jitter=0)
+        self.assertEqual(policy.delay(self.get, 0, 503, {'retry-after': 'soon'}), 0.5)
+
+
+class TestRetries(unittest.TestCase):
+    def test_habitipy(self):
+        metrics = Metrics()
+        api = Habitipy(CONF, retry=RetryPolicy(backoff=0), metrics=metrics)
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, url=USER_URL, status=502, body='{}')
+            rsps.add(responses.GET, url=USER_URL, body=requests.ConnectionError())
+            rsps.add(responses.GET, url=USER_URL, json={'data': {'id': 'login'}})
+            self.assertEqual(api.user.get(), {'id': 'login'})
+            self.assertEqual(len(rsps.calls), 3)
+        self.assertEqual(metrics.snapshot()['{get} /api/v3/user']['retries'], 2)
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, url=USER_URL, body=requests.ConnectionError())
+            with self.assertRaises(requests.ConnectionError):
+                api.user.get()
+            self.assertEqual(len(rsps.calls), 3)
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.POST, url=FEED_URL, status=503, body='{}')
+            with self.assertRaises(requests.HTTPError):
+                api.user.feed['Wolf-Base']['Meat'].post()
+            self.assertEqual(len(rsps.calls), 1)
+
+    def test_circuit_breaker(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failures=2, reset_timeout=10, clock=clock)
+        api = Habitipy(CONF, circuit_breaker=breaker)
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            rsps.add(responses.GET, url=USER_URL, status=500, body='{}')
+            for _ in range(2):
+                with self.assertRaises(requests.HTTPError):
+                    api.user.get()
+            self.assertTrue(breaker.is_open)
+            with self.assertRaises(CircuitOpen):
+                api.user.get()
+            self.assertEqual(len(rsps.calls), 2)
+            clock.now = 10
+            with self.assertRaises(requests.HTTPError):
+                api.user.get()
+            with self.assertRaises(CircuitOpen):
+                api.user.get()
+            clock.now = 20
+            rsps.replace(responses.GET, url=USER_URL, json={'data': {}})
+            self.assertEqual(api.user.get(), {})
+            self.assertFalse(breaker.is_open)
+            self.assertEqual(len(rsps.calls), 4)
+
+    def test_circuit_breaker_trial_error(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failures=1, reset_timeout=1, clock=clock)
+        failing = Failing()
+        api = Habitipy(CONF, circuit_breaker=breaker, middlewares=[failing])
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            rsps.add(responses.GET, url=USER_URL, status=503, body='{}')
+            with self.assertRaises(requests.HTTPError):
+                api.user.get()
+            clock.now = 10
+            failing.failing = True
+            with self.assertRaises(ValueError):
+                api.user.get()
+            self.assertTrue(breaker.is_open)
+            failing.failing = False
+            clock.now = 100
+            rsps.replace(responses.GET, url=USER_URL, json={'data': {}})
+            self.assertEqual(api.user.get(), {})
+            self.assertFalse(breaker.is_open)
@@ -0,0 +1,74 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from habitipy import Habitipy
+from habitipy.transport import (
+    HttpxTransport, RequestsTransport, Urllib3Transport, httpx)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def respond(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/api/v3/tasks/bad'):
+            self.respond(404, {'error': 'NotFound'})
+        else:
+            self.respond(200, {'data': {
+                'path': self.path, 'user': self.headers['x-api-user']}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.respond(200, {'data': json.loads(body.decode())})
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransports(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.conf = {
+            'url': 'http://127.0.0.1:{}'.format(cls.server.server_address[1]),
+            'login': 'login', 'password': 'password'}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def check(self, transport):
+        with transport:
+            api = Habitipy(self.conf, transport=transport)
+            self.assertEqual(
+                api.user.get(fields=['stats']),
+                {'path': '/api/v3/user?userFields=stats', 'user': 'login'})
+            self.assertEqual(api.tags.post(name='tag'), {'name': 'tag'})
+            with self.assertRaises(requests.HTTPError) as error:
+                api.tasks['bad'].get()
+            self.assertIsNotNone(error.exception.response)
+
+    def test_requests(self):
+        self.check(RequestsTransport())
+
+    def test_urllib3(self):
+        self.check(Urllib3Transport())
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_httpx(self):
+        self.check(HttpxTransport(http2=False))
@@ -7,6 +7,7 @@ import uuid
 from habitipy.cli import load_conf
 from habitipy.util import secure_filestore, SecurityError, assert_secure_file, is_secure_file
 from habitipy.util import progressed
+from habitipy.util import get_json_codec, JsonCodec, JSON_CODECS
 
 def touch(fname, times=None):
     with open(fname, 'a'):
@@ -53,3 +54,22 @@ class TestFileUtils(unittest.TestCase):
         os.chmod(self.filename, 0o666)
         with self.assertRaises(SecurityError):
             conf = load_conf(self.filename)
+
+
+class TestJsonCodec(unittest.TestCase):
+    def test_get_json_codec(self):
+        self.assertIs(get_json_codec('json'), JSON_CODECS['json'])
+        self.assertIn(get_json_codec().name, ('orjson', 'ujson', 'json'))
+        codec = JsonCodec('custom', lambda x: b'{}', lambda x: {})
+        self.assertIs(get_json_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            get_json_codec('yaml')
+
+    def test_roundtrip(self):
+        obj = {'data': {'text': 'Пример :book:', 'value': 1.5, 'list': [None, True]}}
+        for codec in JSON_CODECS.values():
+            encoded = codec.dumps(obj)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(codec.loads(encoded), obj)
+            with self.assertRaises(ValueError):
+                codec.loads(b'{not json')
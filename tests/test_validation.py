@@ -0,0 +1,51 @@
+import unittest
+
+import responses
+
+from habitipy import Habitipy
+from habitipy.validation import ResponseValidator
+
+CONF = {'url': 'https://habitica.com', 'login': 'login', 'password': 'password'}
+SCORE = '{post} /api/v3/tasks/:taskId/score/:direction'
+
+
+class TestResponseValidator(unittest.TestCase):
+    def test_validate_response(self):
+        api = Habitipy(None)
+        score = api.tasks['tid'].score['up'].post._node
+        self.assertEqual(score.validate_response({'data': {'_tmp': {}, 'delta': 1.5}}), [])
+        self.assertEqual(score.validate_response({'data': {'_tmp': {}, 'delta': '1'}}), [
+            "data.delta should be of type number, got '1'"])
+        self.assertEqual(score.validate_response({'data': {'delta': 1}}), ['data._tmp is missing'])
+        self.assertEqual(score.validate_response({}), ['data is missing'])
+
+    def test_sampling(self):
+        samples = iter([0.5, 0.05, 0.5, 0.01])
+        validator = ResponseValidator(rate=0.1, sample=lambda: next(samples))
+        api = Habitipy(CONF, response_validator=validator)
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.POST, url='https://habitica.com/api/v3/tasks/tid/score/up',
+                json={'data': {'_tmp': {}, 'delta': 'drifted'}})
+            for _ in range(4):
+                api.tasks['tid'].score['up'].post()
+        self.assertEqual(validator.checked, {SCORE: 2})
+        self.assertEqual(validator.mismatches, {SCORE: 2})
+        self.assertEqual(
+            validator.problems[SCORE], ["data.delta should be of type number, got 'drifted'"])
+        validator.reset()
+        self.assertEqual(validator.checked, {})
+
+    def test_warn(self):
+        validator = ResponseValidator(rate=1, warn=True)
+        api = Habitipy(CONF, response_validator=validator)
+        with responses.RequestsMock() as rsps:
+            rsps.add(
+                responses.GET, url='https://habitica.com/api/v3/user', json={'data': []})
+            with self.assertWarns(UserWarning):
+                api.user.get()
+            rsps.replace(
+                responses.GET, url='https://habitica.com/api/v3/user', json={'data': {}})
+            api.user.get()
+        self.assertEqual(validator.checked, {'{get} /api/v3/user': 2})
+        self.assertEqual(validator.mismatches, {'{get} /api/v3/user': 1})